@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django import forms
 from .models import (Image, File, Feedback, Author, Book, BookPage, 
                      Category, BookRating, Favorite, ReadingProgress, SearchQuery, BookSummary,
-                     Product, ProductScanHistory)
+                     Product, ProductScanHistory, IngestionJob, IngestionJobFile)
 
 # Premium Obuna Admin'larini import qilish
 from .admin_subscription import *
@@ -301,6 +301,29 @@ class BookSummaryAdmin(admin.ModelAdmin):
     summary_preview.short_description = "Xulosa"
 
 
+class IngestionJobFileInline(admin.TabularInline):
+    model = IngestionJobFile
+    extra = 0
+    fields = ('name', 'status', 'message', 'book')
+    readonly_fields = ('name', 'status', 'message', 'book')
+    can_delete = False
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'original_name', 'status', 'processed_files', 'total_files', 'worker', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('original_name',)
+    readonly_fields = ('worker', 'started_at', 'finished_at', 'updated_at', 'error')
+    inlines = [IngestionJobFileInline]
+    actions = ['requeue_jobs']
+
+    def requeue_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='pending', error='')
+        self.message_user(request, f"{updated} ta vazifa qayta navbatga qo'yildi")
+    requeue_jobs.short_description = "Qayta navbatga qo'yish"
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('barcode', 'name', 'brand', 'price', 'currency', 'category', 'scan_count', 'is_active')
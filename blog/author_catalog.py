@@ -0,0 +1,89 @@
+"""
+Adiblar katalogi (adabiyotlar sahifasi) uchun tayyor snapshot
+Har so'rovda Author + barcha kitoblarni o'qish o'rniga: adib ma'lumoti, kitoblar soni va
+birinchi BOOKS_PER_AUTHOR ta kitob (id, nomi) ikki so'rov bilan yig'ilib, siqilgan JSON
+ko'rinishida keshlanadi. Sahifa faqat shu snapshotdan chiziladi - ORM so'rovlarisiz.
+
+Snapshot tagged_cache orqali Author/Book teglariga bog'langan - adib yoki kitob o'zgarsa
+keyingi so'rovda qayta quriladi.
+"""
+import json
+import zlib
+import logging
+import threading
+from collections import namedtuple
+
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from .tagged_cache import get_or_set, tag
+
+logger = logging.getLogger(__name__)
+
+BOOKS_PER_AUTHOR = 6
+SNAPSHOT_KEY = 'author_catalog_snapshot'
+
+CatalogAuthor = namedtuple('CatalogAuthor', 'id name birth_year death_year image_url book_count books')
+CatalogBook = namedtuple('CatalogBook', 'id title')
+
+
+def build_snapshot():
+    """
+    Snapshotni bazadan yig'ish (2 ta so'rov)
+    :return: siqilgan JSON (bytes)
+    """
+    from .models import Author, Book
+
+    authors = list(
+        Author.objects.annotate(book_count=Count('books'))
+        .order_by('name')
+        .values_list('id', 'name', 'birth_year', 'death_year', 'image', 'book_count')
+    )
+    # Har adibning birinchi N ta kitobi - bitta so'rov (ROW_NUMBER() OVER (PARTITION BY author))
+    books = {}
+    rows = (
+        Book.objects.annotate(
+            position=Window(RowNumber(), partition_by=[F('author_id')], order_by=[F('created_at').desc(), F('id').desc()])
+        )
+        .filter(position__lte=BOOKS_PER_AUTHOR)
+        .order_by('author_id', 'position')
+        .values_list('author_id', 'id', 'title')
+    )
+    for author_id, book_id, title in rows:
+        books.setdefault(author_id, []).append([book_id, title])
+
+    storage = Author._meta.get_field('image').storage
+    data = [
+        [author_id, name, birth_year, death_year, storage.url(image) if image else None, book_count, books.get(author_id, [])]
+        for author_id, name, birth_year, death_year, image, book_count in authors
+    ]
+    blob = zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode())
+    logger.info(f"AUTHOR_CATALOG: {len(data)} ta adib, {len(blob)} bayt")
+    return blob
+
+
+_decoded = (None, None)
+_decoded_lock = threading.Lock()
+
+
+def _decode(blob):
+    global _decoded
+    with _decoded_lock:
+        if _decoded[0] == blob:
+            return _decoded[1]
+    authors = [
+        CatalogAuthor(author_id, name, birth_year, death_year, image_url, book_count,
+                      [CatalogBook(*book) for book in books])
+        for author_id, name, birth_year, death_year, image_url, book_count, books in json.loads(zlib.decompress(blob))
+    ]
+    with _decoded_lock:
+        _decoded = (blob, authors)
+    return authors
+
+
+def get_catalog():
+    """Adiblar ro'yxati (CatalogAuthor) - keshdagi snapshotdan; jarayon oxirgi ochilgan nusxani eslab qoladi"""
+    from .models import Author, Book
+
+    blob = get_or_set(SNAPSHOT_KEY, build_snapshot, tags=[tag(Author), tag(Book)])
+    return _decode(blob)
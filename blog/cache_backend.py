@@ -0,0 +1,231 @@
+"""
+Django kesh backendi - umumiy kesh serveriga (cache_server.py) lokal socket orqali ulanadi
+Server ishlamasa har bir jarayon o'zining LRU keshiga o'tadi va vaqti-vaqti bilan qayta ulanishga urinadi.
+Ulanish oqim va jarayonga bog'langan: fork qilingan bola (ProcessPoolExecutor) ota socketidan
+foydalanmaydi - o'z ulanishini ochadi.
+
+settings.py:
+    CACHES = {'default': {
+        'BACKEND': 'blog.cache_backend.SocketCache',
+        'LOCATION': '/tmp/cloudstore-cache.sock',   # yoki '127.0.0.1:11311'
+    }}
+"""
+import os
+import time
+import pickle
+import socket
+import struct
+import logging
+import threading
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .cache_server import CacheStore, auth_key, parse_location, recv_message, send_message
+
+logger = logging.getLogger(__name__)
+
+# Ikki marta bajarilsa natija o'zgaradigan buyruqlar - javobsiz qolsa qayta yuborilmaydi
+NON_IDEMPOTENT = frozenset(['incr', 'add'])
+
+
+class SocketCache(BaseCache):
+    """
+    OPTIONS:
+        SOCKET_TIMEOUT - bitta so'rov uchun kutish (soniya, standart 1)
+        RETRY_INTERVAL - server ishlamasa qayta urinishgacha vaqt (soniya, standart 5)
+        FALLBACK_MAX_ENTRIES - lokal zaxira LRU hajmi (standart 1000)
+        AUTH_KEY - xabarlar HMAC kaliti (standart - SECRET_KEY dan, serverniki bilan bir xil)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = location
+        self._socket_timeout = options.get('SOCKET_TIMEOUT', 1.0)
+        self._retry_interval = options.get('RETRY_INTERVAL', 5)
+        self._fallback = CacheStore(
+            max_entries=options.get('FALLBACK_MAX_ENTRIES', 1000),
+            max_bytes=options.get('FALLBACK_MAX_BYTES', 16 * 1024 * 1024),
+        )
+        self._auth_key = options.get('AUTH_KEY') or auth_key()
+        self._local = threading.local()
+        self._down_until = 0
+
+    # ----- ulanish -----
+
+    def _connect(self):
+        family, address = parse_location(self._location)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self._socket_timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _socket(self):
+        """
+        Joriy oqim ulanishi: (socket, qayta ishlatilganmi)
+        Fork dan keyin bola ota socketini meros oladi - unga yozilsa ikki jarayonning so'rov va
+        javoblari bitta ulanishda aralashadi, shuning uchun PID o'zgarsa yangi ulanish ochiladi.
+        """
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None and self._local.pid != os.getpid():
+            # Faqat bolada fd yopiladi - ota jarayon ulanishi ochiq qoladi
+            self._drop_connection()
+            sock = None
+        if sock is not None:
+            return sock, True
+        sock = self._local.sock = self._connect()
+        self._local.pid = os.getpid()
+        return sock, False
+
+    def _drop_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _call(self, command, *args):
+        """Buyruqni serverda bajarish; server ishlamasa lokal zaxira keshda"""
+        if time.monotonic() >= self._down_until:
+            for attempt in range(2):
+                reused = False
+                try:
+                    sock, reused = self._socket()
+                    send_message(sock, (command, args), self._auth_key)
+                    status, result = recv_message(sock, self._auth_key)
+                except socket.timeout:
+                    # So'rov serverga yetgan bo'lishi mumkin - incr/add qayta yuborilsa ikki marta bajariladi
+                    self._drop_connection()
+                    if command in NON_IDEMPOTENT:
+                        break
+                    continue
+                except (OSError, ConnectionError, EOFError, struct.error, pickle.UnpicklingError):
+                    # Eski ulanishni server yopgan (qayta ishga tushgan) - bir marta qayta ulanib ko'rish
+                    self._drop_connection()
+                    if command in NON_IDEMPOTENT and not reused:
+                        break
+                    continue
+                if status == 'error':
+                    raise ValueError(result)
+                return result
+
+            logger.warning(
+                f"CACHE: kesh serveri ({self._location}) javob bermadi - "
+                f"{self._retry_interval}s lokal keshda ishlanadi"
+            )
+            self._down_until = time.monotonic() + self._retry_interval
+
+        return getattr(self._fallback, command)(*args)
+
+    @property
+    def is_connected(self):
+        return time.monotonic() >= self._down_until
+
+    # ----- yordamchilar -----
+
+    def _expires_at(self, timeout):
+        """Django timeout -> absolyut muddat (None - muddatsiz)"""
+        return self.get_backend_timeout(timeout)
+
+    @staticmethod
+    def _expired(expires_at):
+        # timeout=0 yoki manfiy - keshlanmaydi
+        return expires_at is not None and expires_at <= time.time()
+
+    @staticmethod
+    def _dumps(value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data):
+        return pickle.loads(data)
+
+    # ----- Django kesh API -----
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires_at = self._expires_at(timeout)
+        if self._expired(expires_at):
+            return False
+        return self._call('add', key, self._dumps(value), expires_at)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data = self._call('get', key)
+        return default if data is None else self._loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires_at = self._expires_at(timeout)
+        if self._expired(expires_at):
+            self._call('delete', key)
+            return
+        self._call('set', key, self._dumps(value), expires_at)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires_at = self._expires_at(timeout)
+        if self._expired(expires_at):
+            return self._call('delete', key)
+        return self._call('touch', key, expires_at)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._call('delete', key)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._call('has_key', key)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._call('incr', key, delta)
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def incr_or_add(self, key, delta=1, timeout=DEFAULT_TIMEOUT, version=None, initial=0):
+        """
+        Atomar: kalit bo'lsa oshirish, bo'lmasa initial + delta bilan yaratish (timeout bilan)
+        Rate limiting va hisoblagichlar uchun (get + set poygasisiz)
+        """
+        key = self.make_and_validate_key(key, version=version)
+        return self._call('incr', key, delta, initial, self._expires_at(timeout))
+
+    def ttl(self, key, version=None):
+        """Qolgan muddat (soniya); muddatsiz - None; kalit yo'q - -1"""
+        key = self.make_and_validate_key(key, version=version)
+        return self._call('ttl', key)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = self._call('get_many', list(key_map))
+        return {key_map[key]: self._loads(data) for key, data in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires_at = self._expires_at(timeout)
+        items = {self.make_and_validate_key(key, version=version): self._dumps(value) for key, value in data.items()}
+        if self._expired(expires_at):
+            self._call('delete_many', list(items))
+        else:
+            self._call('set_many', items, expires_at)
+        return []
+
+    def delete_many(self, keys, version=None):
+        self._call('delete_many', [self.make_and_validate_key(key, version=version) for key in keys])
+
+    def clear(self):
+        self._fallback.clear()
+        self._call('clear')
+
+    def stats(self):
+        """Server (yoki lokal zaxira) statistikasi"""
+        result = self._call('stats')
+        result['connected'] = self.is_connected
+        return result
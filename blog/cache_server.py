@@ -0,0 +1,353 @@
+"""
+Umumiy (shared) xotiradagi kesh serveri
+Barcha gunicorn workerlari bitta lokal socket orqali ulanadi: fayl ochish/unpickle o'rniga
+xotiradan o'qiladi. Atomar incr, TTL va LRU (yozuvlar soni va hajm bo'yicha) qo'llab-quvvatlanadi.
+
+Protokol: har bir xabar = 4 bayt uzunlik (big-endian) + HMAC-SHA256 + pickle (buyruq, argumentlar).
+HMAC kaliti SECRET_KEY (yoki CACHE_SERVER_SECRET) dan olinadi - imzosi to'g'ri kelmagan xabar
+unpickle qilinmaydi (TCP 127.0.0.1 da boshqa lokal foydalanuvchi ham ulanishi mumkin).
+Qiymatlar klient tomonida pickle qilinadi - server ularni bayt sifatida saqlaydi
+(faqat incr qiymatni ochadi).
+"""
+import os
+import hmac
+import time
+import pickle
+import hashlib
+import struct
+import socket
+import logging
+import threading
+import socketserver
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('!I')
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+MAC_SIZE = hashlib.sha256().digest_size
+# Bundan katta xabar uzunligi - buzilgan yoki begona klient (xotira ajratilmaydi)
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+class AuthenticationError(ConnectionError):
+    """Xabar imzosi mos kelmadi - ulanish yopiladi"""
+
+
+def auth_key(secret=None):
+    """Klient va server uchun umumiy HMAC kaliti (bir xil SECRET_KEY bilan ishlaydi)"""
+    if secret is None:
+        from django.conf import settings
+        secret = getattr(settings, 'CACHE_SERVER_SECRET', None) or settings.SECRET_KEY
+    return hashlib.sha256(f"blog.cache_server:{secret}".encode()).digest()
+
+
+def parse_location(location):
+    """
+    LOCATION ni socket manziliga aylantirish
+    'host:port' -> TCP, boshqasi -> unix socket fayli
+    :return: (family, address)
+    """
+    location = str(location)
+    host, sep, port = location.rpartition(':')
+    if sep and port.isdigit() and '/' not in location and '\\' not in location:
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError("Bu tizimda unix socket yo'q - LOCATION ni 'host:port' ko'rinishida bering")
+    return socket.AF_UNIX, location
+
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Ulanish uzildi")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _sign(key, data):
+    return hmac.new(key, data, hashlib.sha256).digest()
+
+
+def send_message(sock, obj, key):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + _sign(key, data) + data)
+
+
+def recv_message(sock, key):
+    size, = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise AuthenticationError(f"Xabar juda katta: {size} bayt")
+    mac = recv_exact(sock, MAC_SIZE)
+    data = recv_exact(sock, size)
+    # Imzo tekshirilmaguncha pickle ochilmaydi
+    if not hmac.compare_digest(mac, _sign(key, data)):
+        raise AuthenticationError("Xabar imzosi noto'g'ri")
+    return pickle.loads(data)
+
+
+class CacheStore:
+    """
+    LRU + TTL kesh (thread-safe).
+    Qiymatlar pickle qilingan bayt; muddat - time.time() bo'yicha, None - muddatsiz.
+    Serverda ham, server ishlamaganda klientning lokal zaxira keshi sifatida ham ishlatiladi.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # key -> (value_bytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def _remove(self, key):
+        value, _ = self._data.pop(key)
+        self._bytes -= len(value) + len(key)
+
+    def _store(self, key, value, expires_at):
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires_at)
+        self._bytes += len(value) + len(key)
+        # LRU: eng uzoq ishlatilmaganlar boshida
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return item[0]
+
+    def get_many(self, keys):
+        with self._lock:
+            now = time.time()
+            result = {}
+            for key in keys:
+                item = self._live(key, now)
+                if item is not None:
+                    result[key] = item[0]
+            self.hits += len(result)
+            self.misses += len(keys) - len(result)
+            return result
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._store(key, value, expires_at)
+        return True
+
+    def set_many(self, items, expires_at):
+        with self._lock:
+            for key, value in items.items():
+                self._store(key, value, expires_at)
+        return True
+
+    def add(self, key, value, expires_at):
+        with self._lock:
+            if self._live(key, time.time()) is not None:
+                return False
+            self._store(key, value, expires_at)
+            return True
+
+    def touch(self, key, expires_at):
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                return False
+            self._data[key] = (item[0], expires_at)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                return True
+            return False
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._remove(key)
+        return True
+
+    def has_key(self, key):
+        with self._lock:
+            return self._live(key, time.time()) is not None
+
+    def incr(self, key, delta, default=None, expires_at=None):
+        """
+        Atomar oshirish. Kalit yo'q bo'lsa: default berilgan bo'lsa shu qiymatdan boshlanadi
+        (expires_at bilan), aks holda None (klient ValueError beradi).
+        :return: yangi qiymat yoki None
+        """
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                if default is None:
+                    return None
+                value, item_expires = default, expires_at
+            else:
+                value, item_expires = pickle.loads(item[0]), item[1]
+            value += delta
+            self._store(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), item_expires)
+            return value
+
+    def ttl(self, key):
+        """Qolgan muddat (soniya), muddatsiz bo'lsa None, kalit yo'q bo'lsa -1"""
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                return -1
+            return None if item[1] is None else max(0.0, item[1] - time.time())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+        return True
+
+    def purge_expired(self):
+        """Muddati o'tgan yozuvlarni tozalash (server fon oqimi)"""
+        with self._lock:
+            now = time.time()
+            expired = [key for key, (_, expires_at) in self._data.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                self._remove(key)
+            return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Server qabul qiladigan buyruqlar (CacheStore metodlari)
+COMMANDS = frozenset([
+    'get', 'get_many', 'set', 'set_many', 'add', 'touch', 'delete', 'delete_many',
+    'has_key', 'incr', 'ttl', 'clear', 'stats', 'ping',
+])
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Bitta klient ulanishi - ulanish yopilguncha so'rovlarni bajaradi"""
+
+    def handle(self):
+        store = self.server.store
+        key = self.server.auth_key
+        while True:
+            try:
+                command, args = recv_message(self.request, key)
+            except AuthenticationError as e:
+                logger.warning(f"CACHE_SERVER: klient rad etildi: {e}")
+                return
+            except (ConnectionError, OSError, EOFError, struct.error):
+                return
+            try:
+                if command == 'ping':
+                    result = ('ok', 'pong')
+                elif command in COMMANDS:
+                    result = ('ok', getattr(store, command)(*args))
+                else:
+                    result = ('error', f"Noma'lum buyruq: {command}")
+            except Exception as e:
+                result = ('error', str(e))
+            try:
+                send_message(self.request, result, key)
+            except OSError:
+                return
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _ThreadingUnixServer = None
+
+
+def create_server(location, store, key=None):
+    """
+    Socket serverini yaratish (unix socket fayli faqat egasi uchun ochiq)
+    :param key: HMAC kaliti; None - auth_key() (SECRET_KEY dan)
+    """
+    family, address = parse_location(location)
+    if family == socket.AF_INET:
+        server = _ThreadingTCPServer(address, _RequestHandler)
+    else:
+        if os.path.exists(address):
+            # Oldingi ishga tushirishdan qolgan fayl - boshqa server ishlayaptimi tekshirish
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(address)
+                raise OSError(f"Kesh serveri allaqachon ishlayapti: {address}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(address)
+            finally:
+                probe.close()
+        os.makedirs(os.path.dirname(address) or '.', exist_ok=True)
+        old_umask = os.umask(0o077)
+        try:
+            server = _ThreadingUnixServer(address, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+    server.store = store
+    server.auth_key = key or auth_key()
+    return server
+
+
+def serve(location, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, purge_interval=60, key=None):
+    """Kesh serverini ishga tushirish (bloklaydi)"""
+    store = CacheStore(max_entries=max_entries, max_bytes=max_bytes)
+    server = create_server(location, store, key)
+
+    def purge_loop():
+        while True:
+            time.sleep(purge_interval)
+            removed = store.purge_expired()
+            if removed:
+                logger.info(f"CACHE_SERVER: {removed} ta muddati o'tgan yozuv tozalandi")
+
+    threading.Thread(target=purge_loop, daemon=True).start()
+    logger.info(f"CACHE_SERVER: {location} da ishga tushdi (max {max_entries} yozuv, {max_bytes // 1024 // 1024} MB)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        family, address = parse_location(location)
+        if family != socket.AF_INET and os.path.exists(address):
+            os.remove(address)
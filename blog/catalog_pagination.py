@@ -0,0 +1,234 @@
+"""
+Katalog ro'yxatlari uchun keyset (seek) sahifalash
+Paginator har so'rovda COUNT(*) va chuqur sahifalarda OFFSET skan qiladi; bu yerda keyingi sahifa
+oldingi sahifaning oxirgi qatori qiymatlaridan boshlanadi:
+    WHERE (views_count, id) < (oxirgi_views, oxirgi_id) ORDER BY views_count DESC, id DESC LIMIT n
+Indekslangan ustunlar bo'yicha 100-sahifa ham 1-sahifa narxida.
+
+Kursor - imzolangan (shaffof bo'lmagan) qator qiymatlari; umumiy son - keshlangan taxminiy statistika.
+"""
+import hashlib
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 24
+COUNT_TTL = 60 * 5
+CURSOR_SALT = 'blog.catalog_pagination.cursor'
+
+
+def _ordering(queryset):
+    """Queryset tartibi [(maydon, kamayuvchi), ...], oxirida yagona kalit - pk (teng qiymatlar uchun)"""
+    fields = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    ordering = []
+    for field in fields:
+        if not isinstance(field, str) or field == '?':
+            raise ValueError(f"Keyset sahifalash uchun tartib maydoni kerak: {field!r}")
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        ordering.append(('id' if name == 'pk' else name, descending))
+    if not any(name == 'id' for name, _ in ordering):
+        ordering.append(('id', ordering[0][1] if ordering else False))
+    return ordering
+
+
+def _seek(ordering, values):
+    """
+    Berilgan qatordan keyingi qatorlar sharti (qatorlar bo'yicha taqqoslash):
+    (a < x) OR (a = x AND b < y) OR (a = x AND b = y AND id < z)
+    Birinchi ustun uchun qo'shimcha a <= x - indeks oralig'ini toraytiradi.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(ordering, values):
+        condition |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+        equal &= Q(**{name: value})
+    first, descending = ordering[0]
+    return Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+
+def _reverse(ordering):
+    return [(name, not descending) for name, descending in ordering]
+
+
+def _order_by(ordering):
+    return [f"-{name}" if descending else name for name, descending in ordering]
+
+
+def _row_values(obj, ordering):
+    return [getattr(obj, name) for name, _ in ordering]
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(model, name, value):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Annotatsiya (masalan search_rank) - JSON qiymati o'zicha
+        return value
+    return field.to_python(value)
+
+
+def make_cursor(ordering, values, backward=False):
+    return signing.dumps(
+        {'o': _order_by(ordering), 'v': [_dump_value(value) for value in values], 'b': backward},
+        salt=CURSOR_SALT, compress=True,
+    )
+
+
+def read_cursor(cursor, ordering, model):
+    """
+    :return: (qiymatlar, orqagami) yoki None - kursor noto'g'ri yoki boshqa tartib uchun
+    (masalan foydalanuvchi tabni almashtirgan)
+    """
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    if data.get('o') != _order_by(ordering) or len(data.get('v', [])) != len(ordering):
+        return None
+    try:
+        values = [_load_value(model, name, value) for (name, _), value in zip(ordering, data['v'])]
+    except Exception:
+        return None
+    return values, bool(data.get('b'))
+
+
+def _table_estimate(model):
+    """PostgreSQL statistikasi (ANALYZE/autovacuum) bo'yicha jadvaldagi qatorlar soni; yo'q bo'lsa None"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def approximate_count(queryset):
+    """
+    Taxminiy umumiy son - har so'rovda COUNT(*) emas:
+        - filtrsiz jadval (PostgreSQL): pg_class.reltuples
+        - boshqalar: aniq COUNT, lekin bir xil so'rov uchun COUNT_TTL davomida keshlanadi
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'catalog_count_' + hashlib.sha1(f"{sql}|{params}".encode()).hexdigest()
+    count = cache.get(key)
+    if count is not None:
+        return count
+
+    count = None
+    if not queryset.query.where:
+        count = _table_estimate(queryset.model)
+    if count is None:
+        count = queryset.count()
+    cache.set(key, count, COUNT_TTL)
+    return count
+
+
+class KeysetPage:
+    """Sahifa: Paginator Page ga o'xshash (iteratsiya, has_next/has_previous), lekin raqam o'rniga kursorlar"""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor, count):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # Taxminiy (keshlangan statistika) - "~1 200 ta kitob" ko'rinishida ko'rsatish uchun
+        self.count = count
+        self.count_is_approximate = True
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+def cursor_for_page(queryset, page, per_page=PAGE_SIZE):
+    """
+    Eski ?page=N havolalari uchun: N-sahifani boshlaydigan kursor (bir martalik OFFSET so'rovi)
+    :return: kursor yoki None - birinchi sahifa, noto'g'ri raqam yoki ro'yxatdan tashqarida
+    """
+    try:
+        page = int(page)
+    except (TypeError, ValueError):
+        return None
+    if page <= 1:
+        return None
+    ordering = _ordering(queryset)
+    # Oldingi sahifaning oxirgi qatori - get_page keyingi sahifani shundan boshlaydi
+    row = queryset.order_by(*_order_by(ordering))[(page - 1) * per_page - 1:(page - 1) * per_page].first()
+    if row is None:
+        return None
+    return make_cursor(ordering, _row_values(row, ordering))
+
+
+def get_page(queryset, cursor=None, per_page=PAGE_SIZE):
+    """
+    Keyset sahifa
+    :param queryset: tartiblangan queryset (tartib ustunlari NULL bo'lmasligi kerak)
+    :param cursor: oldingi javobdagi next_cursor / previous_cursor; None - birinchi sahifa
+    """
+    ordering = _ordering(queryset)
+    decoded = read_cursor(cursor, ordering, queryset.model) if cursor else None
+    values, backward = decoded if decoded else (None, False)
+
+    if backward:
+        # Oldingi sahifa: teskari tartibda o'qib, natijani qaytarish
+        rows = list(queryset.filter(_seek(_reverse(ordering), values)).order_by(*_order_by(_reverse(ordering)))[:per_page + 1])
+        has_previous = len(rows) > per_page
+        object_list = rows[:per_page][::-1]
+        has_next = True
+    else:
+        base = queryset.order_by(*_order_by(ordering))
+        if values is not None:
+            base = base.filter(_seek(ordering, values))
+        rows = list(base[:per_page + 1])
+        has_next = len(rows) > per_page
+        object_list = rows[:per_page]
+        has_previous = values is not None
+
+    next_cursor = previous_cursor = None
+    if object_list:
+        if has_next:
+            next_cursor = make_cursor(ordering, _row_values(object_list[-1], ordering))
+        if has_previous:
+            previous_cursor = make_cursor(ordering, _row_values(object_list[0], ordering), backward=True)
+
+    return KeysetPage(
+        object_list, has_next, has_previous, next_cursor, previous_cursor,
+        approximate_count(queryset.order_by()),
+    )
@@ -0,0 +1,178 @@
+"""
+Katalog qidiruvi (kitob nomi + adib ismi) - trigram o'xshashligi bo'yicha
+"Navoi" -> "Navoiy", "Навоий" -> "Navoiy" kabi xato va yozuv farqlariga chidamli.
+
+Har bir kitobda Book.search_key saqlanadi: nom va adib ismi kichik harf, lotin yozuvida,
+apostroflarsiz. Qidiruv shu ustun bo'yicha:
+    PostgreSQL - pg_trgm operatori (%>) va GIN indeks (migratsiya 0022)
+    boshqa bazalar (SQLite) - jarayon ichidagi trigram indeks (numpy)
+"""
+import re
+import time
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+
+from .uzbek_text import fold
+
+logger = logging.getLogger(__name__)
+
+# So'zning kamida shuncha trigrami kitobda bo'lsa mos keladi (pg_trgm word_similarity ga yaqin)
+SIMILARITY_THRESHOLD = getattr(settings, 'CATALOG_SEARCH_THRESHOLD', 0.5)
+MAX_RESULTS = getattr(settings, 'CATALOG_SEARCH_MAX_RESULTS', 1000)
+INDEX_VERSION_KEY = 'catalog_trigram_version'
+
+WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    """uzbek_text.fold + apostroflarsiz (o'zbek == ozbek == ўзбек)"""
+    return ' '.join(WORD_RE.findall(fold(text).replace("'", '')))
+
+
+def search_key_for(title, author_name=''):
+    return normalize(f"{title} {author_name}")
+
+
+def _word_trigrams(folded):
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigrams(text):
+    """pg_trgm uslubida trigramlar: har bir so'z '  so'z ' ko'rinishida to'ldiriladi"""
+    return _word_trigrams(normalize(text))
+
+
+def bump_index_version():
+    """Kitob/adib o'zgarganda - barcha jarayonlardagi indeks qayta quriladi"""
+    try:
+        cache.set(INDEX_VERSION_KEY, time.time(), None)
+    except Exception as e:
+        logger.warning(f"CATALOG_SEARCH: indeks versiyasini yangilab bo'lmadi: {e}")
+
+
+class TrigramIndex:
+    """
+    Jarayon ichidagi trigram indeks: trigram -> kitob o'rinlari (numpy massivlari).
+    Ball: so'rov trigramlaridan kitobda borlari ulushi; tenglikda Jaccard o'xshashligi.
+    """
+
+    def __init__(self, rows):
+        """:param rows: (book_id, search_key) juftliklari (search_key allaqachon normalize qilingan)"""
+        self.vocabulary = {}
+        ids = []
+        sizes = []
+        codes = []
+        positions = []
+        for position, (book_id, key) in enumerate(rows):
+            grams = _word_trigrams(key)
+            ids.append(book_id)
+            sizes.append(len(grams))
+            codes.extend(self.vocabulary.setdefault(gram, len(self.vocabulary)) for gram in grams)
+            positions.extend([position] * len(grams))
+
+        # CSR ko'rinishi: trigram kodi bo'yicha saralangan o'rinlar + har bir kod chegarasi
+        codes = np.asarray(codes, dtype=np.int32)
+        order = np.argsort(codes, kind='stable')
+        self.positions = np.asarray(positions, dtype=np.int32)[order]
+        self.bounds = np.searchsorted(codes[order], np.arange(len(self.vocabulary) + 1))
+        self.book_ids = np.asarray(ids, dtype=np.int64)
+        self.sizes = np.asarray(sizes, dtype=np.float32)
+
+    def _postings(self, gram):
+        code = self.vocabulary.get(gram)
+        if code is None:
+            return None
+        return self.positions[self.bounds[code]:self.bounds[code + 1]]
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def search(self, query, threshold=SIMILARITY_THRESHOLD, limit=MAX_RESULTS):
+        """:return: [(book_id, ball), ...] ball bo'yicha kamayish tartibida"""
+        grams = trigrams(query)
+        lists = [postings for postings in map(self._postings, grams) if postings is not None]
+        if not grams or not lists or not len(self):
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self)).astype(np.float32)
+        word_similarity = shared / len(grams)
+        jaccard = shared / (len(grams) + self.sizes - shared)
+        score = word_similarity + jaccard * 0.01
+
+        candidates = np.nonzero(word_similarity >= threshold)[0]
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-score[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-score[candidates], kind='stable')]
+        return [(int(self.book_ids[i]), float(round(word_similarity[i], 3))) for i in candidates]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_trigram_index():
+    """Joriy indeks (versiya o'zgargan bo'lsa bazadan qayta quriladi)"""
+    global _index, _index_version
+    from .models import Book
+
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        version = time.time()
+        cache.add(INDEX_VERSION_KEY, version, None)
+        version = cache.get(INDEX_VERSION_KEY, version)
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            started = time.monotonic()
+            _index = TrigramIndex(Book.objects.values_list('id', 'search_key').iterator())
+            _index_version = version
+            logger.info(
+                f"CATALOG_SEARCH: indeks qurildi ({len(_index)} kitob, "
+                f"{time.monotonic() - started:.2f}s)"
+            )
+        return _index
+
+
+def uses_postgres_trigram():
+    return connection.vendor == 'postgresql'
+
+
+def search_books(queryset, query):
+    """
+    Kitoblar querysetini so'rov bo'yicha filtrlash va o'xshashlik bo'yicha saralash
+    Natijada search_rank annotatsiyasi bo'ladi.
+    """
+    folded = normalize(query)
+    if not folded:
+        return queryset
+
+    if uses_postgres_trigram():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(SIMILARITY_THRESHOLD)]
+            )
+        return queryset.filter(search_key__trigram_word_similar=folded).annotate(
+            search_rank=TrigramWordSimilarity(folded, 'search_key'),
+        ).order_by('-search_rank', '-views_count')
+
+    matches = get_trigram_index().search(folded)
+    if not matches:
+        return queryset.none()
+    return queryset.filter(id__in=[book_id for book_id, _ in matches]).annotate(
+        search_rank=Case(
+            *[When(id=book_id, then=Value(score)) for book_id, score in matches],
+            output_field=FloatField(),
+        ),
+    ).order_by('-search_rank', '-views_count')
@@ -0,0 +1,240 @@
+"""
+Konvertatsiya natijalari keshi (content-addressed)
+Kalit: (kiruvchi fayl SHA-256, maqsad format, konverter versiyasi)
+Natijalar diskda saqlanadi, hajm chegarasidan oshsa eng eski ishlatilganlari o'chiriladi (LRU).
+Papka har put() da skan qilinmaydi: jarayon hajmni o'zi yozganlari bo'yicha taxminan sanaydi va
+chegaradan oshganda (yoki EVICT_SCAN_INTERVAL da bir - boshqa jarayonlar ham yozadi) skan qiladi.
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Konvertatsiya kodi o'zgarsa oshiriladi - eski natijalar avtomatik eskiradi
+CONVERTER_VERSION = 1
+
+CONVERSION_CACHE_DIR = getattr(
+    settings, 'CONVERSION_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'conversions')
+)
+CONVERSION_CACHE_MAX_BYTES = getattr(settings, 'CONVERSION_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+
+# Boshqa jarayonlar yozganlarini hisobga olish uchun papka kamida shu oraliqda qayta skan qilinadi (soniya)
+EVICT_SCAN_INTERVAL = 300
+
+HASH_CHUNK_SIZE = 1024 * 1024
+STATS_KEY_PREFIX = 'conversion_cache_'
+
+
+def file_sha256(path):
+    """Faylning SHA-256 xeshi (bo'laklab o'qiladi)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    Diskdagi konvertatsiya keshi.
+    Har bir yozuv: <kalit>.bin (natija) va <kalit>.json (content_type, fayl nomi ...).
+    LRU uchun fayl mtime ishlatiladi - har bir topilishda yangilanadi.
+    Topilgan yozuvni parallel evict o'chirib yuborishi mumkin - o'qish uchun open() ishlatiladi
+    (fayl ochilgach o'chirilsa ham o'qiladi, ochishdan oldin o'chgan bo'lsa - topilmadi).
+    """
+
+    def __init__(self, directory=CONVERSION_CACHE_DIR, max_bytes=CONVERSION_CACHE_MAX_BYTES,
+                 version=CONVERTER_VERSION, stats_prefix=STATS_KEY_PREFIX):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.stats_prefix = stats_prefix
+        self._evict_lock = threading.Lock()
+        # Oxirgi skandan beri taxminiy umumiy hajm (None - hali skan qilinmagan)
+        self._approx_bytes = None
+        self._scanned_at = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, digest, target_format):
+        raw = f"{digest}:{target_format.lower()}:{self.version}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _paths(self, key):
+        folder = os.path.join(self.directory, key[:2])
+        return folder, os.path.join(folder, f'{key}.bin'), os.path.join(folder, f'{key}.json')
+
+    def _lookup(self, digest, target_format):
+        key = self.key(digest, target_format)
+        _, data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            os.utime(data_path)  # LRU: oxirgi ishlatilgan vaqt
+        except (OSError, ValueError):
+            return None
+        return data_path, meta
+
+    def get(self, digest, target_format):
+        """
+        Keshdan natijani olish (faqat meta kerak bo'lsa; o'qish uchun - open())
+        :return: (natija fayl yo'li, meta) yoki None
+        """
+        found = self._lookup(digest, target_format)
+        self._count('hits' if found else 'misses')
+        return found
+
+    def open(self, digest, target_format, mode='rb', **kwargs):
+        """
+        Keshdagi natijani ochish
+        :param kwargs: open() ga (encoding, newline ...)
+        :return: (ochiq fayl, meta) yoki None - yo'q yoki evict orasida o'chirilgan
+        """
+        found = self._lookup(digest, target_format)
+        result = None
+        if found:
+            try:
+                result = open(found[0], mode, **kwargs), found[1]
+            except FileNotFoundError:
+                pass
+        self._count('hits' if result else 'misses')
+        return result
+
+    def put(self, digest, target_format, meta, data=None, source_path=None):
+        """
+        Natijani keshga yozish (data - bytes yoki source_path - tayyor fayl)
+        Yozish atomar: vaqtinchalik faylga yozib, keyin os.replace
+        :return: keshdagi fayl yo'li
+        """
+        key = self.key(digest, target_format)
+        folder, data_path, meta_path = self._paths(key)
+        os.makedirs(folder, exist_ok=True)
+
+        tmp_suffix = f'.{uuid.uuid4().hex}.tmp'
+        tmp_data = data_path + tmp_suffix
+        tmp_meta = meta_path + tmp_suffix
+        try:
+            with open(tmp_data, 'wb') as out:
+                if data is not None:
+                    out.write(data)
+                else:
+                    with open(source_path, 'rb') as src:
+                        for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b''):
+                            out.write(chunk)
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(dict(meta, format=target_format, version=self.version), f, ensure_ascii=False)
+            size = os.path.getsize(tmp_data)
+            os.replace(tmp_data, data_path)
+            os.replace(tmp_meta, meta_path)
+        except OSError as e:
+            logger.error(f"CONVERSION_CACHE: yozish xatosi: {e}")
+            for path in (tmp_data, tmp_meta):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return None
+
+        self._maybe_evict(size)
+        return data_path
+
+    def _maybe_evict(self, added):
+        """Taxminiy hajm chegaradan oshsa yoki skan eskirgan bo'lsa - evict (papkani skan qiladi)"""
+        if self._approx_bytes is not None:
+            self._approx_bytes += added
+        if (self._approx_bytes is None or self._approx_bytes > self.max_bytes
+                or time.monotonic() - self._scanned_at >= EVICT_SCAN_INTERVAL):
+            self.evict()
+
+    def _entries(self):
+        """(mtime, hajm, .bin yo'li) ro'yxati"""
+        entries = []
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith('.bin'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Hajm chegarasidan oshsa eng eski ishlatilgan yozuvlarni o'chirish"""
+        if not self._evict_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, data_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                for path in (data_path, data_path[:-4] + '.json'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+            self._approx_bytes = total
+            self._scanned_at = time.monotonic()
+            if removed:
+                self._count('evictions', removed)
+                logger.info(f"CONVERSION_CACHE: {removed} ta yozuv o'chirildi (LRU)")
+            return removed
+        finally:
+            self._evict_lock.release()
+
+    def clear(self):
+        removed = 0
+        for _, _, data_path in self._entries():
+            for path in (data_path, data_path[:-4] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            removed += 1
+        return removed
+
+    def _count(self, name, amount=1):
+        key = self.stats_prefix + name
+        try:
+            cache.add(key, 0, None)
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, None)
+
+    def stats(self):
+        """Hit/miss hisoblagichlari va disk holati"""
+        entries = self._entries()
+        hits = cache.get(self.stats_prefix + 'hits', 0)
+        misses = cache.get(self.stats_prefix + 'misses', 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': cache.get(self.stats_prefix + 'evictions', 0),
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+
+_conversion_cache = None
+
+
+def get_conversion_cache():
+    global _conversion_cache
+    if _conversion_cache is None:
+        _conversion_cache = ConversionCache()
+    return _conversion_cache
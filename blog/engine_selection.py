@@ -0,0 +1,305 @@
+"""
+Matn chiqarish dvigatelini o'lchangan statistika bo'yicha tanlash
+Qat'iy tartib (fitz -> pdfplumber -> pypdf) o'rniga: benchmark_extraction buyrug'i mahalliy
+namunalar to'plamida har dvigatelning tezligi (soniya/sahifa) va natijasini (belgi/sahifa,
+muvaffaqiyat ulushi) o'lchab EXTRACTION_STATS_FILE ga yozadi. Tanlovchi hujjatning arzon
+belgilari (sahifalar soni, producer, rasmli sahifalar ulushi) bo'yicha guruhni topib,
+shu guruhda eng tez va muvaffaqiyatli bo'lishi kutilgan dvigatelni birinchi qo'yadi.
+
+Statistika bo'lmasa - standart tartib (avvalgi xatti-harakat).
+"""
+import os
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+from .pdf_extraction import available_engines as pdf_engines, fitz, iter_pages
+
+logger = logging.getLogger(__name__)
+
+STATS_FILE = getattr(
+    settings, 'EXTRACTION_STATS_FILE', os.path.join(settings.BASE_DIR, 'cache', 'extraction_stats.json')
+)
+# Guruh statistikasi ishonchli bo'lishi uchun kerakli o'lchovlar soni
+MIN_RUNS = 3
+# Namunaviy sahifalarda o'rtacha shundan kam belgi - matn qatlami yo'q (skaner)
+MIN_CHARS_PER_PAGE = 25
+# PDF dvigateli namunaviy sahifalardagi matn hajmining kamida shu ulushini chiqarsa muvaffaqiyatli
+EXPECTED_TEXT_RATIO = 0.5
+SAMPLE_PAGES = 5
+SCANNED_IMAGE_RATIO = 0.5
+
+DEFAULT_ORDER = {
+    '.pdf': ['pymupdf', 'pdfplumber', 'pypdf'],
+    '.docx': ['python-docx', 'libreoffice'],
+    '.odt': ['odfpy', 'libreoffice'],
+}
+
+_PRODUCER_FAMILIES = (
+    ('microsoft', 'microsoft'), ('word', 'microsoft'), ('libreoffice', 'libreoffice'),
+    ('openoffice', 'libreoffice'), ('tex', 'tex'), ('acrobat', 'adobe'), ('adobe', 'adobe'),
+    ('distiller', 'adobe'), ('reportlab', 'reportlab'), ('skia', 'chrome'), ('chrome', 'chrome'),
+    ('scan', 'scanner'), ('abbyy', 'scanner'), ('ghostscript', 'ghostscript'),
+)
+
+
+# ===== DVIGATELLAR =====
+
+def _pdf_runner(engine):
+    def run(path):
+        # O'lchov bir yadroda - dvigatellar teng sharoitda solishtiriladi
+        return '\n'.join(text for _, text in iter_pages(path, processes=1, engine=engine))
+    return run
+
+
+def _run_docx(path):
+    from .text_extraction import read_docx
+    return read_docx(path)
+
+
+def _run_odfpy(path):
+    from odf import teletype
+    from odf.namespaces import TEXTNS
+    from odf.opendocument import load
+
+    wanted = {(TEXTNS, 'p'), (TEXTNS, 'h')}
+
+    def walk(node):
+        for child in node.childNodes:
+            if getattr(child, 'qname', None) in wanted:
+                yield teletype.extractText(child)
+            else:
+                yield from walk(child)
+
+    return '\n'.join(walk(load(path).text))
+
+
+def _run_libreoffice(path):
+    from .text_extraction import read_with_libreoffice
+    return read_with_libreoffice(path)
+
+
+def engines_for(ext):
+    """Kengaytma uchun mavjud dvigatellar: {nom: funksiya(path) -> matn}"""
+    if ext == '.pdf':
+        return {name: _pdf_runner(name) for name in pdf_engines()}
+    if ext == '.docx':
+        return {'python-docx': _run_docx, 'libreoffice': _run_libreoffice}
+    if ext == '.odt':
+        return {'odfpy': _run_odfpy, 'libreoffice': _run_libreoffice}
+    return {}
+
+
+# ===== HUJJAT BELGILARI =====
+
+def producer_family(producer):
+    producer = (producer or '').lower()
+    for needle, family in _PRODUCER_FAMILIES:
+        if needle in producer:
+            return family
+    return 'other' if producer else 'unknown'
+
+
+def _sample(total):
+    if total <= SAMPLE_PAGES:
+        return list(range(total))
+    step = total / SAMPLE_PAGES
+    return sorted({int(i * step) for i in range(SAMPLE_PAGES)})
+
+
+def _pdf_features(path):
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            total = doc.page_count
+            producer = (doc.metadata or {}).get('producer') or (doc.metadata or {}).get('creator')
+            sample = _sample(total)
+            with_images = sum(1 for index in sample if doc[index].get_images())
+            chars = sum(len(doc[index].get_text().strip()) for index in sample)
+    else:
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        total = len(reader.pages)
+        metadata = reader.metadata or {}
+        producer = metadata.get('/Producer') or metadata.get('/Creator')
+        sample = _sample(total)
+        with_images = 0
+        chars = 0
+        for index in sample:
+            page = reader.pages[index]
+            resources = page.get('/Resources') or {}
+            xobjects = resources.get('/XObject') or {}
+            if any(xobject.get_object().get('/Subtype') == '/Image' for xobject in xobjects.values()):
+                with_images += 1
+            chars += len((page.extract_text() or '').strip())
+    sampled = max(1, len(sample))
+    return {
+        'pages': total,
+        'producer': producer_family(str(producer or '')),
+        'image_ratio': round(with_images / sampled, 2),
+        'chars_per_page': chars // sampled,
+        'sample_chars': chars,
+    }
+
+
+def document_features(path, ext=None):
+    """
+    Arzon belgilar (bir nechta namunaviy sahifa): sahifalar soni, producer oilasi, rasmli sahifalar
+    ulushi, matn qatlami; 'units' - tezlikni normallashtirish birligi (PDF - sahifa, boshqalar - MB)
+    """
+    ext = (ext or os.path.splitext(path)[1]).lower()
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    features = {'ext': ext, 'size_mb': round(size_mb, 3), 'units': max(size_mb, 0.01)}
+    if ext == '.pdf':
+        try:
+            features.update(_pdf_features(path))
+        except Exception as e:
+            logger.warning(f"ENGINE_SELECTION: {os.path.basename(path)} belgilarini o'qib bo'lmadi: {e}")
+            features.update({'pages': 0, 'producer': 'unknown', 'image_ratio': 0, 'chars_per_page': 0, 'sample_chars': 0})
+        features['units'] = max(features['pages'], 1)
+        features['scanned'] = (
+            features['image_ratio'] >= SCANNED_IMAGE_RATIO and features['chars_per_page'] < MIN_CHARS_PER_PAGE
+        )
+    return features
+
+
+def bucket_keys(features):
+    """Statistika guruhlari - aniqrog'idan umumiyrog'iga"""
+    ext = features['ext']
+    if ext != '.pdf':
+        return [ext]
+    kind = 'scanned' if features['scanned'] else 'text'
+    return [f"{ext}:{kind}:{features['producer']}", f"{ext}:{kind}", ext]
+
+
+def succeeded(text, features):
+    """
+    PDF: namunaviy sahifalar hujjatning bir qismi - to'g'ri dvigatel butun hujjatdan kamida shu
+    sahifalardagicha matn chiqaradi. Sahifalarining ko'pi qisqa yoki bo'sh (sahifa raqamlari,
+    rasmlar) PDF ham muvaffaqiyatli, matnning kichik qismini chiqargan dvigatel esa yo'q.
+    """
+    text = (text or '').strip()
+    if features['ext'] != '.pdf':
+        return bool(text)
+    return bool(text) and len(text) >= EXPECTED_TEXT_RATIO * features.get('sample_chars', 0)
+
+
+# ===== STATISTIKA =====
+
+class EngineStats:
+    """
+    {guruh: {dvigatel: {runs, successes, seconds, units, chars}}} - JSON faylda
+    Fayl o'zgarsa (benchmark qayta ishga tushirilsa) keyingi chaqiruvda qayta o'qiladi.
+    """
+
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self.data = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+                self._mtime = mtime
+            except (OSError, ValueError) as e:
+                logger.warning(f"ENGINE_SELECTION: statistikani o'qib bo'lmadi: {e}")
+
+    def record(self, features, engine, seconds, chars, success):
+        for key in bucket_keys(features):
+            entry = self.data.setdefault(key, {}).setdefault(
+                engine, {'runs': 0, 'successes': 0, 'seconds': 0.0, 'units': 0.0, 'chars': 0}
+            )
+            entry['runs'] += 1
+            entry['successes'] += int(success)
+            entry['seconds'] += seconds
+            entry['units'] += features['units']
+            entry['chars'] += chars
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, features, engine):
+        """Eng aniq guruhdagi yetarli o'lchovli yozuv yoki None"""
+        for key in bucket_keys(features):
+            entry = self.data.get(key, {}).get(engine)
+            if entry and entry['runs'] >= MIN_RUNS:
+                return entry
+        return None
+
+
+def expected_cost(entry):
+    """Muvaffaqiyatgacha kutilgan vaqt (birlik uchun): tezlik / muvaffaqiyat ehtimoli"""
+    seconds_per_unit = entry['seconds'] / max(entry['units'], 1e-6)
+    success_rate = entry['successes'] / entry['runs']
+    return seconds_per_unit / max(success_rate, 0.05)
+
+
+_stats = EngineStats()
+
+
+def choose(path, ext=None, stats=None):
+    """
+    Dvigatellar tartibi: o'lchanganlari kutilgan narx bo'yicha, qolganlari standart tartibda
+    :return: ([dvigatel nomlari], belgilar)
+    """
+    stats = stats or _stats
+    stats.refresh()
+    features = document_features(path, ext)
+    available = engines_for(features['ext'])
+    default = [name for name in DEFAULT_ORDER.get(features['ext'], []) if name in available]
+
+    def rank(name):
+        entry = stats.lookup(features, name)
+        if entry is None:
+            return (1, default.index(name))
+        return (0, expected_cost(entry))
+
+    return sorted(available, key=rank), features
+
+
+def best_pdf_engine(path):
+    """BookPageWriter oqimi uchun birinchi tanlov; aniqlab bo'lmasa None (standart)"""
+    try:
+        return choose(path, '.pdf')[0][0]
+    except Exception as e:
+        logger.warning(f"ENGINE_SELECTION: {os.path.basename(path)}: {e}")
+        return None
+
+
+def run_best(path, ext=None, run=None):
+    """
+    Dvigatellarni tanlangan tartibda ishlatish - birinchi muvaffaqiyatli natija qaytadi
+    :param run: run(nom, path) -> matn; None - engines_for() dagi funksiyalar
+    :return: (matn, dvigatel nomi) - hech biri muvaffaqiyatli bo'lmasa eng uzun matn va None
+    """
+    engines, features = choose(path, ext)
+    available = engines_for(features['ext'])
+    run = run or (lambda name, file_path: available[name](file_path))
+    best = ''
+    for name in engines:
+        try:
+            text = run(name, path) or ''
+        except Exception as e:
+            logger.warning(f"ENGINE_SELECTION: {name} {os.path.basename(path)}: {e}")
+            continue
+        if succeeded(text, features):
+            return text, name
+        best = max(best, text, key=len)
+        # Skaner hujjatda boshqa matn dvigatellari ham bo'sh qaytaradi - behuda o'tishlar yo'q
+        if features.get('scanned'):
+            break
+    return best, None
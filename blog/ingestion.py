@@ -0,0 +1,428 @@
+"""
+Kitob yuklash navbati (ZIP import va bitta kitob yuklash)
+Yuklash so'rovi faqat IngestionJob yaratadi, og'ir ish (tahlil, AI, sahifalar, OCR)
+run_ingestion_worker buyrug'i tomonidan fonda bajariladi.
+"""
+import os
+import time
+import socket
+import zipfile
+import tempfile
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = ['.pdf', '.docx', '.doc', '.txt']
+UNKNOWN_AUTHOR_NAMES = ['noma\'lum', 'noma\'lum muallif', 'unknown', 'nomalum']
+
+# Bir vaqtda fayllarni tahlil qiluvchi jarayonlar soni
+INGESTION_PROCESSES = getattr(settings, 'INGESTION_WORKER_PROCESSES', 2)
+# Shuncha vaqt yangilanmagan 'running' vazifa o'lgan worker'niki hisoblanadi
+STALE_JOB_TIMEOUT = timedelta(minutes=30)
+# Bajarilayotgan vazifa updated_at i shu oraliqda yangilanadi (STALE_JOB_TIMEOUT dan ancha kichik)
+HEARTBEAT_INTERVAL = 60
+
+
+def enqueue_zip(uploaded_file, user=None):
+    """
+    ZIP faylni saqlab, navbatga vazifa qo'shish
+    :return: IngestionJob
+    """
+    from .models import IngestionJob
+
+    if not zipfile.is_zipfile(uploaded_file):
+        raise zipfile.BadZipFile("Noto'g'ri ZIP fayl")
+    uploaded_file.seek(0)
+
+    job = IngestionJob(original_name=uploaded_file.name[:255], user=user)
+    job.archive.save(os.path.basename(uploaded_file.name), uploaded_file, save=False)
+    job.save()
+    logger.info(f"INGESTION: job={job.pk} navbatga qo'shildi ({job.original_name})")
+    return job
+
+
+def enqueue_book(book, user=None):
+    """
+    Yuklangan kitob sahifalarini (matn chiqarish, OCR) fonda tayyorlash uchun navbatga qo'shish
+    :return: IngestionJob
+    """
+    from .models import IngestionJob
+
+    job = IngestionJob.objects.create(
+        book=book, original_name=os.path.basename(book.file.name)[:255], user=user,
+    )
+    logger.info(f"INGESTION: job={job.pk} book={book.pk} navbatga qo'shildi")
+    return job
+
+
+def requeue_stale_jobs():
+    """To'xtab qolgan (worker o'lgan) vazifalarni qayta navbatga qo'yish"""
+    from .models import IngestionJob
+
+    deadline = timezone.now() - STALE_JOB_TIMEOUT
+    return IngestionJob.objects.filter(status='running', updated_at__lt=deadline).update(
+        status='pending', worker='', updated_at=timezone.now()
+    )
+
+
+def claim_next_job(worker_id):
+    """
+    Navbatdagi vazifani olish - bir vazifani faqat bitta worker oladi
+    (status='pending' sharti bilan UPDATE - atomar)
+    """
+    from .models import IngestionJob
+
+    candidates = IngestionJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:5]
+    for job_id in candidates:
+        claimed = IngestionJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', worker=worker_id, started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            return IngestionJob.objects.get(pk=job_id)
+    return None
+
+
+class _Heartbeat:
+    """
+    Bajarilayotgan vazifa updated_at ini yangilab turish - bitta uzoq fayl (masalan OCR qilinadigan
+    katta PDF) paytida requeue_stale_jobs vazifani o'lgan worker'niki deb qayta navbatga qo'ymasin.
+    beat() - tsikldan chaqiriladi; with _Heartbeat(job): - blok davomida fon oqimida
+    """
+
+    def __init__(self, job, interval=HEARTBEAT_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self._last = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def beat(self, force=False):
+        from .models import IngestionJob
+
+        if not force and time.monotonic() - self._last < self.interval:
+            return
+        self._last = time.monotonic()
+        try:
+            IngestionJob.objects.filter(pk=self.job.pk, status='running').update(updated_at=timezone.now())
+        except Exception as e:
+            logger.warning(f"INGESTION: job={self.job.pk} heartbeat xatosi: {e}")
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                self.beat(force=True)
+        finally:
+            # Fon oqimi ochgan baza ulanishi
+            connections.close_all()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name=f'ingestion-heartbeat-{self.job.pk}', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _init_parser_process():
+    """Tahlil jarayonini tayyorlash (spawn rejimida Django sozlanmagan bo'ladi)"""
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+class _PageCollector:
+    """BookPageWriter o'rniga - sahifalarni faqat ro'yxatga yig'adi (bazasiz)"""
+
+    def __init__(self):
+        self.pages = []
+
+    def add(self, page_number, text):
+        self.pages.append((page_number, text))
+
+
+def read_preview(path, ext):
+    """AI uchun fayl boshidagi matnni o'qish (txt - to'liq, pdf - 10 sahifa, docx - 50 paragraf)"""
+    content = ""
+    if ext == '.txt':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except UnicodeDecodeError:
+            with open(path, 'r', encoding='latin-1') as f:
+                content = f.read()
+    elif ext == '.pdf':
+        try:
+            from pypdf import PdfReader
+            reader = PdfReader(path)
+            for page in reader.pages[:10]:
+                content += page.extract_text() or ""
+        except Exception:
+            content = ""
+    elif ext in ['.docx', '.doc']:
+        try:
+            from docx import Document
+            doc = Document(path)
+            for para in doc.paragraphs[:50]:
+                content += para.text + "\n"
+        except Exception:
+            content = ""
+    return content
+
+
+def parse_file(path):
+    """
+    Bitta faylni tahlil qilish - alohida jarayonda ishlaydi, bazaga yozmaydi
+    :return: {'content': AI uchun matn, 'pages': [(raqam, matn), ...], 'error': ...}
+    """
+    from .models import Book
+
+    ext = os.path.splitext(path)[1].lower()
+    started = time.monotonic()
+    result = {'content': read_preview(path, ext), 'pages': [], 'error': None}
+    collector = _PageCollector()
+    try:
+        Book._write_pages_from_file(collector, path, path.lower())
+    except Exception as e:
+        result['error'] = str(e)
+    result['pages'] = collector.pages
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
+
+
+def _book_metadata(content, base_name):
+    """AI (bo'lmasa fayl nomi) orqali kitob ma'lumotlarini aniqlash"""
+    from .views import ai_extract_book_info
+
+    title_from_file = os.path.splitext(base_name)[0]
+    book_info = ai_extract_book_info(content, base_name)
+
+    if book_info:
+        author_name = (book_info.get('author') or '').strip()
+        title = book_info.get('title') or title_from_file
+        year = book_info.get('year')
+        description = book_info.get('description') or ''
+    else:
+        author_name = ''
+        title = title_from_file
+        year = None
+        description = ''
+
+    if not author_name or author_name.lower() in UNKNOWN_AUTHOR_NAMES:
+        author_name = 'Noma\'lum muallif'
+
+    # Tavsif bo'sh bo'lsa, birinchi 5 qatorni olish
+    if not description and content:
+        lines = content.strip().split('\n')[:5]
+        description = '\n'.join(line.strip() for line in lines if line.strip())
+        if len(description) > 500:
+            description = description[:500] + '...'
+
+    if not isinstance(year, int):
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            year = None
+
+    return title, author_name, year, description
+
+
+def _save_book(job_file, path, parsed):
+    """Tahlil natijasidan Author/Book/BookPage yaratish (asosiy jarayonda)"""
+    from django.core.files import File as DjangoFile
+    from .models import Author, Book
+    from .page_writer import BookPageWriter
+
+    base_name = os.path.basename(job_file.name)
+    title, author_name, year, description = _book_metadata(parsed['content'], base_name)
+
+    author = Author.objects.filter(name__iexact=author_name).first()
+    if not author:
+        author = Author.objects.create(name=author_name)
+
+    if Book.objects.filter(title__iexact=title, author=author).exists():
+        job_file.status = 'exists'
+        job_file.message = f'Kitob bazada mavjud: "{title}" ({author_name})'
+        return
+
+    book = Book(
+        title=title,
+        description=description,
+        author=author,
+        year_written=year
+    )
+    with open(path, 'rb') as f:
+        book.file.save(base_name, DjangoFile(f), save=False)
+    book.save()
+
+    stats = None
+    if parsed['pages']:
+        with BookPageWriter(book) as writer:
+            for page_number, text in parsed['pages']:
+                writer.add(page_number, text)
+        stats = writer.stats
+
+    job_file.status = 'success'
+    job_file.book = book
+    job_file.result = {
+        'title': title,
+        'author': author_name,
+        'year': year,
+        'description': description[:100] + '...' if len(description) > 100 else description,
+        'pages': stats['pages'] if stats else 0,
+        'parse_seconds': parsed.get('seconds'),
+    }
+    if parsed['error']:
+        job_file.message = f"Sahifalar xatosi: {parsed['error']}"
+
+
+def process_job(job, processes=INGESTION_PROCESSES, on_tick=None, tick_interval=5):
+    """
+    Vazifani bajarish: arxivni ochish, fayllarni parallel tahlil qilish,
+    natijalarni ketma-ket bazaga yozish va progressni yangilash (bitta kitob - uning sahifalari)
+    :param on_tick: har natijadan keyin va kamida tick_interval soniyada chaqiriladi
+        (worker davriy ishlari - katta vazifa davomida ham kechikmasin)
+    """
+    from .models import IngestionJob
+
+    started = time.monotonic()
+    try:
+        if job.book_id:
+            _process_book_job(job)
+        else:
+            _process_archive(job, processes, on_tick, tick_interval)
+        IngestionJob.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now())
+    except Exception as e:
+        logger.error(f"INGESTION: job={job.pk} xato: {e}")
+        IngestionJob.objects.filter(pk=job.pk).update(status='failed', error=str(e), finished_at=timezone.now())
+
+    job.refresh_from_db()
+    logger.info(
+        f"INGESTION: job={job.pk} status={job.status} "
+        f"{job.processed_files}/{job.total_files} fayl, {time.monotonic() - started:.1f}s"
+    )
+    return job
+
+
+def _process_archive(job, processes, on_tick, tick_interval):
+    """ZIP: fayllar jarayonlar hovuzida tahlil qilinadi, natijalar shu jarayonda bazaga yoziladi"""
+    from .models import IngestionJob, IngestionJobFile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with job.archive.open('rb') as archive, zipfile.ZipFile(archive) as zf:
+            members = [name for name in zf.namelist() if not name.endswith('/')]
+
+            # Qayta ishga tushirilgan vazifa - eski natijalar o'rniga yangilari
+            job.files.all().delete()
+            to_parse = {}
+            job_files = []
+            for name in members:
+                ext = os.path.splitext(name)[1].lower()
+                if ext not in ALLOWED_EXTENSIONS:
+                    job_files.append(IngestionJobFile(
+                        job=job, name=name, status='skipped',
+                        message=f'Qo\'llab-quvvatlanmaydigan format: {ext}'
+                    ))
+                    continue
+                # Zip Slip dan himoya: fayllar vaqtinchalik papkaga tekis chiqariladi
+                target = os.path.join(temp_dir, f"{len(to_parse)}_{os.path.basename(name)}")
+                with zf.open(name) as src, open(target, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                        dst.write(chunk)
+                job_files.append(IngestionJobFile(job=job, name=name))
+                to_parse[name] = target
+
+        IngestionJobFile.objects.bulk_create(job_files)
+        skipped = len(members) - len(to_parse)
+        IngestionJob.objects.filter(pk=job.pk).update(
+            total_files=len(members), processed_files=skipped, updated_at=timezone.now()
+        )
+        pending = {f.name: f for f in job.files.filter(status='pending')}
+
+        # Forkdan oldin ulanishlarni yopish - bolalar jarayon bilan bitta ulanish bo'lmasin
+        connections.close_all()
+        heartbeat = _Heartbeat(job)
+        with ProcessPoolExecutor(max_workers=max(1, processes), initializer=_init_parser_process) as pool:
+            futures = {pool.submit(parse_file, path): name for name, path in to_parse.items()}
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, timeout=tick_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures[future]
+                    job_file = pending[name]
+                    try:
+                        _save_book(job_file, to_parse[name], future.result())
+                    except Exception as e:
+                        logger.error(f"INGESTION: job={job.pk} {name}: {e}")
+                        job_file.status = 'error'
+                        job_file.message = str(e)
+                    job_file.save()
+                    IngestionJob.objects.filter(pk=job.pk).update(
+                        processed_files=F('processed_files') + 1, updated_at=timezone.now()
+                    )
+                # Fayllar uzoq tahlil qilinayotgan bo'lsa ham vazifa tirik
+                heartbeat.beat()
+                if on_tick is not None:
+                    on_tick()
+
+
+def _process_book_job(job):
+    """Bitta kitob: sahifalarni fayldan yozish (PDF - parallel sahifalar va OCR) shu workerda"""
+    from .models import IngestionJob, IngestionJobFile
+
+    job.files.all().delete()
+    job_file = IngestionJobFile.objects.create(job=job, name=job.original_name, book_id=job.book_id)
+    IngestionJob.objects.filter(pk=job.pk).update(total_files=1, processed_files=0, updated_at=timezone.now())
+    try:
+        # Katta PDF (OCR) soatlab ishlashi mumkin - shu vaqt davomida heartbeat fon oqimida
+        with _Heartbeat(job):
+            stats = job.book.save_pages_from_file()
+        job_file.status = 'success'
+        job_file.result = {'title': job.book.title, 'pages': stats['pages'] if stats else 0}
+    except Exception as e:
+        logger.error(f"INGESTION: job={job.pk} book={job.book_id}: {e}")
+        job_file.status = 'error'
+        job_file.message = str(e)
+    job_file.save()
+    IngestionJob.objects.filter(pk=job.pk).update(processed_files=1, updated_at=timezone.now())
+
+
+def job_status(job):
+    """Status endpoint uchun vazifa holati"""
+    files = [
+        {
+            'file': f.name,
+            'status': f.status,
+            'message': f.message,
+            'book_id': f.book_id,
+            **f.result,
+        }
+        for f in job.files.all()
+    ]
+    return {
+        'job_id': job.pk,
+        'status': job.status,
+        'file': job.original_name,
+        'total': job.total_files,
+        'processed': job.processed_files,
+        'progress': job.progress,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'results': files,
+    }
@@ -0,0 +1,78 @@
+"""
+Matn chiqarish dvigatellarini mahalliy namunalar to'plamida o'lchash
+Har fayl uchun har mavjud dvigatel ishga tushiriladi: vaqt, belgilar soni, muvaffaqiyat;
+natija hujjat belgilari guruhlari bo'yicha EXTRACTION_STATS_FILE ga yoziladi va
+engine_selection.choose() shu statistika bo'yicha dvigatel tanlaydi.
+Ishga tushirish: python manage.py benchmark_extraction PAPKA [--repeat N] [--reset]
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.engine_selection import EngineStats, document_features, engines_for, succeeded
+
+EXTENSIONS = ('.pdf', '.docx', '.odt')
+
+
+class Command(BaseCommand):
+    help = "PDF/DOCX/ODT namunalarida dvigatellar tezligi va natijasini o'lchash (dvigatel tanlash uchun)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('corpus', help="Namuna fayllar papkasi (ichki papkalar ham)")
+        parser.add_argument('--repeat', type=int, default=1, help="Har o'lchov necha marta takrorlanadi")
+        parser.add_argument('--reset', action='store_true', help="Eski statistikani o'chirib boshlash")
+
+    def handle(self, *args, **options):
+        corpus = options['corpus']
+        if not os.path.isdir(corpus):
+            raise CommandError(f"Papka topilmadi: {corpus}")
+
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(corpus)
+            for name in names
+            if os.path.splitext(name)[1].lower() in EXTENSIONS
+        )
+        if not files:
+            raise CommandError("Papkada PDF/DOCX/ODT fayllar yo'q")
+
+        stats = EngineStats()
+        if not options['reset']:
+            stats.refresh()
+
+        for path in files:
+            features = document_features(path)
+            for engine, run in engines_for(features['ext']).items():
+                for _ in range(max(1, options['repeat'])):
+                    started = time.perf_counter()
+                    failed = False
+                    try:
+                        text = run(path) or ''
+                    except Exception as e:
+                        self.stderr.write(f"  {engine}: {os.path.basename(path)} - xato: {e}")
+                        text = ''
+                        failed = True
+                    seconds = time.perf_counter() - started
+                    ok = succeeded(text, features)
+                    stats.record(features, engine, seconds, len(text.strip()), ok)
+                    if failed:
+                        # Xato takrorlanadi (kutubxona yo'q, fayl buzuq) - qayta o'lchash shart emas
+                        break
+                status = 'OK' if ok else "bo'sh"
+                self.stdout.write(
+                    f"{os.path.basename(path)} [{features['ext']}] {engine}: {seconds:.3f}s, "
+                    f"{len(text.strip())} belgi, {status}"
+                )
+
+        stats.save()
+        self.stdout.write('')
+        for key in sorted(stats.data):
+            self.stdout.write(key)
+            for engine, entry in sorted(stats.data[key].items()):
+                units = max(entry['units'], 1e-6)
+                self.stdout.write(
+                    f"  {engine:12} o'lchov={entry['runs']:3} muvaffaqiyat={entry['successes'] / entry['runs']:.0%} "
+                    f"{entry['seconds'] / units:.4f} s/birlik {entry['chars'] / units:.0f} belgi/birlik"
+                )
+        self.stdout.write(self.style.SUCCESS(f"{len(files)} ta fayl o'lchandi, statistika: {stats.path}"))
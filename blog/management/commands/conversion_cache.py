@@ -0,0 +1,35 @@
+"""
+Konvertatsiya keshi holati
+Ishga tushirish: python manage.py conversion_cache [--evict] [--clear]
+"""
+from django.core.management.base import BaseCommand
+
+from blog.conversion_cache import get_conversion_cache
+
+
+class Command(BaseCommand):
+    help = "Konvertatsiya keshi statistikasi (hit/miss, hajm) va tozalash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true', help="Hajm chegarasigacha eski yozuvlarni o'chirish")
+        parser.add_argument('--clear', action='store_true', help="Keshni to'liq tozalash")
+
+    def handle(self, *args, **options):
+        conversion_cache = get_conversion_cache()
+
+        if options['clear']:
+            removed = conversion_cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"{removed} ta yozuv o'chirildi"))
+        elif options['evict']:
+            removed = conversion_cache.evict()
+            self.stdout.write(self.style.SUCCESS(f"{removed} ta yozuv o'chirildi (LRU)"))
+
+        stats = conversion_cache.stats()
+        self.stdout.write(
+            f"Hit: {stats['hits']}  Miss: {stats['misses']}  Hit rate: {stats['hit_rate']:.1%}  "
+            f"Evictions: {stats['evictions']}"
+        )
+        self.stdout.write(
+            f"Yozuvlar: {stats['entries']}  Hajm: {stats['bytes'] / 1024 / 1024:.1f} / "
+            f"{stats['max_bytes'] / 1024 / 1024:.0f} MB"
+        )
@@ -0,0 +1,38 @@
+"""
+Kitob baholari statistikasini qayta hisoblash
+Ishga tushirish: python manage.py rebuild_rating_stats [--book ID ...]
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from blog.models import Book, BookRating
+
+
+class Command(BaseCommand):
+    help = "Book.rating_sum / rating_count / rating_avg ni BookRating jadvalidan qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, nargs='*', help="Faqat shu kitob(lar)")
+
+    def handle(self, *args, **options):
+        books = Book.objects.all()
+        ratings = BookRating.objects.all()
+        if options.get('book'):
+            books = books.filter(id__in=options['book'])
+            ratings = ratings.filter(book_id__in=options['book'])
+
+        stats = {
+            row['book_id']: (row['total'], row['count'])
+            for row in ratings.values('book_id').annotate(total=Sum('rating'), count=Count('id'))
+        }
+
+        changed = []
+        for book in books.only('id', 'rating_sum', 'rating_count', 'rating_avg').iterator():
+            total, count = stats.get(book.id, (0, 0))
+            avg = total / count if count else 0
+            if (book.rating_sum, book.rating_count, book.rating_avg) != (total, count, avg):
+                book.rating_sum, book.rating_count, book.rating_avg = total, count, avg
+                changed.append(book)
+
+        Book.objects.bulk_update(changed, ['rating_sum', 'rating_count', 'rating_avg'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f"{len(changed)} ta kitob statistikasi yangilandi"))
@@ -0,0 +1,30 @@
+"""
+Qidiruv indeksini qayta qurish
+Ishga tushirish: python manage.py rebuild_search_index [--book ID ...]
+"""
+from django.core.management.base import BaseCommand
+
+from blog.models import Book
+from blog.search_index import index_book
+
+
+class Command(BaseCommand):
+    help = "BookPage matnlaridan qidiruv indeksini (SearchPosting) qayta qurish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, nargs='*', help="Faqat shu kitob(lar)ni indekslash")
+
+    def handle(self, *args, **options):
+        books = Book.objects.all().only('id', 'title')
+        if options.get('book'):
+            books = books.filter(id__in=options['book'])
+
+        total_books = 0
+        total_terms = 0
+        for book in books.iterator():
+            terms = index_book(book)
+            total_books += 1
+            total_terms += terms
+            self.stdout.write(f"{book.id}: {book.title} - {terms} ta so'z")
+
+        self.stdout.write(self.style.SUCCESS(f"{total_books} ta kitob indekslandi ({total_terms} ta posting)"))
@@ -0,0 +1,30 @@
+"""
+O'xshash kitoblar jadvalini (SimilarBook) qayta hisoblash
+Ishga tushirish: python manage.py rebuild_similar_books [--book ID ...] [--pending]
+"""
+from django.core.management.base import BaseCommand
+
+from blog.similarity import rebuild_all, refresh_pending
+
+
+class Command(BaseCommand):
+    help = "Matn (TF-IDF), kategoriya va birga o'qilish bo'yicha o'xshash kitoblarni hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, nargs='*', help="Faqat shu kitob(lar) qo'shnilarini hisoblash")
+        parser.add_argument('--pending', action='store_true',
+                            help="Faqat yangi/o'zgargan kitoblar (inkremental)")
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            total = 0
+            while True:
+                updated = refresh_pending()
+                if not updated:
+                    break
+                total += updated
+            self.stdout.write(self.style.SUCCESS(f"{total} ta kitob yangilandi"))
+            return
+
+        count = rebuild_all(book_ids=options.get('book') or None)
+        self.stdout.write(self.style.SUCCESS(f"{count} ta kitob uchun o'xshash kitoblar hisoblandi"))
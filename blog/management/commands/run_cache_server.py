@@ -0,0 +1,28 @@
+"""
+Umumiy xotira kesh serverini ishga tushirish
+Ishga tushirish: python manage.py run_cache_server [--location PATH|HOST:PORT] [--max-mb N]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.cache_server import DEFAULT_MAX_ENTRIES, serve
+
+
+class Command(BaseCommand):
+    help = "Gunicorn workerlari uchun umumiy xotira keshi (blog.cache_backend.SocketCache serveri)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--location', default=settings.CACHE_SERVER_LOCATION,
+                            help="Unix socket fayli yoki host:port")
+        parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                            help="Maksimal yozuvlar soni (LRU)")
+        parser.add_argument('--max-mb', type=int, default=settings.CACHE_SERVER_MAX_MB,
+                            help="Maksimal xotira hajmi, MB (LRU)")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Kesh serveri: {options['location']} ({options['max_mb']} MB)")
+        try:
+            serve(options['location'], max_entries=options['max_entries'],
+                  max_bytes=options['max_mb'] * 1024 * 1024)
+        except KeyboardInterrupt:
+            self.stdout.write("Kesh serveri to'xtatildi")
@@ -0,0 +1,99 @@
+"""
+Kitob yuklash navbatini bajaruvchi worker
+Har --maintenance-interval soniyada (vazifa bajarilayotganda ham) keshda to'plangan ko'rishlarni
+bazaga yozadi (view_counter.py), qidiruv imlo lug'atini keshga yozadi (query_analysis.py) va yangi
+kitoblarning o'xshash kitoblarini yangilaydi (similarity.py);
+navbat bo'sh bo'lganda refresh_pending hali kitob qaytarayotgan bo'lsa, keyingi to'plam kutmasdan
+yangilanadi (flush va lug'at esa baribir shu oraliqda)
+Ishga tushirish: python manage.py run_ingestion_worker [--processes N] [--once]
+"""
+import time
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog.ingestion import (
+    INGESTION_PROCESSES, claim_next_job, default_worker_id, process_job, requeue_stale_jobs,
+)
+from blog.query_analysis import publish_vocabulary
+from blog.similarity import refresh_pending
+from blog import view_counter
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "IngestionJob navbatidagi ZIP importlarni fonda bajarish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=INGESTION_PROCESSES,
+                            help="Fayllarni parallel tahlil qiluvchi jarayonlar soni")
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help="Navbat bo'sh bo'lganda kutish (soniya)")
+        parser.add_argument('--maintenance-interval', type=float, default=view_counter.FLUSH_INTERVAL,
+                            help="Ko'rishlarni yozish va o'xshashlikni yangilash oralig'i (soniya)")
+        parser.add_argument('--once', action='store_true',
+                            help="Navbatdagi vazifalarni bajarib chiqish va to'xtash")
+
+    def maintenance(self):
+        """Davriy ishlar; :return: o'xshashligi yangilangan kitoblar soni"""
+        self._last_maintenance = time.monotonic()
+        try:
+            view_counter.flush()
+        except Exception as e:
+            logger.error(f"VIEW_COUNTER: flush xatosi: {e}")
+        try:
+            # Qidiruv so'rovlari imlo lug'atini shu yerdan (keshdan) oladi
+            publish_vocabulary()
+        except Exception as e:
+            logger.error(f"QUERY_ANALYSIS: lug'atni yig'ib bo'lmadi: {e}")
+        return self.refresh_similarity()
+
+    def refresh_similarity(self):
+        """:return: o'xshashligi yangilangan kitoblar soni (0 bo'lsa navbatda kitob qolmagan)"""
+        try:
+            refreshed = refresh_pending()
+        except Exception as e:
+            logger.error(f"SIMILARITY: inkremental yangilash xatosi: {e}")
+            refreshed = 0
+        self._similarity_backlog = refreshed > 0
+        return refreshed
+
+    def maintenance_if_due(self):
+        """:return: davriy ishlar bajarildimi"""
+        if time.monotonic() - self._last_maintenance >= self._maintenance_interval:
+            self.maintenance()
+            return True
+        return False
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self._maintenance_interval = options['maintenance_interval']
+        self._last_maintenance = 0.0
+        self._similarity_backlog = False
+        self.stdout.write(f"Ingestion worker ishga tushdi: {worker_id} ({options['processes']} jarayon)")
+
+        while True:
+            close_old_connections()
+            requeue_stale_jobs()
+            job = claim_next_job(worker_id)
+
+            if job is None:
+                if not self.maintenance_if_due() and self._similarity_backlog:
+                    self.refresh_similarity()
+                if self._similarity_backlog:
+                    # Yangilanmagan kitoblar qoldi - kutmasdan keyingi to'plam
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f"Vazifa #{job.pk}: {job.original_name}")
+            job = process_job(job, processes=options['processes'], on_tick=self.maintenance_if_due)
+            style = self.style.SUCCESS if job.status == 'done' else self.style.ERROR
+            self.stdout.write(style(
+                f"Vazifa #{job.pk} {job.status}: {job.processed_files}/{job.total_files} fayl"
+            ))
+            self.maintenance_if_due()
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_foodintake_alter_book_options_alter_author_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name="So'z")),
+                ('positions', models.JSONField(default=list, help_text='[[sahifa, tartib, pozitsiya, uzunlik], ...]', verbose_name='Pozitsiyalar')),
+                ('frequency', models.PositiveIntegerField(default=0, verbose_name='Uchrashlar soni')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='blog.book', verbose_name='Kitob')),
+            ],
+            options={
+                'verbose_name': 'Qidiruv indeksi',
+                'verbose_name_plural': 'Qidiruv indeksi',
+                'unique_together': {('term', 'book')},
+            },
+        ),
+    ]
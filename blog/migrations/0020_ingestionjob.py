@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_searchposting'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archive', models.FileField(upload_to='ingestion/', verbose_name='Arxiv')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Asl fayl nomi')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('running', 'Bajarilmoqda'), ('done', 'Tugadi'), ('failed', 'Xato')], db_index=True, default='pending', max_length=10, verbose_name='Holat')),
+                ('total_files', models.PositiveIntegerField(default=0, verbose_name='Fayllar soni')),
+                ('processed_files', models.PositiveIntegerField(default=0, verbose_name='Ishlangan fayllar')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('error', models.TextField(blank=True, verbose_name='Xato')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingestion_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Yuklash vazifasi',
+                'verbose_name_plural': 'Yuklash vazifalari',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngestionJobFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, verbose_name='Fayl')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('success', 'Yuklandi'), ('exists', 'Mavjud'), ('skipped', "O'tkazildi"), ('error', 'Xato')], default='pending', max_length=10, verbose_name='Holat')),
+                ('message', models.TextField(blank=True)),
+                ('result', models.JSONField(blank=True, default=dict, help_text='title, author, year, pages ...')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('book', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blog.book')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='blog.ingestionjob')),
+            ],
+            options={
+                'verbose_name': 'Yuklash fayli',
+                'verbose_name_plural': 'Yuklash fayllari',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:27
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_stats(apps, schema_editor):
+    """Mavjud baholardan statistikani to'ldirish"""
+    Book = apps.get_model('blog', 'Book')
+    BookRating = apps.get_model('blog', 'BookRating')
+    rows = BookRating.objects.values('book_id').annotate(total=Sum('rating'), count=Count('id'))
+    for row in rows:
+        Book.objects.filter(pk=row['book_id']).update(
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating_avg=row['total'] / row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='rating_avg',
+            field=models.FloatField(db_index=True, default=0, verbose_name="O'rtacha baho"),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Baholar soni'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name="Baholar yig'indisi"),
+        ),
+        migrations.RunPython(fill_rating_stats, migrations.RunPython.noop),
+    ]
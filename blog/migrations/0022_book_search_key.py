@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:05
+
+import re
+
+from django.db import migrations, models
+
+# Shu migratsiya paytidagi normallashtirish (catalog_search.normalize) nusxasi - ilova kodi
+# keyin o'zgarsa ham migratsiya natijasi o'zgarmasin
+APOSTROPHES_RE = re.compile(r"['`ʻʼ‘’]")
+WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 's',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya', 'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+_TRANSLIT_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+
+
+def search_key_for(title, author_name=''):
+    text = f"{title} {author_name}".lower().translate(_TRANSLIT_TABLE)
+    return ' '.join(WORD_RE.findall(APOSTROPHES_RE.sub('', text)))
+
+
+def fill_search_keys(apps, schema_editor):
+    """Mavjud kitoblar uchun search_key (nom + adib ismi) ni to'ldirish"""
+    Book = apps.get_model('blog', 'Book')
+    books = []
+    for book in Book.objects.select_related('author').only('id', 'title', 'author__name').iterator():
+        book.search_key = search_key_for(book.title, book.author.name)
+        books.append(book)
+        if len(books) >= 500:
+            Book.objects.bulk_update(books, ['search_key'])
+            books = []
+    if books:
+        Book.objects.bulk_update(books, ['search_key'])
+
+
+def create_trigram_index(apps, schema_editor):
+    """PostgreSQL: pg_trgm kengaytmasi va search_key ustida GIN trigram indeks"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS blog_book_search_key_trgm "
+        "ON blog_book USING gin (search_key gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS blog_book_search_key_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_book_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_key',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Qidiruv kaliti'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:40
+
+import re
+
+from django.db import migrations
+
+# Shu migratsiya paytidagi normallashtirish (uzbek_text.fold + catalog_search.normalize) nusxasi -
+# ilova kodi keyin o'zgarsa ham migratsiya natijasi o'zgarmasin
+WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+APOSTROPHES_RE = re.compile(r"['`ʻʼ‘’ʹ′]")
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 's',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': "'", 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya', 'ў': "o'", 'қ': 'q', 'ғ': "g'", 'ҳ': 'h',
+}
+_TRANSLIT_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+_CYRILLIC_YE_RE = re.compile(r'(?<![бвгджзйклмнпрстфхцчшщқғҳ])е')
+
+
+def search_key_for(title, author_name=''):
+    text = f"{title} {author_name}".lower()
+    if not text.isascii():
+        text = _CYRILLIC_YE_RE.sub('ye', text).translate(_TRANSLIT_TABLE)
+    text = APOSTROPHES_RE.sub("'", text)
+    return ' '.join(WORD_RE.findall(text.replace("'", '')))
+
+
+def refresh_search_keys(apps, schema_editor):
+    """search_key ni yangi normallashtirish (o'zbek fold) bilan qayta hisoblash"""
+    Book = apps.get_model('blog', 'Book')
+    books = []
+    for book in Book.objects.select_related('author').only('id', 'title', 'search_key', 'author__name').iterator():
+        key = search_key_for(book.title, book.author.name)
+        if key != book.search_key:
+            book.search_key = key
+            books.append(book)
+        if len(books) >= 500:
+            Book.objects.bulk_update(books, ['search_key'])
+            books = []
+    if books:
+        Book.objects.bulk_update(books, ['search_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0022_book_search_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(refresh_search_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_refresh_book_search_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='similar_refreshed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='SimilarBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0, verbose_name="O'xshashlik")),
+                ('rank', models.PositiveSmallIntegerField(default=0, verbose_name="O'rin")),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='blog.book', verbose_name='Kitob')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.book', verbose_name="O'xshash kitob")),
+            ],
+            options={
+                'verbose_name': "O'xshash kitob",
+                'verbose_name_plural': "O'xshash kitoblar",
+                'ordering': ['book', 'rank'],
+                'indexes': [models.Index(fields=['book', 'rank'], name='blog_simila_book_id_c34084_idx')],
+                'unique_together': {('book', 'similar')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0024_similarbook'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='book',
+            field=models.ForeignKey(blank=True, help_text='Bitta kitob yuklanganda - uning sahifalari fonda tayyorlanadi', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_jobs', to='blog.book', verbose_name='Kitob'),
+        ),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='archive',
+            field=models.FileField(blank=True, upload_to='ingestion/', verbose_name='Arxiv'),
+        ),
+    ]
@@ -1,6 +1,5 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models import Avg
 import random
 import string
 from django.utils import timezone
@@ -171,101 +170,148 @@ class Book(models.Model):
     cover_image = models.ImageField(upload_to='book_covers/', blank=True, null=True, verbose_name="Muqova rasmi")
     categories = models.ManyToManyField(Category, blank=True, related_name='books', verbose_name="Kategoriyalar")
     views_count = models.PositiveIntegerField(default=0, verbose_name="Ko'rishlar soni", db_index=True)
+    # Baholar statistikasi - BookRating signallari bilan yangilanadi (rebuild_rating_stats bilan qayta hisoblanadi)
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Baholar yig'indisi")
+    rating_count = models.PositiveIntegerField(default=0, verbose_name="Baholar soni")
+    rating_avg = models.FloatField(default=0, verbose_name="O'rtacha baho", db_index=True)
+    # Katalog qidiruvi uchun: nom + adib ismi (lotin, kichik harf) - catalog_search.normalize
+    search_key = models.TextField(blank=True, default='', editable=False, verbose_name="Qidiruv kaliti")
+    # O'xshash kitoblar (SimilarBook) oxirgi hisoblangan vaqt; None - qayta hisoblash kerak (similarity.py)
+    similar_refreshed_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     
+    # search_key shu maydonlardan hisoblanadi (update_fields da bo'lsa search_key ham yoziladi)
+    SEARCH_KEY_SOURCES = frozenset(['title', 'author', 'author_id'])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # search_key qaysi nom/adibdan hisoblangani - o'zgarmagan bo'lsa save() adibni so'ramaydi
+        instance._search_source = (instance.__dict__.get('title'), instance.__dict__.get('author_id'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .catalog_search import search_key_for
+        update_fields = kwargs.get('update_fields')
+        writes_key = update_fields is None or bool(self.SEARCH_KEY_SOURCES & set(update_fields))
+        # Faqat nom/adib o'zgarganda katalog indeksi yangilanadi (signals.invalidate_catalog_index)
+        self._search_key_changed = False
+        source = (self.title, self.author_id)
+        if writes_key and (self._state.adding or source != getattr(self, '_search_source', None)):
+            search_key = search_key_for(self.title, self.author.name if self.author_id else '')
+            self._search_key_changed = self._state.adding or search_key != self.search_key
+            self.search_key = search_key
+        if writes_key and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'search_key'}
+        super().save(*args, **kwargs)
+        if writes_key:
+            self._search_source = source
+
     @property
     def average_rating(self):
         """O'rtacha reyting"""
-        avg = self.ratings.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0
+        return round(self.rating_avg, 1) if self.rating_count else 0
     
     @property
     def total_ratings(self):
         """Baholar soni"""
-        return self.ratings.count()
+        return self.rating_count
+
+    @classmethod
+    def apply_rating_delta(cls, book_id, sum_delta, count_delta):
+        """
+        Baholar statistikasini bitta atomar UPDATE bilan o'zgartirish
+        (UPDATE ichida F() eski qiymatlarni ko'radi, shuning uchun o'rtacha ham shu yerda hisoblanadi)
+        """
+        from django.db.models import F, FloatField
+        from django.db.models.functions import Cast, Coalesce, NullIf
+
+        new_sum = F('rating_sum') + sum_delta
+        new_count = F('rating_count') + count_delta
+        return cls.objects.filter(pk=book_id).update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            rating_avg=Coalesce(Cast(new_sum, FloatField()) / NullIf(new_count, 0), 0.0),
+        )
 
     def save_pages_from_file(self):
-        """Fayldan matnni sahifalarga bo‘lib BookPage obyektlari sifatida saqlash"""
-        from .models import BookPage
-        import os
-        import subprocess
-        import tempfile
-        
+        """
+        Fayldan matnni sahifalarga bo‘lib BookPage obyektlari sifatida saqlash
+        Sahifalar BookPageWriter orqali bitta tranzaksiyada yoziladi (eski sahifalar atomar almashtiriladi)
+        :return: yozish statistikasi (pages, seconds, pages_per_second)
+        """
+        from .page_writer import BookPageWriter
+
         if not self.file:
             return
         file_path = self.file.path
         file_name = self.file.name.lower()
-        # Avval eski sahifalarni o'chir
-        self.pages.all().delete()
+        
+        with BookPageWriter(self) as writer:
+            self._write_pages_from_file(writer, file_path, file_name)
+        return writer.stats
+    
+    @staticmethod
+    def _write_pages_from_file(writer, file_path, file_name):
+        """
+        Fayl turiga qarab sahifalarni ajratib writer ga qo'shish
+        Bazaga murojaat qilmaydi - ingestion worker jarayonlarida ham ishlatiladi
+        """
+        import tempfile
+        from libreoffice_converter import run_libreoffice_conversion
         
         if file_name.endswith('.pdf'):
-            all_text = ""
             pages_created = False
             
-            # 1-usul: pdfplumber - eng yaxshi strukturani saqlaydi
+            # 1-usul: parallel o'qish (PyMuPDF yoki pdfplumber, jadvallar faqat kerakli sahifalarda);
+            # matn qatlami yo'q (skaner) sahifalar - alohida OCR
             try:
-                import pdfplumber
-                with pdfplumber.open(file_path) as pdf:
-                    for i, page in enumerate(pdf.pages):
-                        # Asosiy matnni olish
-                        text = page.extract_text() or ''
-                        
-                        # Jadvallarni ham olish (agar bo'lsa)
-                        tables = page.extract_tables()
-                        if tables:
-                            for table in tables:
-                                for row in table:
-                                    if row:
-                                        row_text = ' | '.join([str(cell) if cell else '' for cell in row])
-                                        text += '\n' + row_text
-                        
-                        all_text += text
-                        if text.strip():
-                            BookPage.objects.create(book=self, page_number=i+1, text=text)
-                            pages_created = True
-                print(f"pdfplumber bilan {len(pdf.pages)} sahifa o'qildi")
+                from .engine_selection import best_pdf_engine
+                from .pdf_extraction import iter_pages
+                from .pdf_ocr import fill_missing_pages
+                page_total = 0
+                pages = iter_pages(file_path, engine=best_pdf_engine(file_path))
+                for page_number, text in fill_missing_pages(file_path, pages):
+                    page_total += 1
+                    if text.strip():
+                        writer.add(page_number, text)
+                        pages_created = True
+                print(f"PDF dan {page_total} sahifa o'qildi")
             except Exception as e:
-                print(f"pdfplumber xatosi: {e}")
+                print(f"PDF o'qish xatosi: {e}")
             
-            # 2-usul: pypdf - agar pdfplumber ishlamasa
-            if not all_text.strip() and not pages_created:
+            # 2-usul: pypdf - agar 1-usul ishlamasa
+            if not pages_created:
                 try:
                     from pypdf import PdfReader
                     reader = PdfReader(file_path)
                     for i, page in enumerate(reader.pages):
                         text = page.extract_text() or ''
-                        all_text += text
                         if text.strip():
-                            BookPage.objects.create(book=self, page_number=i+1, text=text)
+                            writer.add(i+1, text)
                             pages_created = True
                     print(f"pypdf bilan {len(reader.pages)} sahifa o'qildi")
                 except Exception as e:
                     print(f"pypdf xatosi: {e}")
             
-            # 3-usul: LibreOffice - oxirgi variant (skaner qilingan PDF uchun)
-            if not all_text.strip() and not pages_created:
+            # 3-usul: LibreOffice - oxirgi variant (OCR kutubxonalari yo'q bo'lsa)
+            if not pages_created:
                 try:
                     with tempfile.TemporaryDirectory() as temp_dir:
-                        result = subprocess.run([
-                            'soffice', '--headless', '--convert-to', 'txt:Text',
-                            '--outdir', temp_dir, file_path
-                        ], capture_output=True, timeout=120)
-                        
-                        base_name = os.path.splitext(os.path.basename(file_path))[0]
-                        txt_path = os.path.join(temp_dir, f'{base_name}.txt')
+                        # Doimiy LibreOffice hovuzi orqali (har safar soffice ishga tushirilmaydi)
+                        txt_path = run_libreoffice_conversion(file_path, 'txt:Text', temp_dir, timeout=120)
                         
-                        if os.path.exists(txt_path):
+                        if txt_path:
                             with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
                                 content = f.read()
                             
                             if content.strip():
-                                self.pages.all().delete()
                                 page_size = 2000
                                 pages_text = [content[i:i+page_size] for i in range(0, len(content), page_size)]
                                 
                                 for i, page_text in enumerate(pages_text):
                                     if page_text.strip():
-                                        BookPage.objects.create(book=self, page_number=i+1, text=page_text)
+                                        writer.add(i+1, page_text)
                                 
                                 print(f"LibreOffice bilan {len(pages_text)} sahifa olindi")
                 except Exception as e:
@@ -279,20 +325,15 @@ class Book(models.Model):
             paragraphs = [p.text for p in doc.paragraphs]
             for i in range(0, len(paragraphs), page_size):
                 page_text = '\n'.join(paragraphs[i:i+page_size])
-                BookPage.objects.create(book=self, page_number=(i//page_size)+1, text=page_text)
+                writer.add((i//page_size)+1, page_text)
         elif file_name.endswith('.doc'):
             # .doc fayllar uchun LibreOffice
             try:
                 with tempfile.TemporaryDirectory() as temp_dir:
-                    result = subprocess.run([
-                        'soffice', '--headless', '--convert-to', 'txt:Text',
-                        '--outdir', temp_dir, file_path
-                    ], capture_output=True, timeout=120)
+                    # Doimiy LibreOffice hovuzi orqali (har safar soffice ishga tushirilmaydi)
+                    txt_path = run_libreoffice_conversion(file_path, 'txt:Text', temp_dir, timeout=120)
                     
-                    base_name = os.path.splitext(os.path.basename(file_path))[0]
-                    txt_path = os.path.join(temp_dir, f'{base_name}.txt')
-                    
-                    if os.path.exists(txt_path):
+                    if txt_path:
                         with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
                             content = f.read()
                         
@@ -301,7 +342,7 @@ class Book(models.Model):
                         
                         for i, page_text in enumerate(pages_text):
                             if page_text.strip():
-                                BookPage.objects.create(book=self, page_number=i+1, text=page_text)
+                                writer.add(i+1, page_text)
             except Exception as e:
                 print(f"LibreOffice DOC->TXT xatosi: {e}")
         elif file_name.endswith('.txt'):
@@ -311,20 +352,15 @@ class Book(models.Model):
             page_size = 50
             for i in range(0, len(lines), page_size):
                 page_text = ''.join(lines[i:i+page_size])
-                BookPage.objects.create(book=self, page_number=(i//page_size)+1, text=page_text)
+                writer.add((i//page_size)+1, page_text)
         elif file_name.endswith(('.odt', '.rtf', '.ppt', '.pptx', '.xls', '.xlsx')):
             # Boshqa formatlar uchun LibreOffice
             try:
                 with tempfile.TemporaryDirectory() as temp_dir:
-                    result = subprocess.run([
-                        'soffice', '--headless', '--convert-to', 'txt:Text',
-                        '--outdir', temp_dir, file_path
-                    ], capture_output=True, timeout=120)
-                    
-                    base_name = os.path.splitext(os.path.basename(file_path))[0]
-                    txt_path = os.path.join(temp_dir, f'{base_name}.txt')
+                    # Doimiy LibreOffice hovuzi orqali (har safar soffice ishga tushirilmaydi)
+                    txt_path = run_libreoffice_conversion(file_path, 'txt:Text', temp_dir, timeout=120)
                     
-                    if os.path.exists(txt_path):
+                    if txt_path:
                         with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
                             content = f.read()
                         
@@ -333,7 +369,7 @@ class Book(models.Model):
                         
                         for i, page_text in enumerate(pages_text):
                             if page_text.strip():
-                                BookPage.objects.create(book=self, page_number=i+1, text=page_text)
+                                writer.add(i+1, page_text)
             except Exception as e:
                 print(f"LibreOffice convert xatosi: {e}")
 
@@ -354,50 +390,16 @@ class Book(models.Model):
         return f"{self.title} - {self.author.name}"
 
     def extract_text_from_file(self):
-        """Fayldan matnni o'qib olish"""
+        """Fayldan matnni o'qib olish (text_extraction xizmati orqali)"""
+        from .text_extraction import extract_text
+
         if not self.file:
             return ""
         
-        file_path = self.file.path
-        file_name = self.file.name.lower()
-        text = ""
-        
         try:
-            if file_name.endswith('.pdf'):
-                text = self._extract_from_pdf(file_path)
-            elif file_name.endswith('.docx'):
-                text = self._extract_from_docx(file_path)
-            elif file_name.endswith('.txt'):
-                text = self._extract_from_txt(file_path)
+            return extract_text(self.file.path) or ""
         except Exception as e:
-            text = f"Faylni o'qishda xatolik: {str(e)}"
-        
-        return text
-    
-    def _extract_from_pdf(self, file_path):
-        """PDF fayldan matn o'qish"""
-        from pypdf import PdfReader
-        text = ""
-        reader = PdfReader(file_path)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        return text.strip()
-    
-    def _extract_from_docx(self, file_path):
-        """DOCX fayldan matn o'qish"""
-        from docx import Document
-        doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    
-    def _extract_from_txt(self, file_path):
-        """TXT fayldan matn o'qish"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+            return f"Faylni o'qishda xatolik: {str(e)}"
 
 
 class BookRating(models.Model):
@@ -489,6 +491,114 @@ class BookSummary(models.Model):
         return f"Xulosa: {self.book.title}"
 
 
+class SearchPosting(models.Model):
+    """Qidiruv indeksi: so'z -> kitobdagi barcha uchrashlari (search_index.py)"""
+    term = models.CharField(max_length=64, verbose_name="So'z")
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='search_postings', verbose_name="Kitob")
+    positions = models.JSONField(default=list, verbose_name="Pozitsiyalar", help_text="[[sahifa, tartib, pozitsiya, uzunlik], ...]")
+    frequency = models.PositiveIntegerField(default=0, verbose_name="Uchrashlar soni")
+
+    class Meta:
+        verbose_name = "Qidiruv indeksi"
+        verbose_name_plural = "Qidiruv indeksi"
+        unique_together = ('term', 'book')
+
+    def __str__(self):
+        return f"{self.term} - {self.book_id} ({self.frequency})"
+
+
+class SimilarBook(models.Model):
+    """Oldindan hisoblangan o'xshash kitoblar (matn TF-IDF + kategoriya + birga o'qilish) - similarity.py"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_entries', verbose_name="Kitob")
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+', verbose_name="O'xshash kitob")
+    score = models.FloatField(default=0, verbose_name="O'xshashlik")
+    rank = models.PositiveSmallIntegerField(default=0, verbose_name="O'rin")
+
+    class Meta:
+        verbose_name = "O'xshash kitob"
+        verbose_name_plural = "O'xshash kitoblar"
+        unique_together = ('book', 'similar')
+        indexes = [
+            models.Index(fields=['book', 'rank']),
+        ]
+        ordering = ['book', 'rank']
+
+    def __str__(self):
+        return f"{self.book_id} -> {self.similar_id} ({self.score:.3f})"
+
+
+class IngestionJob(models.Model):
+    """
+    Kitob yuklash navbati - run_ingestion_worker tomonidan bajariladi
+    ZIP import (archive) yoki bitta yuklangan kitob sahifalarini tayyorlash (book)
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Navbatda'),
+        ('running', 'Bajarilmoqda'),
+        ('done', 'Tugadi'),
+        ('failed', 'Xato'),
+    ]
+
+    archive = models.FileField(upload_to='ingestion/', blank=True, verbose_name="Arxiv")
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, null=True, blank=True, related_name='ingestion_jobs',
+        verbose_name="Kitob", help_text="Bitta kitob yuklanganda - uning sahifalari fonda tayyorlanadi",
+    )
+    original_name = models.CharField(max_length=255, blank=True, verbose_name="Asl fayl nomi")
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='ingestion_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True, verbose_name="Holat")
+    total_files = models.PositiveIntegerField(default=0, verbose_name="Fayllar soni")
+    processed_files = models.PositiveIntegerField(default=0, verbose_name="Ishlangan fayllar")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    error = models.TextField(blank=True, verbose_name="Xato")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Yuklash vazifasi"
+        verbose_name_plural = "Yuklash vazifalari"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"#{self.pk} {self.original_name} ({self.status})"
+
+    @property
+    def progress(self):
+        """Bajarilish foizi"""
+        if not self.total_files:
+            return 100 if self.status == 'done' else 0
+        return round(self.processed_files * 100 / self.total_files)
+
+
+class IngestionJobFile(models.Model):
+    """Yuklash vazifasidagi bitta fayl natijasi"""
+    STATUS_CHOICES = [
+        ('pending', 'Navbatda'),
+        ('success', 'Yuklandi'),
+        ('exists', 'Mavjud'),
+        ('skipped', "O'tkazildi"),
+        ('error', 'Xato'),
+    ]
+
+    job = models.ForeignKey(IngestionJob, on_delete=models.CASCADE, related_name='files')
+    name = models.CharField(max_length=500, verbose_name="Fayl")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Holat")
+    message = models.TextField(blank=True)
+    book = models.ForeignKey(Book, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    result = models.JSONField(default=dict, blank=True, help_text="title, author, year, pages ...")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Yuklash fayli"
+        verbose_name_plural = "Yuklash fayllari"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
 class Product(models.Model):
     """Mahsulot modeli - shtrix kod bilan"""
     barcode = models.CharField(max_length=50, unique=True, verbose_name="Shtrix kod (Barcode)")
@@ -0,0 +1,92 @@
+"""
+Kitob sahifalarini paketlab yozish (bulk ingestion)
+Har sahifa uchun alohida INSERT o'rniga bulk_create va bitta tranzaksiya
+"""
+import time
+import logging
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+PAGE_BATCH_SIZE = 500
+
+
+class BookPageWriter:
+    """
+    Sahifalarni xotirada to'plab, commit() da bitta tranzaksiyada yozadi.
+    Eski sahifalar yangilari bilan atomar almashtiriladi - xato bo'lsa eski sahifalar qoladi.
+    Qidiruv indeksi almashtirishdan keyin alohida tranzaksiyada yangilanadi.
+
+    Ishlatish:
+        with BookPageWriter(book) as writer:
+            writer.add(1, "matn")
+    """
+
+    def __init__(self, book, batch_size=PAGE_BATCH_SIZE, index=True):
+        self.book = book
+        self.batch_size = batch_size
+        self.index = index
+        self.pages = []
+        self.stats = None
+        self._started_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __enter__(self):
+        self._started_at = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Xato bo'lsa hech narsa yozilmaydi, eski sahifalar saqlanib qoladi
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def add(self, page_number, text):
+        """Sahifani navbatga qo'shish"""
+        from .models import BookPage
+        self.pages.append(BookPage(book_id=self.book.pk, page_number=page_number, text=text))
+
+    def commit(self):
+        """Eski sahifalarni o'chirib, yangilarini paketlab yozish"""
+        from .models import BookPage
+
+        write_started = time.monotonic()
+        with transaction.atomic():
+            BookPage.objects.filter(book_id=self.book.pk).delete()
+            for start in range(0, len(self.pages), self.batch_size):
+                BookPage.objects.bulk_create(self.pages[start:start + self.batch_size])
+
+            # bulk_create/DELETE signal yubormaydi - sahifalarga bog'liq kesh shu yerda eskiradi
+            from .tagged_cache import invalidate, tag
+            invalidate(tag(BookPage, self.book.pk))
+        write_finished = time.monotonic()
+
+        if self.index:
+            # Indekslash (tokenizatsiya - CPU) sahifalar almashgandan keyin, yozish qulfidan tashqarida.
+            # O'z tranzaksiyasi/savepoint ida: DB xatosi tashqi tranzaksiyani buzmaydi, sahifalar qoladi
+            try:
+                from .search_index import index_book
+                with transaction.atomic():
+                    index_book(self.book, ((p.page_number, p.text) for p in self.pages))
+            except Exception as e:
+                logger.error(f"Qidiruv indeksi xatosi (book={self.book.pk}): {e}")
+
+        finished = time.monotonic()
+        total_seconds = finished - self._started_at
+        self.stats = {
+            'pages': len(self.pages),
+            'seconds': round(total_seconds, 3),
+            'write_seconds': round(write_finished - write_started, 3),
+            'index_seconds': round(finished - write_finished, 3),
+            'pages_per_second': round(len(self.pages) / total_seconds, 1) if total_seconds > 0 else 0,
+        }
+        logger.info(
+            f"PAGE_WRITER: book={self.book.pk} pages={self.stats['pages']} "
+            f"total={self.stats['seconds']}s write={self.stats['write_seconds']}s "
+            f"index={self.stats['index_seconds']}s "
+            f"({self.stats['pages_per_second']} sahifa/s)"
+        )
+        return self.stats
@@ -0,0 +1,211 @@
+"""
+Kitob ichidan savolga mos parchalarni (passage) tanlash - BM25, numpy bilan
+ask_about_book va get_book_summary LLM ga kitobning boshini emas, kerakli qismlarini yuboradi.
+
+Kitob sahifalari ~CHUNK_CHARS belgili parchalarga bo'linadi; har kitob uchun indeks
+(term -> parchalar, tf) jarayon xotirasida saqlanadi va sahifalar o'zgarsa qayta quriladi.
+"""
+import re
+import logging
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .uzbek_text import TOKEN_RE, normalize_term
+
+logger = logging.getLogger(__name__)
+
+CHUNK_CHARS = 800
+# LLM konteksti uchun taxminiy token byudjeti (1 token ~ 4 belgi)
+CHARS_PER_TOKEN = 4
+ASK_TOKEN_BUDGET = getattr(settings, 'PASSAGE_ASK_TOKEN_BUDGET', 1500)
+SUMMARY_TOKEN_BUDGET = getattr(settings, 'PASSAGE_SUMMARY_TOKEN_BUDGET', 1250)
+CACHED_BOOKS = 32
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?…])\s+|\n{2,}')
+
+
+def approx_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_passages(text, size=CHUNK_CHARS):
+    """Matnni gap/paragraf chegarasida ~size belgili parchalarga bo'lish"""
+    passages = []
+    current = ''
+    for sentence in _SENTENCE_END_RE.split(text or ''):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + len(sentence) + 1 > size:
+            passages.append(current)
+            current = ''
+        # Juda uzun gap (jadval, tinish belgisiz matn) - qattiq bo'lish
+        while len(sentence) > size:
+            passages.append(sentence[:size])
+            sentence = sentence[size:]
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _terms(text):
+    from .query_analysis import STOP_WORDS
+
+    terms = []
+    for match in TOKEN_RE.finditer(text):
+        term = normalize_term(match.group())
+        if len(term) > 1 and term not in STOP_WORDS:
+            terms.append(term)
+    return terms
+
+
+class PassageIndex:
+    """
+    Bitta kitob parchalari ustida BM25.
+    Har term uchun: parcha raqamlari va tf (numpy massivlari) - ball bitta vektor amali bilan yig'iladi.
+    """
+
+    def __init__(self, passages):
+        """:param passages: [(sahifa raqami, matn), ...]"""
+        self.passages = passages
+        self.lengths = np.zeros(len(passages), dtype=np.float32)
+        self.totals = Counter()
+        postings = {}
+        for index, (_, text) in enumerate(passages):
+            counts = Counter(_terms(text))
+            self.lengths[index] = sum(counts.values())
+            self.totals.update(counts)
+            for term, tf in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(index)
+                postings[term][1].append(tf)
+        self.postings = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (ids, tfs) in postings.items()
+        }
+        average = float(self.lengths.mean()) if len(passages) else 0.0
+        self._norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / (average or 1.0))
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, terms):
+        """Har bir parcha uchun BM25 ball (terms - normallashtirilgan termlar, takrorlanishi mumkin)"""
+        scores = np.zeros(len(self), dtype=np.float32)
+        n = len(self)
+        for term, weight in Counter(terms).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            idf = np.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += weight * idf * tfs * (BM25_K1 + 1) / (tfs + self._norm[ids])
+        return scores
+
+    def keywords(self, limit=30):
+        """Kitobning asosiy termlari: ko'p uchraydigan, lekin hamma joyda emas"""
+        n = len(self)
+        ranked = []
+        for term, total in self.totals.items():
+            df = len(self.postings[term][0])
+            if df < 2 and n > 1:
+                continue
+            ranked.append((total * np.log(1 + n / df), term))
+        ranked.sort(reverse=True)
+        return [term for _, term in ranked[:limit]]
+
+
+def _pick(index, order, budget_tokens):
+    """Ball tartibidagi parchalardan byudjetga sig'adiganlarini olish; natija kitob tartibida"""
+    chosen = []
+    used = 0
+    for i in order:
+        cost = approx_tokens(index.passages[i][1])
+        if used + cost > budget_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    return [index.passages[i] for i in sorted(chosen)]
+
+
+def relevant_passages(index, question, budget_tokens=ASK_TOKEN_BUDGET):
+    """Savolga eng mos parchalar (top-k, byudjet ichida); mos parcha bo'lmasa - butun kitobdan namunalar"""
+    scores = index.scores(_terms(question))
+    order = [int(i) for i in np.argsort(-scores, kind='stable') if scores[i] > 0]
+    if not order:
+        return representative_passages(index, budget_tokens)
+    return _pick(index, order, budget_tokens)
+
+
+def representative_passages(index, budget_tokens=SUMMARY_TOKEN_BUDGET):
+    """
+    Xulosa uchun: kitob teng bo'laklarga ajratiladi, har bo'lakdan asosiy termlarga eng mos parcha
+    (faqat birinchi bob emas, butun kitob qamrab olinadi)
+    """
+    if not len(index):
+        return []
+    average_cost = max(1, int(np.mean([approx_tokens(text) for _, text in index.passages])))
+    segments = max(1, min(len(index), budget_tokens // average_cost))
+    scores = index.scores(index.keywords())
+    bounds = np.linspace(0, len(index), segments + 1).astype(int)
+    order = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end > start:
+            order.append(start + int(np.argmax(scores[start:end])))
+    return _pick(index, order, budget_tokens)
+
+
+def format_passages(passages):
+    """LLM kontekst matni: har parcha sahifa raqami bilan"""
+    return "\n\n".join(
+        f"[{page_number}-sahifa] {text}" if page_number else text
+        for page_number, text in passages
+    )
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _book_signature(book):
+    """Sahifalar almashtirilsa (BookPageWriter) id lar o'zgaradi - shu bilan eskirganini bilish"""
+    stats = book.pages.aggregate(count=Count('id'), last=Max('id'))
+    if stats['count']:
+        return 'pages', stats['count'], stats['last']
+    return 'content', len(book.content or ''), hash(book.content or '')
+
+
+def get_passage_index(book):
+    """Kitob parchalar indeksi (jarayon ichida LRU keshlanadi)"""
+    signature = _book_signature(book)
+    with _indexes_lock:
+        cached = _indexes.get(book.pk)
+        if cached is not None and cached[0] == signature:
+            _indexes.move_to_end(book.pk)
+            return cached[1]
+
+    if signature[0] == 'pages':
+        passages = [
+            (page_number, passage)
+            for page_number, text in book.pages.order_by('page_number').values_list('page_number', 'text').iterator()
+            for passage in split_passages(text)
+        ]
+    else:
+        passages = [(None, passage) for passage in split_passages(book.content)]
+    index = PassageIndex(passages)
+    logger.info(f"PASSAGES: book={book.pk} parchalar={len(index)} termlar={len(index.postings)}")
+
+    with _indexes_lock:
+        _indexes[book.pk] = (signature, index)
+        _indexes.move_to_end(book.pk)
+        while len(_indexes) > CACHED_BOOKS:
+            _indexes.popitem(last=False)
+    return index
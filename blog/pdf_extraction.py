@@ -0,0 +1,196 @@
+"""
+PDF sahifalarini parallel o'qish
+PDF sahifa oraliqlariga (RANGE_SIZE) bo'linadi, oraliqlar jarayonlar hovuzida o'qiladi va
+natija sahifa tartibida oqim (generator) bo'lib qaytadi - BookPageWriter ga to'g'ridan-to'g'ri.
+
+    - matn: PyMuPDF (fitz) bo'lsa u bilan (pdfplumber dan bir necha barobar tez), bo'lmasa pdfplumber
+    - jadvallar: pdfplumber extract_tables() faqat jadvalga o'xshagan sahifalarda
+      (chiziqlar/to'rtburchaklar ko'p yoki satrlarning ko'pi raqamli ustunlar); PyMuPDF da
+      chiziqlar (get_drawings - qimmat) faqat matn joylashuvi jadvalga o'xshasa sanaladi
+
+Ingestion worker ichida (jarayonlar hovuzining bolasi) sahifalar ketma-ket o'qiladi -
+u yerda fayllarning o'zi parallel tahlil qilinadi.
+"""
+import os
+import re
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+PROCESSES = getattr(settings, 'PDF_EXTRACTION_PROCESSES', None) or os.cpu_count() or 1
+RANGE_SIZE = 25
+# Bundan kichik PDF uchun jarayonlar ishga tushirishga arzimaydi
+MIN_PARALLEL_PAGES = 2 * RANGE_SIZE
+
+# Jadval belgilari: chizilgan chiziq/katak soni yoki raqamli ustunli satrlar ulushi
+TABLE_MIN_RULINGS = 6
+TABLE_MIN_ROWS = 3
+TABLE_ROW_RATIO = 0.3
+# Chizilgan jadval kataklari fitz matnida alohida qisqa satrlar bo'lib chiqadi
+TABLE_SHORT_LINE_WORDS = 3
+TABLE_SHORT_LINE_RATIO = 0.5
+_COLUMNS_RE = re.compile(r'\S+(?:\s{2,}|\t)\S+(?:\s{2,}|\t)\S+')
+_NUMERIC_CELLS_RE = re.compile(r'(?:^|\s)[-+]?\d[\d\s.,%]*(?=\s|$)')
+
+
+def looks_tabular(text, rulings=0):
+    """Sahifada jadval bo'lishi ehtimoli (arzon tekshiruv - extract_tables() faqat shunda)"""
+    if rulings >= TABLE_MIN_RULINGS:
+        return True
+    lines = [line for line in (text or '').splitlines() if line.strip()]
+    if len(lines) < TABLE_MIN_ROWS:
+        return False
+    rows = sum(
+        1 for line in lines
+        if _COLUMNS_RE.search(line) or len(_NUMERIC_CELLS_RE.findall(line)) >= 3
+    )
+    return rows >= TABLE_MIN_ROWS and rows / len(lines) >= TABLE_ROW_RATIO
+
+
+def may_have_rulings(text):
+    """
+    Chiziqlarni sanashga arziydimi: satrlarning ko'pi qisqa (katakka o'xshash).
+    Oddiy matnli sahifada get_drawings() chaqirilmaydi - u har sahifaning vektor grafikasini yig'adi.
+    """
+    lines = [line for line in (text or '').splitlines() if line.strip()]
+    if len(lines) < TABLE_MIN_ROWS:
+        return False
+    short = sum(1 for line in lines if len(line.split()) <= TABLE_SHORT_LINE_WORDS)
+    return short / len(lines) >= TABLE_SHORT_LINE_RATIO
+
+
+def _tables_text(page):
+    """pdfplumber sahifasidagi jadvallar - har qator 'a | b | c' ko'rinishida"""
+    text = ''
+    for table in page.extract_tables() or []:
+        for row in table:
+            if row:
+                text += '\n' + ' | '.join(str(cell) if cell else '' for cell in row)
+    return text
+
+
+def page_count(path):
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            return doc.page_count
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+
+def _extract_range_fitz(path, start, end):
+    texts = {}
+    tabular = []
+    with fitz.open(path) as doc:
+        for index in range(start, end):
+            page = doc[index]
+            text = page.get_text()
+            texts[index] = text
+            if looks_tabular(text):
+                tabular.append(index)
+            elif may_have_rulings(text):
+                rulings = sum(1 for drawing in page.get_drawings() for item in drawing['items'] if item[0] in ('l', 're'))
+                if rulings >= TABLE_MIN_RULINGS:
+                    tabular.append(index)
+    _append_tables(path, texts, tabular)
+    return [(index + 1, texts[index]) for index in range(start, end)]
+
+
+def _append_tables(path, texts, tabular):
+    """Jadvalga o'xshagan sahifalar matniga pdfplumber jadvallarini qo'shish"""
+    if not tabular:
+        return
+    import pdfplumber
+    with pdfplumber.open(path, pages=[index + 1 for index in tabular]) as pdf:
+        for index, page in zip(tabular, pdf.pages):
+            texts[index] += _tables_text(page)
+
+
+def _extract_range_pdfplumber(path, start, end):
+    import pdfplumber
+
+    pages = []
+    with pdfplumber.open(path, pages=list(range(start + 1, end + 1))) as pdf:
+        for index, page in zip(range(start, end), pdf.pages):
+            text = page.extract_text() or ''
+            if looks_tabular(text, len(page.lines) + len(page.rects)):
+                text += _tables_text(page)
+            pages.append((index + 1, text))
+            # pdfplumber sahifa obyektlari keshini bo'shatish (katta PDF da xotira o'smasin)
+            page.flush_cache()
+    return pages
+
+
+def _extract_range_pypdf(path, start, end):
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    texts = {index: reader.pages[index].extract_text() or '' for index in range(start, end)}
+    _append_tables(path, texts, [index for index, text in texts.items() if looks_tabular(text)])
+    return [(index + 1, texts[index]) for index in range(start, end)]
+
+
+# Matn dvigatellari; qaysi biri tanlanishi - engine_selection (o'lchangan statistika bo'yicha)
+ENGINES = {
+    'pymupdf': _extract_range_fitz,
+    'pdfplumber': _extract_range_pdfplumber,
+    'pypdf': _extract_range_pypdf,
+}
+
+
+def available_engines():
+    return [name for name in ENGINES if name != 'pymupdf' or fitz is not None]
+
+
+def extract_range(path, start, end, engine=None):
+    """
+    [start, end) oralig'idagi sahifalar (0 dan boshlab) - jarayon hovuzida ishlaydi
+    :param engine: ENGINES kaliti; None - PyMuPDF, bo'lmasa pdfplumber
+    :return: [(sahifa raqami, matn), ...]
+    """
+    if engine is not None:
+        return ENGINES[engine](path, start, end)
+    if fitz is not None:
+        try:
+            return _extract_range_fitz(path, start, end)
+        except Exception as e:
+            logger.warning(f"PDF_EXTRACTION: PyMuPDF xatosi ({start}-{end}), pdfplumber ishlatiladi: {e}")
+    return _extract_range_pdfplumber(path, start, end)
+
+
+def _default_processes():
+    # Hovuz bolasi (masalan ingestion parse_file) ichida yana hovuz ochilmaydi
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return PROCESSES
+
+
+def iter_pages(path, processes=None, range_size=RANGE_SIZE, engine=None):
+    """
+    PDF sahifalari tartib bilan: (sahifa raqami, matn)
+    Oraliqlar parallel o'qiladi, natija esa tayyor bo'lishi bilan tartibda beriladi.
+    :param engine: ENGINES kaliti; None - standart (PyMuPDF -> pdfplumber)
+    """
+    total = page_count(path)
+    processes = processes or _default_processes()
+    ranges = [(start, min(start + range_size, total)) for start in range(0, total, range_size)]
+
+    if processes <= 1 or total < MIN_PARALLEL_PAGES:
+        for start, end in ranges:
+            yield from extract_range(path, start, end, engine)
+        return
+
+    workers = min(processes, len(ranges))
+    logger.info(f"PDF_EXTRACTION: {total} sahifa, {len(ranges)} oraliq, {workers} jarayon")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map natijalarni yuborilgan tartibda beradi - keyingi oraliqlar fonda o'qilaveradi
+        for pages in pool.map(extract_range, *zip(*[(path, start, end, engine) for start, end in ranges])):
+            yield from pages
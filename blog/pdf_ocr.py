@@ -0,0 +1,161 @@
+"""
+PDF uchun sahifa darajasidagi OCR
+Aralash PDF (asosan matn, ba'zi sahifalar skaner) da butun hujjatni emas, faqat matn qatlami
+yo'q sahifalarni OCR qilamiz:
+    - pdf_extraction.iter_pages dan kelgan sahifa matni bo'sh bo'lsa - OCR navbatiga
+    - OCR cheklangan sonli oqimda (tesseract alohida jarayon - GIL ushlab turmaydi)
+    - natija sahifa xeshi bo'yicha diskda keshlanadi (ConversionCache) - bir xil skaner
+      sahifa (qayta yuklangan kitob, boshqa nashr) qayta OCR qilinmaydi
+
+Kerakli kutubxonalar: pytesseract va sahifani rasmga aylantirish uchun PyMuPDF yoki pdf2image.
+Ular bo'lmasa sahifalar o'zgarishsiz o'tadi.
+"""
+import os
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from .conversion_cache import ConversionCache
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+OCR_LANGUAGES = getattr(settings, 'OCR_LANGUAGES', 'eng+uzb+rus')
+OCR_DPI = getattr(settings, 'OCR_DPI', 200)
+OCR_WORKERS = getattr(settings, 'OCR_WORKERS', 2)
+OCR_CACHE_DIR = getattr(settings, 'OCR_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'ocr'))
+OCR_CACHE_MAX_BYTES = 100 * 1024 * 1024
+# Shundan kam belgili sahifa matn qatlamisiz hisoblanadi
+MIN_TEXT_CHARS = 10
+# Tartibni saqlash uchun navbatda kutib turadigan sahifalar chegarasi (xotira cheklanadi)
+MAX_IN_FLIGHT = 4 * OCR_WORKERS
+
+# Har bir tesseract bitta yadro ishlatsin - parallellik OCR_WORKERS bilan boshqariladi
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+
+def ocr_available():
+    try:
+        import pytesseract  # noqa: F401
+    except ImportError:
+        return False
+    if fitz is not None:
+        return True
+    try:
+        import pdf2image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def needs_ocr(text):
+    return len((text or '').strip()) < MIN_TEXT_CHARS
+
+
+_cache = None
+
+
+def get_ocr_cache():
+    global _cache
+    if _cache is None:
+        _cache = ConversionCache(directory=OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES, stats_prefix='ocr_cache_')
+    return _cache
+
+
+def _cache_format():
+    return f"ocr:{OCR_LANGUAGES}:{OCR_DPI}"
+
+
+def _render_fitz(path, page_number):
+    from PIL import Image
+
+    with fitz.open(path) as doc:
+        pixmap = doc[page_number - 1].get_pixmap(dpi=OCR_DPI)
+        return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def page_source(path, page_number):
+    """
+    Sahifa xeshi va rasmni chizuvchi funksiya; bo'sh sahifa (rasm ham, chizma ham yo'q) - (None, None)
+    PyMuPDF bilan xesh sahifa oqimlaridan olinadi - keshdan topilsa rasm umuman chizilmaydi.
+    """
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            page = doc[page_number - 1]
+            images = page.get_images(full=True)
+            if not images and not page.get_drawings():
+                return None, None
+            digest = hashlib.sha256(page.read_contents())
+            for image in images:
+                digest.update(doc.xref_stream_raw(image[0]) or b'')
+        return digest.hexdigest(), lambda: _render_fitz(path, page_number)
+
+    from pdf2image import convert_from_path
+    image = convert_from_path(path, dpi=OCR_DPI, first_page=page_number, last_page=page_number)[0]
+    return hashlib.sha256(image.tobytes()).hexdigest(), lambda: image
+
+
+def ocr_page(path, page_number):
+    """Bitta sahifani OCR qilish (keshdan yoki tesseract bilan)"""
+    import pytesseract
+
+    digest, render = page_source(path, page_number)
+    if digest is None:
+        return ''
+    ocr_cache = get_ocr_cache()
+    cached = ocr_cache.open(digest, _cache_format(), 'r', encoding='utf-8')
+    if cached is not None:
+        with cached[0] as f:
+            return f.read()
+
+    text = pytesseract.image_to_string(render(), lang=OCR_LANGUAGES)
+    ocr_cache.put(digest, _cache_format(), {'page_number': page_number}, data=text.encode('utf-8'))
+    return text
+
+
+def _resolve(path, page_number, value):
+    if not isinstance(value, Future):
+        return page_number, value
+    try:
+        return page_number, value.result()
+    except Exception as e:
+        logger.error(f"PDF_OCR: {os.path.basename(path)} {page_number}-sahifa: {e}")
+        return page_number, ''
+
+
+def fill_missing_pages(path, pages, workers=OCR_WORKERS):
+    """
+    Sahifalar oqimidagi matnsiz sahifalarni OCR bilan to'ldirish
+    :param pages: (sahifa raqami, matn) iteratori (pdf_extraction.iter_pages)
+    :return: xuddi shu tartibda (sahifa raqami, matn)
+    """
+    if not ocr_available():
+        yield from pages
+        return
+
+    ocr_count = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = deque()
+        for page_number, text in pages:
+            if needs_ocr(text):
+                pending.append((page_number, pool.submit(ocr_page, path, page_number)))
+                ocr_count += 1
+            else:
+                pending.append((page_number, text))
+            # Tayyor bo'lganlarini tartib bilan berish; navbat to'lsa birinchisini kutish
+            while pending and (
+                not isinstance(pending[0][1], Future) or pending[0][1].done() or len(pending) > MAX_IN_FLIGHT
+            ):
+                yield _resolve(path, *pending.popleft())
+        while pending:
+            yield _resolve(path, *pending.popleft())
+
+    if ocr_count:
+        logger.info(f"PDF_OCR: {os.path.basename(path)} - {ocr_count} ta sahifa OCR qilindi")
@@ -0,0 +1,344 @@
+"""
+Qidiruv so'rovini oflayn tahlil qilish (tashqi API'siz)
+    - imlo tuzatish: SymSpell (symmetric delete) - lug'at qidiruv indeksidagi so'zlardan
+    - kalit so'zlar: stop-so'zlarsiz
+    - sinonimlar jadvali
+LLM (Groq) faqat ixtiyoriy boyitish sifatida ishlatiladi (AI_SEARCH_LLM_ANALYSIS).
+Lug'atdagi so'zlar indeks termlari (o'zaklar) - imlo o'zak bo'yicha tuzatiladi.
+
+Lug'at (SearchPosting bo'yicha GROUP BY) qidiruv so'rovida hisoblanmaydi: run_ingestion_worker
+uni keshga yozadi (publish_vocabulary), jarayonlar SymSpell ni fon oqimida quradi va shu
+paytgacha eski lug'at (birinchi marta - bo'sh) bilan ishlaydi.
+"""
+import time
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Sum
+
+from . import uzbek_text
+
+logger = logging.getLogger(__name__)
+
+MAX_EDIT_DISTANCE = getattr(settings, 'SPELL_MAX_EDIT_DISTANCE', 2)
+PREFIX_LENGTH = 7
+# Lug'atga eng ko'p uchraydigan shuncha so'z olinadi (har bir jarayon xotirasi uchun chegara)
+MAX_VOCABULARY = getattr(settings, 'SPELL_MAX_VOCABULARY', 30000)
+MIN_TERM_FREQUENCY = 2
+MIN_CORRECTABLE_LENGTH = 4
+# Indeks o'zgarganda lug'at ko'pi bilan shuncha vaqtda bir qayta quriladi (soniya)
+REBUILD_INTERVAL = 300
+VOCABULARY_VERSION_KEY = 'search_vocabulary_version'
+# {'version': indeks versiyasi, 'built_at': time.time(), 'words': [(so'z, chastota), ...]}
+VOCABULARY_KEY = 'search_vocabulary'
+VOCABULARY_LOCK_KEY = 'search_vocabulary_building'
+
+STOP_WORDS = frozenset("""
+    va bilan uchun bu shu o'sha u ul men sen biz siz ular ham esa lekin ammo biroq yoki yo
+    ni da dan ga ning ka qa ta deb degan kabi haqida haqda orqali sari tomon bo'yicha
+    nima nimani nimaga nimada kim kimni kimga qanday qanaqa qachon nega nechun qaysi qayer
+    qayerda qayerga necha nechta qancha mi
+    edi emas ekan bor yo'q bo'lgan bo'ladi bo'lib bo'lsa qilib qildi qilgan qiladi
+    har bir hech barcha hamma juda eng yana endi hali faqat ko'p kam
+    menga menda meni senga sizga ularni uning ularning mening sening bizning
+    ayt ayting aytib ber bering kerak mumkin iltimos
+""".split())
+
+QUESTION_WORDS = (
+    'nima', 'kim', 'qanday', 'qachon', 'nega', 'qaysi', 'qayer', 'necha', 'qancha', 'nimaga',
+)
+
+# Har bir guruhdagi so'zlar bir-biriga sinonim
+SYNONYM_GROUPS = [
+    ("muhabbat", "sevgi", "ishq"),
+    ("kitob", "asar"),
+    ("do'st", "o'rtoq", "oshna"),
+    ("vatan", "yurt", "el"),
+    ("ona", "volida"),
+    ("ota", "padar"),
+    ("o'lim", "vafot", "ajal"),
+    ("baxt", "saodat"),
+    ("qayg'u", "g'am", "alam", "hasrat"),
+    ("urush", "jang"),
+    ("bola", "farzand"),
+    ("dono", "oqil", "aqlli"),
+    ("go'zal", "chiroyli", "husn"),
+    ("yosh", "navqiron"),
+    ("tun", "kecha"),
+    ("kun", "nahor"),
+    ("yo'l", "safar"),
+    ("ilm", "bilim"),
+    ("xalq", "millat"),
+    ("shoir", "adib", "yozuvchi"),
+]
+# O'zak -> sinonimlar (so'rovdagi kitobim, kitoblar ham topiladi)
+SYNONYMS = {}
+for _group in SYNONYM_GROUPS:
+    for _word in _group:
+        SYNONYMS[uzbek_text.stem(_word)] = [other for other in _group if other != _word]
+
+
+def damerau_levenshtein(a, b, max_distance):
+    """
+    Tahrir masofasi (qo'shni harflar almashinuvi bilan, optimal string alignment)
+    max_distance dan oshsa max_distance + 1 qaytadi
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymSpell:
+    """
+    Symmetric delete imlo tuzatuvchi.
+    Har bir lug'at so'zining (prefiksining) max_edit_distance tagacha o'chirilgan variantlari oldindan
+    saqlanadi; so'rov so'zining o'chirishlari shu jadvaldan qidiriladi - masofa faqat nomzodlar uchun hisoblanadi.
+    """
+
+    def __init__(self, max_edit_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.deletes = {}
+
+    def _deletes(self, word):
+        """So'z prefiksining max_edit_distance tagacha harfi o'chirilgan variantlari"""
+        word = word[:self.prefix_length]
+        result = {word}
+        frontier = {word}
+        for _ in range(self.max_edit_distance):
+            next_frontier = set()
+            for item in frontier:
+                if len(item) <= 1:
+                    continue
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            next_frontier -= result
+            result |= next_frontier
+            frontier = next_frontier
+        return result
+
+    def add_word(self, word, count):
+        if word in self.words:
+            self.words[word] += count
+            return
+        self.words[word] = count
+        for variant in self._deletes(word):
+            bucket = self.deletes.get(variant)
+            if bucket is None:
+                self.deletes[variant] = word
+            elif isinstance(bucket, str):
+                self.deletes[variant] = [bucket, word]
+            else:
+                bucket.append(word)
+
+    def lookup(self, word):
+        """
+        Eng yaqin lug'at so'zi
+        :return: (so'z, masofa, chastota) yoki None
+        """
+        if word in self.words:
+            return word, 0, self.words[word]
+
+        candidates = set()
+        for variant in self._deletes(word):
+            bucket = self.deletes.get(variant)
+            if bucket is None:
+                continue
+            if isinstance(bucket, str):
+                candidates.add(bucket)
+            else:
+                candidates.update(bucket)
+
+        best = None
+        for candidate in candidates:
+            distance = damerau_levenshtein(word, candidate, self.max_edit_distance)
+            if distance > self.max_edit_distance:
+                continue
+            key = (distance, -self.words[candidate])
+            if best is None or key < best[0]:
+                best = (key, candidate)
+        if best is None:
+            return None
+        (distance, negative_count), candidate = best
+        return candidate, distance, -negative_count
+
+    def __len__(self):
+        return len(self.words)
+
+
+def load_vocabulary(limit=MAX_VOCABULARY):
+    """Qidiruv indeksidagi eng ko'p uchraydigan so'zlar: [(so'z, chastota), ...]"""
+    from .models import SearchPosting
+
+    rows = (
+        SearchPosting.objects.values('term')
+        .annotate(total=Sum('frequency'))
+        .filter(total__gte=MIN_TERM_FREQUENCY)
+        .order_by('-total')[:limit]
+    )
+    return [(row['term'], row['total']) for row in rows if row['term'].isalpha() or "'" in row['term']]
+
+
+def bump_vocabulary_version():
+    """Indeks o'zgarganda chaqiriladi (search_index.index_book / remove_book)"""
+    try:
+        cache.set(VOCABULARY_VERSION_KEY, time.time(), None)
+    except Exception as e:
+        logger.warning(f"QUERY_ANALYSIS: lug'at versiyasini yangilab bo'lmadi: {e}")
+
+
+def publish_vocabulary(force=False):
+    """
+    Lug'atni bazadan yig'ib keshga yozish (run_ingestion_worker davriy chaqiradi)
+    Indeks o'zgarmagan yoki oxirgi yig'ishdan REBUILD_INTERVAL o'tmagan bo'lsa - hech narsa qilmaydi.
+    :return: keshdagi yozuv yoki None (boshqa jarayon yig'ayapti)
+    """
+    version = cache.get(VOCABULARY_VERSION_KEY)
+    entry = cache.get(VOCABULARY_KEY)
+    if not force and entry is not None and (
+        entry['version'] == version or time.time() - entry['built_at'] < REBUILD_INTERVAL
+    ):
+        return entry
+    # Bir vaqtda faqat bitta jarayon GROUP BY bajaradi
+    if not cache.add(VOCABULARY_LOCK_KEY, 1, 120):
+        return entry
+    try:
+        started = time.monotonic()
+        entry = {'version': version, 'built_at': time.time(), 'words': load_vocabulary()}
+        cache.set(VOCABULARY_KEY, entry, None)
+        logger.info(
+            f"QUERY_ANALYSIS: lug'at yig'ildi ({len(entry['words'])} so'z, {time.monotonic() - started:.2f}s)"
+        )
+        return entry
+    finally:
+        cache.delete(VOCABULARY_LOCK_KEY)
+
+
+_speller = None
+_speller_version = None
+_speller_built_at = 0
+_speller_lock = threading.Lock()
+_speller_building = False
+
+
+def _build_speller(background=True):
+    """Keshdagi (bo'lmasa - yig'ilgan) lug'atdan SymSpell qurish"""
+    global _speller, _speller_version, _speller_built_at, _speller_building
+    try:
+        started = time.monotonic()
+        entry = publish_vocabulary()
+        if entry is None:
+            return
+        speller = SymSpell()
+        for term, count in entry['words']:
+            speller.add_word(term, count)
+        _speller, _speller_version = speller, entry['version']
+        logger.info(
+            f"QUERY_ANALYSIS: lug'at qurildi ({len(speller)} so'z, "
+            f"{time.monotonic() - started:.2f}s)"
+        )
+    except Exception as e:
+        logger.error(f"QUERY_ANALYSIS: lug'atni qurib bo'lmadi: {e}")
+    finally:
+        _speller_built_at = time.monotonic()
+        _speller_building = False
+        if background:
+            # Fon oqimi ochgan baza ulanishi
+            connections.close_all()
+
+
+def get_speller(block=False):
+    """
+    Jarayon ichidagi SymSpell. Indeks o'zgargan bo'lsa (REBUILD_INTERVAL dan keyin) fon oqimida
+    qayta quriladi - so'rov kutmaydi, shu paytgacha eski lug'at qaytadi (birinchi marta - bo'sh)
+    :param block: qurilishini kutish (buyruqlar va testlar uchun)
+    """
+    global _speller_building
+
+    version = cache.get(VOCABULARY_VERSION_KEY)
+    stale = _speller is None or (
+        version != _speller_version and time.monotonic() - _speller_built_at >= REBUILD_INTERVAL
+    )
+    if stale:
+        with _speller_lock:
+            if block:
+                _speller_building = True
+                _build_speller(background=False)
+            elif not _speller_building:
+                _speller_building = True
+                threading.Thread(target=_build_speller, name='speller-build', daemon=True).start()
+    return _speller if _speller is not None else SymSpell()
+
+
+def is_stop_word(word, stem):
+    return word in STOP_WORDS or stem in STOP_WORDS
+
+
+def is_question(query):
+    lowered = uzbek_text.fold(query.strip())
+    return lowered.endswith('?') or lowered.startswith(QUESTION_WORDS)
+
+
+def analyze_query(query, speller=None):
+    """
+    So'rovni tahlil qilish (so'zlar uzbek_text.fold bilan lotin/kanonik shaklga keltiriladi)
+    Imlo o'zak bo'yicha tekshiriladi, qo'shimchalar saqlanadi: muhabatni -> muhabbatni
+    :return: {'corrected', 'corrections', 'keywords', 'synonyms', 'is_question'}
+        corrections - {asl so'z: tuzatilgan so'z}
+    """
+    speller = speller if speller is not None else get_speller()
+
+    corrected_words = []
+    corrections = {}
+    stems = {}
+    for word in uzbek_text.words(query):
+        stem, suffix = uzbek_text.split_suffixes(word)
+        replacement = word
+        if (not is_stop_word(word, stem) and len(stem) >= MIN_CORRECTABLE_LENGTH
+                and not any(ch.isdigit() for ch in stem)):
+            match = speller.lookup(stem)
+            if match and match[1] > 0:
+                stem = match[0]
+                replacement = stem + suffix
+                corrections[word] = replacement
+        corrected_words.append(replacement)
+        stems[replacement] = stem
+
+    keywords = []
+    for word in corrected_words:
+        if not is_stop_word(word, stems[word]) and len(word) > 2 and word not in keywords:
+            keywords.append(word)
+
+    synonyms = []
+    for word in keywords:
+        for synonym in SYNONYMS.get(stems[word], ()):
+            if synonym not in keywords and synonym not in synonyms:
+                synonyms.append(synonym)
+
+    return {
+        'corrected': ' '.join(corrected_words),
+        'corrections': corrections,
+        'keywords': keywords,
+        'synonyms': synonyms,
+        'is_question': is_question(query),
+    }
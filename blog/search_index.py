@@ -0,0 +1,250 @@
+"""
+Kitob matnlari bo'yicha inverted index (qidiruv indeksi)
+So'z -> kitob/sahifa/pozitsiya postinglari
+Termlar uzbek_text.normalize_term bilan kanonik shaklda (lotin, apostroflar birxil, o'zak) saqlanadi.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .uzbek_text import TOKEN_RE, normalize_term
+
+logger = logging.getLogger(__name__)
+
+MAX_TERM_LENGTH = 64
+POSTINGS_BATCH_SIZE = 1000
+SNIPPET_RADIUS = 150
+
+
+def tokenize(text):
+    """
+    Matnni so'zlarga ajratish
+    Pozitsiya va uzunlik asl matn bo'yicha (snippet uchun), term - kanonik shakl
+    :return: (tartib raqami, boshlanish pozitsiyasi, uzunlik, term) ro'yxati
+    """
+    tokens = []
+    for ordinal, match in enumerate(TOKEN_RE.finditer(text or '')):
+        term = normalize_term(match.group())
+        if len(term) > MAX_TERM_LENGTH:
+            continue
+        tokens.append((ordinal, match.start(), match.end() - match.start(), term))
+    return tokens
+
+
+def _bump_versions():
+    from .query_analysis import bump_vocabulary_version
+    from .search_results import bump_results_version
+    bump_vocabulary_version()
+    bump_results_version()
+
+
+def index_changed():
+    """
+    Indeks o'zgardi: imlo lug'ati (query_analysis) va natijalar keshi (search_results) eskiradi
+    Tranzaksiya ichida (ingestion, BookPageWriter) - commit dan keyin: aks holda parallel qidiruv
+    commit qilinmagan eski postinglardan natijani yangi versiya kaliti bilan keshlab qo'yadi.
+    """
+    transaction.on_commit(_bump_versions)
+
+
+def index_book(book, pages=None):
+    """
+    Kitob sahifalarini indekslash - eski postinglar yangisi bilan almashtiriladi
+    :param book: Book obyekti
+    :param pages: (page_number, text) juftliklari; berilmasa bazadan o'qiladi
+    :return: yaratilgan postinglar soni
+    """
+    from .models import SearchPosting
+
+    if pages is None:
+        pages = book.pages.values_list('page_number', 'text').iterator()
+
+    # term -> [[sahifa, tartib, pozitsiya, uzunlik], ...]
+    positions = defaultdict(list)
+    for page_number, text in pages:
+        for ordinal, offset, length, term in tokenize(text):
+            positions[term].append([page_number, ordinal, offset, length])
+
+    postings = [
+        SearchPosting(book_id=book.pk, term=term, positions=term_positions, frequency=len(term_positions))
+        for term, term_positions in positions.items()
+    ]
+
+    with transaction.atomic():
+        SearchPosting.objects.filter(book_id=book.pk).delete()
+        SearchPosting.objects.bulk_create(postings, batch_size=POSTINGS_BATCH_SIZE)
+
+    # Matn o'zgardi - o'xshash kitoblar worker tomonidan qayta hisoblanadi
+    from .similarity import mark_stale
+    mark_stale(book.pk)
+
+    index_changed()
+    logger.info(f"SEARCH_INDEX: book={book.pk} terms={len(postings)}")
+    return len(postings)
+
+
+def remove_book(book_id):
+    """Kitobni indeksdan olib tashlash"""
+    from .models import SearchPosting
+    SearchPosting.objects.filter(book_id=book_id).delete()
+    index_changed()
+
+
+def _postings_for(token, prefix, book_filter):
+    """Bitta so'z uchun postinglar querysi (prefix - so'z boshi bo'yicha)"""
+    from .models import SearchPosting
+
+    qs = SearchPosting.objects.filter(**book_filter)
+    if prefix:
+        # Range so'rov - B-tree indeksdan foydalanadi (LIKE dan farqli)
+        qs = qs.filter(term__gte=token, term__lt=token + '\uffff')
+    else:
+        qs = qs.filter(term=token)
+    return qs
+
+
+def query_terms(query):
+    """So'rovning kanonik termlari"""
+    return [term for _, _, _, term in tokenize(query)]
+
+
+def _match_phrase(tokens, book_filter):
+    """
+    Ketma-ket kelgan termlar (ibora) uchrashlari; oxirgi term prefix sifatida
+    :return: [{'book_id', 'page_number', 'position', 'length'}, ...]
+    """
+    # Har bir so'z uchun: book_id -> {(sahifa, tartib): (pozitsiya, uzunlik)}
+    per_token = []
+    for i, token in enumerate(tokens):
+        is_last = i == len(tokens) - 1
+        by_book = defaultdict(dict)
+        for book_id, positions in _postings_for(token, is_last, book_filter).values_list('book_id', 'positions'):
+            for page_number, ordinal, offset, length in positions:
+                by_book[book_id][(page_number, ordinal)] = (offset, length)
+        if not by_book:
+            return []
+        per_token.append(by_book)
+
+    occurrences = []
+    common_books = set(per_token[0])
+    for by_book in per_token[1:]:
+        common_books &= set(by_book)
+
+    for book_id in common_books:
+        first = per_token[0][book_id]
+        for (page_number, ordinal), (offset, length) in first.items():
+            end = offset + length
+            matched = True
+            for step, by_book in enumerate(per_token[1:], start=1):
+                hit = by_book[book_id].get((page_number, ordinal + step))
+                if hit is None:
+                    matched = False
+                    break
+                end = hit[0] + hit[1]
+            if matched:
+                occurrences.append({
+                    'book_id': book_id,
+                    'page_number': page_number,
+                    'position': offset,
+                    'length': end - offset,
+                })
+    return occurrences
+
+
+def search_occurrences(query, author_id=None):
+    """
+    So'rovning barcha uchrashlarini indeksdan topish
+    Bir nechta so'zli so'rov ketma-ket kelgan so'zlar (ibora) sifatida qidiriladi,
+    oxirgi so'z prefix sifatida mos keladi (kitob -> kitobxon; kitoblar, kitobning - o'zak orqali).
+    :return: [{'book_id', 'page_number', 'position', 'length'}, ...]
+    """
+    tokens = query_terms(query)
+    if not tokens:
+        return []
+    return _match_phrase(tokens, {'book__author_id': author_id} if author_id else {})
+
+
+def candidate_books(tokens, author_id=None):
+    """Barcha termlar uchraydigan kitoblar (pozitsiyalarni o'qimasdan)"""
+    book_filter = {'book__author_id': author_id} if author_id else {}
+    books = None
+    for i, token in enumerate(tokens):
+        ids = set(_postings_for(token, i == len(tokens) - 1, book_filter).values_list('book_id', flat=True))
+        books = ids if books is None else books & ids
+        if not books:
+            return set()
+    return books or set()
+
+
+def iter_occurrences(queries, author_id=None):
+    """
+    Bir nechta so'rov uchrashlarini dangasa (generator) qaytarish:
+    kitob nomi tartibida, har kitob ichida sahifa/pozitsiya bo'yicha.
+    Pozitsiyalar kitobma-kitob o'qiladi - sahifa to'lganda iteratsiyani to'xtatish kifoya.
+    Bir xil termlarga keladigan so'rovlar (kitoblar / kitoblarni) bir marta qidiriladi.
+    :return: {'book_id', 'page_number', 'position', 'length', 'search_term'} generatori
+    """
+    from .models import Book
+
+    phrases = []
+    seen_tokens = set()
+    for query in queries:
+        tokens = tuple(query_terms(query))
+        if tokens and tokens not in seen_tokens:
+            seen_tokens.add(tokens)
+            phrases.append((query, tokens, candidate_books(tokens, author_id)))
+
+    all_books = set().union(*(books for _, _, books in phrases)) if phrases else set()
+    if not all_books:
+        return
+
+    ordered = Book.objects.filter(id__in=all_books).order_by('title', 'id').values_list('id', flat=True)
+    for book_id in ordered:
+        found = {}
+        for query, tokens, books in phrases:
+            if book_id not in books:
+                continue
+            for occ in _match_phrase(tokens, {'book_id': book_id}):
+                key = (occ['page_number'], occ['position'])
+                if key not in found:
+                    occ['search_term'] = query
+                    found[key] = occ
+        for key in sorted(found):
+            yield found[key]
+
+
+def load_page_texts(keys):
+    """
+    Faqat kerakli sahifalar matnini olish (snippet uchun)
+    :param keys: (book_id, page_number) juftliklari
+    :return: {(book_id, page_number): text}
+    """
+    from .models import BookPage
+
+    keys = set(keys)
+    if not keys:
+        return {}
+    condition = Q()
+    for book_id, page_number in keys:
+        condition |= Q(book_id=book_id, page_number=page_number)
+    return {
+        (book_id, page_number): text
+        for book_id, page_number, text in BookPage.objects.filter(condition).values_list('book_id', 'page_number', 'text')
+    }
+
+
+def build_snippet(text, position, length, radius=SNIPPET_RADIUS):
+    """Topilgan joy atrofidagi matn va <mark> bilan ajratilgan variant"""
+    snippet_start = max(0, position - radius)
+    snippet_end = min(len(text), position + length + radius)
+    snippet = text[snippet_start:snippet_end]
+    highlight_start = position - snippet_start
+    highlight_end = highlight_start + length
+    highlighted = (
+        snippet[:highlight_start] +
+        f'<mark>{snippet[highlight_start:highlight_end]}</mark>' +
+        snippet[highlight_end:]
+    )
+    return snippet, highlighted
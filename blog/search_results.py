@@ -0,0 +1,89 @@
+"""
+ai_search_books natijalari keshi va kursor (cursor) bo'yicha sahifalash
+Natijalar search_index.iter_occurrences generatoridan faqat kerakli qismigacha olinadi;
+olingan qism (prefiks) normallashtirilgan so'rov kaliti ostida keshlanadi.
+Indeks o'zgarganda (index_book / remove_book) versiya oshadi - eski natijalar ishlatilmaydi.
+"""
+import json
+import time
+import hashlib
+import logging
+from itertools import islice
+
+from django.core import signing
+from django.core.cache import cache
+
+from .search_index import iter_occurrences
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 20
+# Birinchi so'rovda keyingi sahifalar uchun ham oldindan olinadigan natijalar
+PREFETCH = 100
+RESULTS_TTL = 60 * 10
+VERSION_KEY = 'search_results_version'
+CURSOR_SALT = 'blog.search_results.cursor'
+
+
+def bump_results_version():
+    try:
+        cache.set(VERSION_KEY, time.time(), None)
+    except Exception as e:
+        logger.warning(f"SEARCH_RESULTS: versiyani yangilab bo'lmadi: {e}")
+
+
+def _results_key(terms, author_id, version):
+    raw = json.dumps([terms, author_id, version], ensure_ascii=False)
+    return 'search_results_' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def get_page(terms, author_id=None, offset=0, limit=PAGE_SIZE):
+    """
+    Natijalar sahifasi
+    :param terms: qidiriladigan so'rovlar ro'yxati (tartibi muhim)
+    :return: {'results', 'has_more', 'total', 'unique_books', 'complete'}
+        complete=False bo'lsa total/unique_books - hozircha olingan natijalar (quyi chegara)
+    """
+    version = cache.get(VERSION_KEY, 0)
+    key = _results_key(terms, author_id, version)
+    needed = offset + limit + 1
+
+    entry = cache.get(key)
+    if entry is None or (not entry['exhausted'] and len(entry['items']) < needed):
+        # Generator boshidan qayta o'tiladi, lekin faqat kerakli joygacha (kitobma-kitob)
+        wanted = max(needed, PREFETCH, len(entry['items']) * 2 if entry else 0)
+        items = [
+            (occ['book_id'], occ['page_number'], occ['position'], occ['length'], terms.index(occ['search_term']))
+            for occ in islice(iter_occurrences(terms, author_id=author_id), wanted)
+        ]
+        entry = {'items': items, 'exhausted': len(items) < wanted}
+        cache.set(key, entry, RESULTS_TTL)
+
+    items = entry['items']
+    return {
+        'results': [
+            {
+                'book_id': book_id,
+                'page_number': page_number,
+                'position': position,
+                'length': length,
+                'search_term': terms[term_index],
+            }
+            for book_id, page_number, position, length, term_index in items[offset:offset + limit]
+        ],
+        'has_more': len(items) > offset + limit,
+        'total': len(items),
+        'unique_books': len({item[0] for item in items}),
+        'complete': entry['exhausted'],
+    }
+
+
+def make_cursor(terms, author_id, offset, query):
+    """Keyingi sahifa uchun shaffof bo'lmagan (imzolangan) kursor"""
+    return signing.dumps({'t': terms, 'a': author_id, 'o': offset, 'q': query}, salt=CURSOR_SALT, compress=True)
+
+
+def read_cursor(cursor):
+    """:return: (terms, author_id, offset, query); noto'g'ri kursor - signing.BadSignature"""
+    data = signing.loads(cursor, salt=CURSOR_SALT)
+    return data['t'], data['a'], int(data['o']), data['q']
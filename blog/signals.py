@@ -2,10 +2,14 @@
 Django Signals
 Avtomatik profile yaratish va boshqa hodisalar
 """
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
+from .models import Author, Book, BookPage, BookRating, Category
+from .catalog_search import bump_index_version, search_key_for
+from .tagged_cache import invalidate, tag
 from .models_social import UserProfile
 
 
@@ -23,3 +27,106 @@ def save_user_profile(sender, instance, **kwargs):
         instance.social_profile.save()
     except UserProfile.DoesNotExist:
         UserProfile.objects.create(user=instance)
+
+
+# ===== KITOB BAHOLARI STATISTIKASI =====
+
+@receiver(pre_save, sender=BookRating)
+def remember_old_rating(sender, instance, **kwargs):
+    """Baho o'zgartirilayotgan bo'lsa eski qiymatni eslab qolish"""
+    instance._old_rating = None
+    if instance.pk:
+        old = BookRating.objects.filter(pk=instance.pk).values('book_id', 'rating').first()
+        if old:
+            instance._old_rating = (old['book_id'], old['rating'])
+
+
+@receiver(post_save, sender=BookRating)
+def update_rating_stats_on_save(sender, instance, created, **kwargs):
+    """Book.rating_sum/rating_count/rating_avg ni inkremental yangilash"""
+    old = getattr(instance, '_old_rating', None)
+    if created or old is None:
+        Book.apply_rating_delta(instance.book_id, instance.rating, 1)
+    elif old[0] != instance.book_id:
+        Book.apply_rating_delta(old[0], -old[1], -1)
+        Book.apply_rating_delta(instance.book_id, instance.rating, 1)
+    elif old[1] != instance.rating:
+        Book.apply_rating_delta(instance.book_id, instance.rating - old[1], 0)
+
+
+@receiver(post_delete, sender=BookRating)
+def update_rating_stats_on_delete(sender, instance, **kwargs):
+    Book.apply_rating_delta(instance.book_id, -instance.rating, -1)
+
+
+# ===== KATALOG QIDIRUVI (trigram indeks) =====
+# Versiya commit dan keyin oshiriladi - aks holda boshqa jarayonlar indeksni yangi qator
+# ko'rinmasdan oldin qayta quradi va eski indeks yangi versiya bilan qoladi (ingestion, BookPageWriter)
+
+@receiver(post_save, sender=Author)
+def update_search_keys_on_author_save(sender, instance, created, **kwargs):
+    """Adib ismi o'zgarsa uning kitoblari search_key ni yangilash"""
+    if created:
+        return
+    books = list(instance.books.only('id', 'title', 'search_key'))
+    changed = []
+    for book in books:
+        key = search_key_for(book.title, instance.name)
+        if key != book.search_key:
+            book.search_key = key
+            changed.append(book)
+    if changed:
+        Book.objects.bulk_update(changed, ['search_key'], batch_size=500)
+        transaction.on_commit(bump_index_version)
+
+
+@receiver(post_save, sender=Book)
+def invalidate_catalog_index(sender, instance, **kwargs):
+    if getattr(instance, '_search_key_changed', True):
+        transaction.on_commit(bump_index_version)
+
+
+@receiver(post_delete, sender=Book)
+def invalidate_catalog_index_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(bump_index_version)
+
+
+# ===== TEGLANGAN KESH (tagged_cache.py) =====
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_cache(sender, instance, **kwargs):
+    invalidate(tag(Book), tag(Book, instance.pk))
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_cache(sender, instance, **kwargs):
+    invalidate(tag(Author), tag(Author, instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    invalidate(tag(Category), tag(Category, instance.pk))
+
+
+@receiver(post_save, sender=BookRating)
+@receiver(post_delete, sender=BookRating)
+def invalidate_rating_cache(sender, instance, **kwargs):
+    """Baholar kitob bo'yicha teglanadi: tag(BookRating, book_id)"""
+    tags = [tag(BookRating, instance.book_id)]
+    old = getattr(instance, '_old_rating', None)
+    if old and old[0] != instance.book_id:
+        tags.append(tag(BookRating, old[0]))
+    invalidate(*tags)
+
+
+@receiver(post_save, sender=BookPage)
+def invalidate_page_cache(sender, instance, **kwargs):
+    """
+    Sahifalar kitob bo'yicha teglanadi: tag(BookPage, book_id).
+    post_delete ulanmagan: u BookPageWriter dagi tezkor DELETE ni har sahifani yuklab o'chirishga
+    aylantirardi; BookPageWriter (bulk_create - signalsiz) tegni o'zi bekor qiladi.
+    """
+    invalidate(tag(BookPage, instance.book_id))
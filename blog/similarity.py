@@ -0,0 +1,306 @@
+"""
+O'xshash kitoblar modeli (oflayn hisoblanadi, natija SimilarBook jadvalida)
+Signal va og'irliklar:
+    matn      - SearchPosting dan TF-IDF vektorlar (kosinus)
+    kategoriya - umumiy kategoriyalar (Jaccard)
+    birga o'qilish - ReadingProgress/Favorite: ikkala kitobni o'qigan foydalanuvchilar (kosinus)
+    adib      - bir xil muallif
+Yangi/o'zgargan kitoblar (Book.similar_refreshed_at = None) run_ingestion_worker tomonidan
+inkremental yangilanadi; to'liq qayta hisoblash: python manage.py rebuild_similar_books
+"""
+import math
+import time
+import logging
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_BOOKS_COUNT = getattr(settings, 'SIMILAR_BOOKS_COUNT', 12)
+# Har kitob vektorida eng og'ir shuncha term qoldiriladi
+TERMS_PER_BOOK = 150
+# Kitoblarning shuncha ulushidan ko'pida uchraydigan termlar (umumiy so'zlar) hisobga olinmaydi
+MAX_DOCUMENT_FREQUENCY = 0.5
+WEIGHTS = {'text': 0.5, 'category': 0.2, 'coread': 0.2, 'author': 0.1}
+# Worker ichidagi model shuncha vaqtdan keyin bazadan qayta yuklanadi (soniya)
+MODEL_MAX_AGE = 60 * 60
+
+
+class SimilarityModel:
+    """Barcha kitoblar signallari xotirada; bitta kitob qo'shnilari vektor amallari bilan hisoblanadi"""
+
+    def __init__(self):
+        self.built_at = time.monotonic()
+        self.book_ids = []
+        self.positions = {}
+        self.document_frequency = {}
+        self.term_postings = defaultdict(lambda: ([], []))  # term -> (o'rinlar, og'irliklar)
+        self.vectors = {}  # o'rin -> {term: og'irlik}
+        self.authors = []
+        self.categories = []
+        self.category_books = defaultdict(set)
+        self.readers = []
+        self.user_books = defaultdict(set)
+        self._arrays = None
+        self._load()
+
+    # ----- yuklash -----
+
+    def _position(self, book_id, author_id):
+        position = self.positions.get(book_id)
+        if position is None:
+            position = self.positions[book_id] = len(self.book_ids)
+            self.book_ids.append(book_id)
+            self.authors.append(author_id)
+            self.categories.append(set())
+            self.readers.append(set())
+        return position
+
+    def _load(self):
+        from django.db.models import Count
+        from .models import Book, Favorite, ReadingProgress, SearchPosting
+
+        for book_id, author_id in Book.objects.values_list('id', 'author_id').iterator():
+            self._position(book_id, author_id)
+
+        for book_id, category_id in Book.categories.through.objects.values_list('book_id', 'category_id').iterator():
+            position = self.positions.get(book_id)
+            if position is not None:
+                self.categories[position].add(category_id)
+                self.category_books[category_id].add(position)
+
+        for model in (ReadingProgress, Favorite):
+            for user_id, book_id in model.objects.values_list('user_id', 'book_id').iterator():
+                position = self.positions.get(book_id)
+                if position is not None:
+                    self.readers[position].add(user_id)
+                    self.user_books[user_id].add(position)
+
+        self.document_frequency = dict(
+            SearchPosting.objects.values_list('term').annotate(df=Count('id')).values_list('term', 'df')
+        )
+        current_book, postings = None, []
+        for book_id, term, frequency in SearchPosting.objects.order_by('book_id').values_list(
+                'book_id', 'term', 'frequency').iterator(chunk_size=5000):
+            if book_id != current_book:
+                if current_book is not None:
+                    self._set_vector(current_book, postings)
+                current_book, postings = book_id, []
+            postings.append((term, frequency))
+        if current_book is not None:
+            self._set_vector(current_book, postings)
+
+    def _tfidf(self, postings):
+        """(term, tf) -> normallashtirilgan eng og'ir TERMS_PER_BOOK ta term"""
+        total_books = max(len(self.book_ids), 1)
+        weights = []
+        for term, frequency in postings:
+            df = self.document_frequency.get(term, 1)
+            if total_books >= 10 and df > total_books * MAX_DOCUMENT_FREQUENCY:
+                continue
+            weights.append(((1 + math.log(frequency)) * math.log(1 + total_books / df), term))
+        weights.sort(reverse=True)
+        weights = weights[:TERMS_PER_BOOK]
+        norm = math.sqrt(sum(w * w for w, _ in weights)) or 1.0
+        return {term: w / norm for w, term in weights}
+
+    def _set_vector(self, book_id, postings):
+        position = self.positions.get(book_id)
+        if position is None:
+            return
+        vector = self._tfidf(postings)
+        self.vectors[position] = vector
+        for term, weight in vector.items():
+            ids, values = self.term_postings[term]
+            ids.append(position)
+            values.append(weight)
+        self._arrays = None
+
+    def add_book(self, book):
+        """Yangi/o'zgargan kitobni modelga qo'shish (worker ichida, to'liq qayta yuklamasdan)"""
+        from .models import SearchPosting
+
+        position = self._position(book.pk, book.author_id)
+        old_vector = self.vectors.pop(position, None)
+        if old_vector:
+            for term in old_vector:
+                ids, values = self.term_postings[term]
+                keep = [(i, v) for i, v in zip(ids, values) if i != position]
+                self.term_postings[term] = ([i for i, _ in keep], [v for _, v in keep])
+        for category_id in self.categories[position]:
+            self.category_books[category_id].discard(position)
+        self.categories[position] = set(book.categories.values_list('id', flat=True))
+        for category_id in self.categories[position]:
+            self.category_books[category_id].add(position)
+        self._set_vector(book.pk, SearchPosting.objects.filter(book_id=book.pk).values_list('term', 'frequency'))
+
+    # ----- hisoblash -----
+
+    def _term_arrays(self, term):
+        if self._arrays is None:
+            self._arrays = {}
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            ids, values = self.term_postings.get(term, ([], []))
+            arrays = self._arrays[term] = (np.asarray(ids, dtype=np.int64), np.asarray(values, dtype=np.float32))
+        return arrays
+
+    def neighbours(self, book_id, count=SIMILAR_BOOKS_COUNT):
+        """:return: [(o'xshash book_id, ball), ...] ball bo'yicha kamayish tartibida"""
+        position = self.positions.get(book_id)
+        if position is None:
+            return []
+        n = len(self.book_ids)
+
+        text = np.zeros(n, dtype=np.float32)
+        for term, weight in self.vectors.get(position, {}).items():
+            ids, values = self._term_arrays(term)
+            text[ids] += weight * values
+
+        category = np.zeros(n, dtype=np.float32)
+        own_categories = self.categories[position]
+        if own_categories:
+            shared = np.zeros(n, dtype=np.float32)
+            for category_id in own_categories:
+                shared[list(self.category_books[category_id])] += 1
+            sizes = np.fromiter((len(c) for c in self.categories), dtype=np.float32, count=n)
+            category = shared / np.maximum(len(own_categories) + sizes - shared, 1)
+
+        coread = np.zeros(n, dtype=np.float32)
+        own_readers = self.readers[position]
+        if own_readers:
+            shared = np.zeros(n, dtype=np.float32)
+            for user_id in own_readers:
+                shared[list(self.user_books[user_id])] += 1
+            sizes = np.fromiter((len(r) for r in self.readers), dtype=np.float32, count=n)
+            coread = shared / np.sqrt(np.maximum(len(own_readers) * sizes, 1))
+
+        author = (np.asarray(self.authors) == self.authors[position]).astype(np.float32)
+
+        score = (WEIGHTS['text'] * text + WEIGHTS['category'] * category
+                 + WEIGHTS['coread'] * coread + WEIGHTS['author'] * author)
+        score[position] = 0
+        candidates = np.nonzero(score > 0)[0]
+        if len(candidates) > count:
+            candidates = candidates[np.argpartition(-score[candidates], count)[:count]]
+        candidates = candidates[np.argsort(-score[candidates], kind='stable')]
+        return [(self.book_ids[i], float(score[i])) for i in candidates]
+
+
+def save_neighbours(book_id, neighbours):
+    """Kitob qo'shnilarini jadvalga yozish (eskilari almashtiriladi)"""
+    from .models import Book, SimilarBook
+
+    # Model yuklangandan keyin o'chirilgan kitoblar tashlab ketiladi
+    existing = set(Book.objects.filter(pk__in=[book_id] + [i for i, _ in neighbours]).values_list('pk', flat=True))
+    if book_id not in existing:
+        return
+    neighbours = [(similar_id, score) for similar_id, score in neighbours if similar_id in existing]
+    with transaction.atomic():
+        SimilarBook.objects.filter(book_id=book_id).delete()
+        SimilarBook.objects.bulk_create([
+            SimilarBook(book_id=book_id, similar_id=similar_id, score=round(score, 5), rank=rank)
+            for rank, (similar_id, score) in enumerate(neighbours)
+        ])
+        Book.objects.filter(pk=book_id).update(similar_refreshed_at=timezone.now())
+
+
+def offer_neighbour(book_id, candidate_id, score, count=SIMILAR_BOOKS_COUNT):
+    """
+    Yangi kitobni boshqa kitob ro'yxatiga qo'shish (agar u eng zaif qo'shnidan kuchliroq bo'lsa)
+    To'liq qayta hisoblamasdan - inkremental yangilash uchun
+    """
+    from .models import Book, SimilarBook
+
+    if not Book.objects.filter(pk=book_id).exists():
+        return False
+    current = list(SimilarBook.objects.filter(book_id=book_id).values_list('similar_id', 'score'))
+    current = [(similar_id, value) for similar_id, value in current if similar_id != candidate_id]
+    if len(current) >= count and min(value for _, value in current) >= score:
+        return False
+    neighbours = sorted(current + [(candidate_id, score)], key=lambda item: -item[1])[:count]
+    with transaction.atomic():
+        SimilarBook.objects.filter(book_id=book_id).delete()
+        SimilarBook.objects.bulk_create([
+            SimilarBook(book_id=book_id, similar_id=similar_id, score=round(value, 5), rank=rank)
+            for rank, (similar_id, value) in enumerate(neighbours)
+        ])
+    return True
+
+
+def rebuild_all(book_ids=None, model=None):
+    """Barcha (yoki berilgan) kitoblar qo'shnilarini qayta hisoblash"""
+    model = model or SimilarityModel()
+    targets = book_ids if book_ids is not None else list(model.book_ids)
+    for book_id in targets:
+        save_neighbours(book_id, model.neighbours(book_id))
+    logger.info(f"SIMILARITY: {len(targets)} ta kitob qo'shnilari hisoblandi")
+    return len(targets)
+
+
+_model = None
+
+
+def refresh_pending(limit=50):
+    """
+    Yangi/o'zgargan kitoblarni inkremental yangilash (run_ingestion_worker chaqiradi):
+    kitob modelga qo'shiladi, o'z qo'shnilari yoziladi va u qo'shnilarining ro'yxatiga taklif qilinadi
+    :return: yangilangan kitoblar soni
+    """
+    global _model
+    from .models import Book
+
+    pending = list(Book.objects.filter(similar_refreshed_at__isnull=True).order_by('id')[:limit])
+    if not pending:
+        return 0
+
+    if _model is None or time.monotonic() - _model.built_at > MODEL_MAX_AGE:
+        _model = SimilarityModel()
+    else:
+        for book in pending:
+            _model.add_book(book)
+
+    for book in pending:
+        neighbours = _model.neighbours(book.pk)
+        save_neighbours(book.pk, neighbours)
+        for similar_id, score in neighbours:
+            offer_neighbour(similar_id, book.pk, score)
+    logger.info(f"SIMILARITY: {len(pending)} ta yangi kitob yangilandi")
+    return len(pending)
+
+
+def mark_stale(book_id):
+    """Kitob matni o'zgardi - worker qo'shnilarni qayta hisoblaydi"""
+    from .models import Book
+    Book.objects.filter(pk=book_id).update(similar_refreshed_at=None)
+
+
+def similar_books(book, limit=SIMILAR_BOOKS_COUNT):
+    """
+    O'xshash kitoblar - bitta indekslangan so'rov (SimilarBook (book, rank))
+    Hali hisoblanmagan kitob uchun: shu adib yoki kategoriya kitoblari
+    """
+    from django.db.models import Q
+    from .models import Book, SimilarBook
+
+    entries = (
+        SimilarBook.objects.filter(book_id=book.pk)
+        .select_related('similar__author')
+        .only('book_id', 'rank', 'similar__id', 'similar__title', 'similar__cover_image',
+              'similar__rating_avg', 'similar__rating_count', 'similar__author__name')
+        .order_by('rank')[:limit]
+    )
+    books = [entry.similar for entry in entries]
+    if books or book.similar_refreshed_at is not None:
+        return books
+
+    return list(
+        Book.objects.filter(Q(author_id=book.author_id) | Q(categories__in=book.categories.all()))
+        .exclude(id=book.pk).select_related('author')
+        .only('id', 'title', 'cover_image', 'rating_avg', 'rating_count', 'author__name')
+        .distinct()[:limit]
+    )
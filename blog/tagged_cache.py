@@ -0,0 +1,79 @@
+"""
+Teglangan (dependency-tagged) kesh
+Har bir yozuv qaysi model/obyektlarga bog'liqligini teglar bilan e'lon qiladi:
+    tagged_cache.get_or_set('authors_list', load, tags=[tag(Author), tag(Book)])
+Model signallari (signals.py) tegni bekor qiladi - unga bog'liq barcha yozuvlar eskiradi.
+Shuning uchun TTL soatlab bo'lishi mumkin: eski ma'lumot TTL tugashini kutmaydi.
+
+Teg - versiya belgisi (catalog_search/search_results dagi kabi): bekor qilish = yangi qiymat yozish.
+Yozuv saqlanganda teglarning joriy versiyalari yoniga yoziladi; o'qishda yozuv va teglar
+bitta get_many bilan olinadi va versiyalar solishtiriladi.
+"""
+import time
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60 * 60 * 6
+TAG_KEY = 'cache_tag_{}'
+
+
+def tag(model, pk=None):
+    """Teg nomi: 'blog.book' (jadvalning istalgan o'zgarishi) yoki 'blog.book#5' (bitta obyekt)"""
+    label = model._meta.label_lower
+    return label if pk is None else f"{label}#{pk}"
+
+
+def _tag_keys(tags):
+    return {TAG_KEY.format(name): name for name in tags}
+
+
+def get_or_set(key, factory, tags, timeout=DEFAULT_TIMEOUT):
+    """
+    Keshdan olish; yo'q yoki teglaridan biri bekor qilingan bo'lsa factory() natijasini saqlash
+    :param tags: yozuv bog'liq teglar (tag() bilan yasalgan)
+    """
+    tag_keys = _tag_keys(tags)
+    try:
+        found = cache.get_many([key, *tag_keys])
+    except Exception as e:
+        logger.warning(f"TAGGED_CACHE: kesh xatosi ({key}): {e}")
+        return factory()
+
+    versions = {name: found.get(tag_key) for tag_key, name in tag_keys.items()}
+    entry = found.get(key)
+    if entry is not None and None not in versions.values() and entry['tags'] == versions:
+        return entry['value']
+
+    # Yo'qolgan (evict qilingan) teg - yangi versiya bilan boshlanadi
+    for tag_key, name in tag_keys.items():
+        if versions[name] is None:
+            version = time.time()
+            if not cache.add(tag_key, version, None):
+                version = cache.get(tag_key, version)
+            versions[name] = version
+
+    value = factory()
+    cache.set(key, {'tags': versions, 'value': value}, timeout)
+    return value
+
+
+def _purge(tags):
+    version = time.time()
+    try:
+        cache.set_many({tag_key: version for tag_key in _tag_keys(tags)}, None)
+    except Exception as e:
+        logger.warning(f"TAGGED_CACHE: teglarni bekor qilib bo'lmadi {tags}: {e}")
+
+
+def invalidate(*tags):
+    """
+    Teglarga bog'liq yozuvlarni eskirtirish.
+    Tranzaksiya ichida chaqirilsa commit dan keyin bajariladi - aks holda parallel so'rov
+    eski ma'lumotni yangi versiya bilan qayta keshlab qo'yishi mumkin.
+    """
+    if tags:
+        transaction.on_commit(lambda: _purge(tags))
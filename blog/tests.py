@@ -1,3 +1,1606 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import re
+import socket
+import sys
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import libreoffice_converter
+from libreoffice_converter import LibreOfficePool
+
+from . import (
+    author_catalog, catalog_search, conversion_cache, engine_selection, ingestion, passages, pdf_extraction, pdf_ocr,
+    query_analysis, search_index, search_results, similarity, tagged_cache, text_extraction, uzbek_text, view_counter,
+    views,
+)
+from .cache_backend import SocketCache
+from .cache_server import AuthenticationError, CacheStore, create_server, recv_message, send_message
+from .catalog_pagination import cursor_for_page, get_page
+from .conversion_cache import ConversionCache
+from .models import Author, Book, BookPage, BookRating, Category, IngestionJob, SearchPosting, SimilarBook
+from .page_writer import BookPageWriter
+from .text_stats import TextStats, file_text_stats, find_in_chunks, text_stats
+from .utils import rate_limit
+from .zipstream import ZipStream
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# ===== QIDIRUV INDEKSI =====
+
+class TokenizeTests(SimpleTestCase):
+
+    def test_canonical_terms_and_original_offsets(self):
+        text = "Kitoblar o‘qish — Kitobxonning. КИТОБ"
+        tokens = search_index.tokenize(text)
+        self.assertEqual([term for _, _, _, term in tokens], ['kitob', "o'qish", 'kitobxon', 'kitob'])
+        # Tartib raqamlari ketma-ket, pozitsiya/uzunlik asl matn bo'yicha (snippet uchun)
+        self.assertEqual([ordinal for ordinal, _, _, _ in tokens], [0, 1, 2, 3])
+        for _, offset, length, _ in tokens:
+            self.assertTrue(text[offset:offset + length].strip())
+        self.assertEqual(text[tokens[1][1]:tokens[1][1] + tokens[1][2]], "o‘qish")
+
+    def test_long_terms_skipped(self):
+        tokens = search_index.tokenize('a' * (search_index.MAX_TERM_LENGTH + 1) + ' kitob')
+        self.assertEqual([term for _, _, _, term in tokens], ['kitob'])
+        self.assertEqual(search_index.tokenize(None), [])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(name="Abdulla Qodiriy")
+        self.book = Book.objects.create(author=self.author, title="O'tkan kunlar")
+        self.other = Book.objects.create(author=Author.objects.create(name="Cho'lpon"), title="Kecha va kunduz")
+        with self.captureOnCommitCallbacks(execute=True):
+            search_index.index_book(self.book, [
+                (1, "Otabek Toshkentga keldi. Toshkent bozori gavjum edi."),
+                (2, "Kumush kitobxon qiz edi, kitoblarni sevardi."),
+            ])
+            search_index.index_book(self.other, [(1, "Toshkent bozori haqida qisqa hikoya.")])
+
+    def occurrences(self, query, author_id=None):
+        return sorted(
+            (occ['book_id'], occ['page_number'], occ['position'], occ['length'])
+            for occ in search_index.search_occurrences(query, author_id)
+        )
+
+    def test_phrase_matches_consecutive_words(self):
+        text = "Otabek Toshkentga keldi. Toshkent bozori gavjum edi."
+        found = self.occurrences('toshkent bozori')
+        self.assertEqual(len(found), 2)
+        book_id, page, position, length = found[0]
+        self.assertEqual((book_id, page), (self.book.pk, 1))
+        self.assertEqual(text[position:position + length], "Toshkent bozori")
+        # So'zlar ketma-ket emas - ibora topilmaydi
+        self.assertEqual(self.occurrences('otabek bozori'), [])
+
+    def test_last_word_matches_as_prefix(self):
+        found = self.occurrences('kitob')
+        # kitobxon (prefix) va kitoblarni (o'zak) - ikkalasi ham
+        self.assertEqual([(book_id, page) for book_id, page, _, _ in found], [(self.book.pk, 2)] * 2)
+        self.assertEqual(len(self.occurrences('kumush kitob')), 1)
+        # Prefix faqat oxirgi so'z uchun
+        self.assertEqual(self.occurrences('kum kitob'), [])
+
+    def test_author_filter(self):
+        self.assertEqual(
+            {book_id for book_id, _, _, _ in self.occurrences('bozori', author_id=self.author.pk)},
+            {self.book.pk},
+        )
+
+    def test_reindex_replaces_old_postings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            created = search_index.index_book(self.book, [(1, "Yangi matn: Marg'ilon")])
+        terms = set(SearchPosting.objects.filter(book=self.book).values_list('term', flat=True))
+        self.assertEqual(created, len(terms))
+        self.assertNotIn('otabek', terms)
+        self.assertEqual(self.occurrences('otabek'), [])
+        self.assertEqual(len(self.occurrences("marg'ilon")), 1)
+        # Boshqa kitob indeksiga tegilmaydi
+        self.assertEqual([book_id for book_id, _, _, _ in self.occurrences('toshkent')], [self.other.pk])
+
+    def test_remove_book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            search_index.remove_book(self.book.pk)
+        self.assertFalse(SearchPosting.objects.filter(book=self.book).exists())
+        self.assertEqual(len(self.occurrences('toshkent')), 1)
+
+
+# ===== SAHIFALARNI YOZISH =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BookPageWriterTests(TestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(author=Author.objects.create(name="Oybek"), title="Navoiy")
+        BookPage.objects.create(book=self.book, page_number=1, text="eski sahifa")
+
+    def page_texts(self):
+        return list(self.book.pages.order_by('page_number').values_list('text', flat=True))
+
+    def test_replaces_pages_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with BookPageWriter(self.book, batch_size=2) as writer:
+                    for number in range(1, 6):
+                        writer.add(number, f"sahifa {number} Samarqand")
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT') and 'blog_bookpage' in q['sql']]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(self.page_texts(), [f"sahifa {number} Samarqand" for number in range(1, 6)])
+        self.assertEqual(writer.stats['pages'], 5)
+        # Indeks yangi sahifalardan qurilgan
+        self.assertEqual(len(search_index.search_occurrences('samarqand')), 5)
+
+    def test_error_keeps_old_pages(self):
+        with self.assertRaises(ValueError):
+            with BookPageWriter(self.book) as writer:
+                writer.add(1, "yangi")
+                raise ValueError("tahlil xatosi")
+        self.assertEqual(self.page_texts(), ["eski sahifa"])
+        self.assertIsNone(writer.stats)
+
+    def test_save_pages_from_txt_file(self):
+        lines = ''.join(f"{i}-satr\n" for i in range(120))
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            self.book.file = SimpleUploadedFile('kitob.txt', lines.encode())
+            self.book.save()
+            stats = self.book.save_pages_from_file()
+        # Har 50 satr - bitta sahifa
+        self.assertEqual(stats['pages'], 3)
+        self.assertEqual(list(self.book.pages.values_list('page_number', flat=True)), [1, 2, 3])
+        self.assertEqual(''.join(self.page_texts()), lines)
+
+
+# ===== YUKLASH NAVBATI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IngestionQueueTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=self.media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user('yuklovchi', password='parol123')
+        self.book = Book.objects.create(
+            author=Author.objects.create(name="Hamid Olimjon"), title="Oygul bilan Baxtiyor",
+            file=SimpleUploadedFile('oygul.txt', ''.join(f"{i}-satr\n" for i in range(60)).encode()),
+        )
+
+    def test_job_claimed_once(self):
+        job = ingestion.enqueue_book(self.book, user=self.user)
+        claimed = ingestion.claim_next_job('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.worker), ('running', 'worker-1'))
+        self.assertIsNone(ingestion.claim_next_job('worker-2'))
+
+    def test_stale_job_requeued_unless_heartbeat(self):
+        stale = ingestion.enqueue_book(self.book)
+        alive = ingestion.enqueue_book(self.book)
+        ingestion.claim_next_job('worker-1')
+        ingestion.claim_next_job('worker-1')
+        long_ago = timezone.now() - ingestion.STALE_JOB_TIMEOUT - timedelta(minutes=1)
+        IngestionJob.objects.update(updated_at=long_ago)
+
+        # Uzoq fayl ustida ishlayotgan vazifa - heartbeat uni tirik saqlaydi
+        ingestion._Heartbeat(alive).beat(force=True)
+        self.assertEqual(ingestion.requeue_stale_jobs(), 1)
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((stale.status, stale.worker), ('pending', ''))
+        self.assertEqual(alive.status, 'running')
+
+    def test_book_job_writes_pages(self):
+        ingestion.enqueue_book(self.book)
+        job = ingestion.process_job(ingestion.claim_next_job('worker-1'))
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.processed_files, job.total_files), (1, 1))
+        self.assertEqual(self.book.pages.count(), 2)
+
+        status = ingestion.job_status(job)
+        self.assertEqual(status['results'][0]['status'], 'success')
+        self.assertEqual(status['results'][0]['pages'], 2)
+
+    def test_status_endpoint_only_for_owner(self):
+        job = ingestion.enqueue_book(self.book, user=self.user)
+        url = reverse('ingestion_job_status', args=[job.pk])
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        User.objects.create_user('begona', password='parol123')
+        self.client.login(username='begona', password='parol123')
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.login(username='yuklovchi', password='parol123')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'pending')
+
+
+# ===== LIBREOFFICE HOVUZI =====
+
+# Soxta soffice: --convert-to rejimida natija faylini yozadi, --accept rejimida socketni tinglaydi;
+# har ishga tushish/tugash LOG fayliga yoziladi (bir vaqtdagi nusxalarni sanash uchun)
+FAKE_SOFFICE = """#!{python}
+import os, socket, sys, time
+LOG = {log!r}
+args = sys.argv[1:]
+accept = [a for a in args if a.startswith('--accept')]
+if accept:
+    port = int(accept[0].split('port=')[1].split(';')[0])
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', port))
+    server.listen()
+    while True:
+        server.accept()[0].close()
+with open(LOG, 'a') as f:
+    f.write('+\\n')
+time.sleep(0.2)
+fmt, out, src = args[args.index('--convert-to') + 1], args[args.index('--outdir') + 1], args[-1]
+with open(os.path.join(out, os.path.splitext(os.path.basename(src))[0] + '.' + fmt.split(':')[0]), 'w') as f:
+    f.write('soffice')
+with open(LOG, 'a') as f:
+    f.write('-\\n')
+"""
+
+# Soxta UNO klienti (libreoffice_uno.py o'rniga): birinchi chaqiruvda FAIL_ONCE fayli bo'lsa -
+# "nusxaga ulanib bo'lmadi" (2) bilan chiqadi
+FAKE_UNO_PYTHON = """#!{python}
+import os, sys
+FAIL_ONCE = {fail_once!r}
+if os.path.exists(FAIL_ONCE):
+    os.remove(FAIL_ONCE)
+    sys.exit(2)
+src, out, fmt = sys.argv[-3:]
+with open(os.path.join(out, os.path.splitext(os.path.basename(src))[0] + '.' + fmt.split(':')[0]), 'w') as f:
+    f.write('uno')
+"""
+
+
+class LibreOfficePoolTests(SimpleTestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmp = tmpdir.name
+        self.log = os.path.join(self.tmp, 'active.log')
+        self.fail_once = os.path.join(self.tmp, 'fail_once')
+        self.soffice = self.script('soffice', FAKE_SOFFICE.format(python=sys.executable, log=self.log))
+        self.uno_python = self.script(
+            'uno_python', FAKE_UNO_PYTHON.format(python=sys.executable, fail_once=self.fail_once)
+        )
+        self.pool_dir = os.path.join(self.tmp, 'pool')
+        self.input = os.path.join(self.tmp, 'hujjat.docx')
+        with open(self.input, 'w') as f:
+            f.write('x')
+
+    def script(self, name, source):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w') as f:
+            f.write(source)
+        os.chmod(path, 0o755)
+        return path
+
+    def make_pool(self, size=2, uno_python=None):
+        pool = LibreOfficePool(self.soffice, size=size, base_dir=self.pool_dir, uno_python=uno_python)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def max_concurrent(self):
+        active = peak = 0
+        with open(self.log) as f:
+            for line in f:
+                active += 1 if line.startswith('+') else -1
+                peak = max(peak, active)
+        return peak
+
+    def test_standalone_conversions_bounded_by_slots(self):
+        pool = self.make_pool(size=2)
+        outputs = []
+
+        def convert(i):
+            out = os.path.join(self.tmp, f'out_{i}')
+            os.makedirs(out)
+            pool.convert(self.input, 'pdf', out)
+            outputs.append(os.path.join(out, 'hujjat.pdf'))
+
+        threads = [threading.Thread(target=convert, args=(i,)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(outputs), 5)
+        self.assertTrue(all(os.path.exists(path) for path in outputs))
+        self.assertEqual(self.max_concurrent(), 2)
+        # Alohida soffice rejimida slot konvertatsiyadan keyin darhol bo'shatiladi
+        self.assertEqual(pool.stats()['started'], 0)
+
+    def test_slots_shared_between_pools(self):
+        # Boshqa jarayon hovuzi o'rniga - xuddi shu slot papkasidagi ikkinchi hovuz (flock bir xil ishlaydi)
+        first, second = self.make_pool(size=1), self.make_pool(size=1)
+        with first.acquire():
+            with self.assertRaises(Exception):
+                with second.acquire(timeout=0.3):
+                    pass
+        with second.acquire() as instance:
+            self.assertEqual(instance.index, 0)
+
+    def test_persistent_instance_reused_and_restarted(self):
+        pool = self.make_pool(size=1, uno_python=self.uno_python)
+        result = pool.convert(self.input, 'pdf', self.tmp)
+        self.assertEqual(result.returncode, 0)
+        with open(os.path.join(self.tmp, 'hujjat.pdf')) as f:
+            self.assertEqual(f.read(), 'uno')
+        instance = pool._instances[0]
+        first_pid = instance.process.pid
+
+        # Nusxa javob bermadi (chiqish kodi 2) - qayta ishga tushirilib, bir marta takrorlanadi
+        open(self.fail_once, 'w').close()
+        self.assertEqual(pool.convert(self.input, 'pdf', self.tmp).returncode, 0)
+        self.assertNotEqual(instance.process.pid, first_pid)
+        self.assertEqual(pool.stats(), {'size': 1, 'mode': 'uno', 'started': 1, 'alive': 1, 'conversions': 2})
+
+        process = instance.process
+        pool.shutdown()
+        self.assertIsNotNone(process.poll())
+        self.assertEqual(pool.stats()['started'], 0)
+
+    @skipUnless(hasattr(os, 'fork'), "fork faqat POSIX da")
+    def test_forked_child_starts_with_empty_pool(self):
+        pool = self.make_pool(size=1, uno_python=self.uno_python)
+        pool.convert(self.input, 'pdf', self.tmp)
+        previous, libreoffice_converter._pool = libreoffice_converter._pool, pool
+        self.addCleanup(setattr, libreoffice_converter, '_pool', previous)
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            reset = libreoffice_converter._pool is None and not pool._instances
+            os.write(write_fd, b'1' if reset else b'0')
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            self.assertEqual(f.read(), b'1')
+        os.waitpid(pid, 0)
+        # Ota jarayon nusxasi ishlashda davom etadi
+        self.assertTrue(pool._instances[0].is_alive())
+
+
+# ===== KONVERTATSIYA KESHI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConversionCacheTests(TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmp = tmpdir.name
+        self.cache = ConversionCache(directory=os.path.join(self.tmp, 'conversions'), max_bytes=1000)
+        cache.clear()
+
+    def test_put_and_open(self):
+        self.assertIsNone(self.cache.open('abc', 'docx>pdf'))
+        self.cache.put('abc', 'docx>pdf', {'content_type': 'application/pdf'}, data=b'%PDF')
+        data_file, meta = self.cache.open('abc', 'docx>pdf')
+        with data_file:
+            self.assertEqual(data_file.read(), b'%PDF')
+        self.assertEqual(meta['content_type'], 'application/pdf')
+        # Format (va konverter) kalitda - boshqa format topilmaydi
+        self.assertIsNone(self.cache.open('abc', 'docx>html'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_open_survives_concurrent_evict(self):
+        self.cache.put('abc', 'pdf', {}, data=b'natija')
+        data_file, _ = self.cache.open('abc', 'pdf')
+        self.cache.clear()
+        # Ochilgan fayl o'chirilgandan keyin ham o'qiladi, yangi open() - topilmadi
+        with data_file:
+            self.assertEqual(data_file.read(), b'natija')
+        self.assertIsNone(self.cache.open('abc', 'pdf'))
+
+    def test_evicts_least_recently_used(self):
+        for i in range(3):
+            self.cache.put(f'old{i}', 'pdf', {}, data=b'x' * 300)
+            path = self.cache.get(f'old{i}', 'pdf')[0]
+            os.utime(path, (i, i))
+        self.cache.get('old0', 'pdf')  # eng eski - lekin hozir ishlatildi
+        self.cache.put('new', 'pdf', {}, data=b'x' * 300)
+        self.assertIsNotNone(self.cache.get('old0', 'pdf'))
+        self.assertIsNotNone(self.cache.get('new', 'pdf'))
+        self.assertIsNone(self.cache.get('old1', 'pdf'))
+        self.assertLessEqual(self.cache.stats()['bytes'], 1000)
+
+    def test_put_does_not_rescan_under_limit(self):
+        with mock.patch.object(self.cache, '_entries', wraps=self.cache._entries) as entries:
+            for i in range(5):
+                self.cache.put(f'k{i}', 'pdf', {}, data=b'x' * 10)
+        # Birinchi put - skan; keyingilari taxminiy hajm bo'yicha
+        self.assertEqual(entries.call_count, 1)
+
+    def test_convert_file_served_from_cache(self):
+        media_root = os.path.join(self.tmp, 'media')
+        os.makedirs(media_root)
+        with open(os.path.join(media_root, 'matn.txt'), 'w', encoding='utf-8') as f:
+            f.write("Salom, dunyo")
+        text_cache = ConversionCache(directory=os.path.join(self.tmp, 'text'))
+        url = reverse('convert_file', args=['matn.txt', 'txt'])
+        with override_settings(MEDIA_ROOT=media_root), \
+                mock.patch.object(conversion_cache, '_conversion_cache', self.cache), \
+                mock.patch.object(text_extraction, '_cache', text_cache):
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(first['X-Conversion-Cache'], 'MISS')
+        self.assertEqual(second['X-Conversion-Cache'], 'HIT')
+        self.assertEqual(b''.join(second.streaming_content), first.content)
+        self.assertIn("Salom, dunyo", first.content.decode())
+        # Kalitda konverter bor - convert_to_format yozuvlari bilan aralashmaydi
+        digest = conversion_cache.file_sha256(os.path.join(media_root, 'matn.txt'))
+        self.assertIsNotNone(self.cache.get(digest, 'convert_file:txt>txt'))
+        self.assertIsNone(self.cache.get(digest, 'txt'))
+
+
+# ===== PAPKANI PDF ZIP GA =====
+
+class FolderPdfZipTests(SimpleTestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.files = []
+        # Ikki papkada bir xil nomli PDF, qo'llab-quvvatlanmaydigan fayl va yo'q fayl
+        for folder, name, content in [('bir', 'kitob.pdf', b'%PDF-1'), ('ikki', 'kitob.pdf', b'%PDF-2'),
+                                      ('bir', 'rasm.xyz', b'?')]:
+            os.makedirs(os.path.join(tmpdir.name, folder), exist_ok=True)
+            path = os.path.join(tmpdir.name, folder, name)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.files.append({'path': path})
+        self.files.append({'path': os.path.join(tmpdir.name, 'yoq.docx')})
+
+    def post(self, **extra):
+        with mock.patch.object(views, 'convert_any_to_pdf', None), \
+                mock.patch.object(views, 'is_libreoffice_available', return_value=False):
+            response = self.client.post(
+                reverse('convert_folder_zip'),
+                json.dumps({'files': self.files, 'folder_name': 'papka', **extra}),
+                content_type='application/json',
+            )
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+
+    def test_streamed_zip_with_manifest(self):
+        response, content = self.post(stream=True)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('papka_pdf.zip', response['Content-Disposition'])
+
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(sorted(zf.namelist()), ['kitob (2).pdf', 'kitob.pdf', 'manifest.json'])
+            self.assertEqual({zf.read('kitob.pdf'), zf.read('kitob (2).pdf')}, {b'%PDF-1', b'%PDF-2'})
+            manifest = json.loads(zf.read('manifest.json'))
+        self.assertEqual((manifest['converted_count'], manifest['failed_count']), (2, 2))
+        errors = {item['file']: item['error'] for item in manifest['files'] if item['status'] == 'error'}
+        self.assertEqual(set(errors), {'rasm.xyz', 'yoq.docx'})
+        self.assertEqual(errors['yoq.docx'], 'Fayl topilmadi')
+
+
+# ===== OQIMLI ZIP =====
+
+class ZipStreamTests(SimpleTestCase):
+
+    def build(self, path):
+        stream = ZipStream()
+        parts = []
+        parts.extend(stream.add_file(stream.unique_name('kitob.txt'), path))
+        with open(path, 'rb') as src:
+            parts.extend(stream.add_fileobj(stream.unique_name('kitob.txt'), src))
+        parts.extend(stream.add_fileobj('skan.pdf', io.BytesIO(b'%PDF-1.4 ' * 100)))
+        parts.extend(stream.add_bytes('manifest.json', b'{"books": 2}'))
+        parts.extend(stream.close())
+        return stream, parts
+
+    def test_archive_is_valid(self):
+        data = os.urandom(1024) + b'matn ' * 50000
+        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as tmp:
+            tmp.write(data)
+        self.addCleanup(os.remove, tmp.name)
+
+        stream, parts = self.build(tmp.name)
+        self.assertGreater(len(parts), 1)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(parts)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['kitob.txt', 'kitob (2).txt', 'skan.pdf', 'manifest.json'])
+        self.assertEqual(archive.read('kitob.txt'), data)
+        self.assertEqual(archive.read('kitob (2).txt'), data)
+        self.assertEqual(archive.read('manifest.json'), b'{"books": 2}')
+        self.assertEqual(archive.getinfo('kitob.txt').compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.getinfo('skan.pdf').compress_type, zipfile.ZIP_STORED)
+
+
+# ===== KESH SERVERI =====
+
+class SocketCacheTests(SimpleTestCase):
+    """SocketCache <-> cache_server protokoli (vaqtinchalik unix socketdagi server bilan)"""
+
+    KEY = b'test-key'
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.tmpdir.name, 'cache.sock')
+        self.server = create_server(self.location, CacheStore(), key=self.KEY)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache = self.make_cache(self.KEY)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def make_cache(self, key):
+        return SocketCache(self.location, {'OPTIONS': {'AUTH_KEY': key, 'SOCKET_TIMEOUT': 2}})
+
+    def test_basic_commands(self):
+        self.cache.set('a', {'x': 1})
+        self.assertEqual(self.cache.get('a'), {'x': 1})
+        self.assertFalse(self.cache.add('a', 2))
+        self.assertTrue(self.cache.add('b', 2))
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'a': {'x': 1}, 'b': 2})
+        self.assertEqual(self.cache.incr('b', 3), 5)
+        self.assertEqual(self.cache.incr_or_add('c', 1, None), 1)
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertTrue(self.cache.is_connected)
+
+    def test_expired_entries(self):
+        self.cache.set('short', 1, 1)
+        self.assertEqual(self.cache.get('short'), 1)
+        self.cache.set('gone', 1, 0)
+        self.assertIsNone(self.cache.get('gone'))
+
+    def test_wrong_key_is_rejected(self):
+        other = self.make_cache(b'other-key')
+        other.set('a', 1)
+        # Server ulanishni yopadi - klient lokal zaxira keshga o'tadi
+        self.assertFalse(other.is_connected)
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_tampered_message_is_rejected(self):
+        left, right = socket.socketpair()
+        with left, right:
+            send_message(left, ('get', ('a',)), b'other-key')
+            with self.assertRaises(AuthenticationError):
+                recv_message(right, self.KEY)
+
+    def test_forked_children_use_own_connection(self):
+        if not hasattr(os, 'fork'):
+            self.skipTest("os.fork yo'q")
+        # Ota jarayon ulanishi fork dan oldin ochiladi - bolalar uni meros oladi
+        self.cache.set('counter', 0, None)
+        children, per_process = 4, 200
+        pids = []
+        for _ in range(children):
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    for _ in range(per_process):
+                        self.cache.incr('counter')
+                except BaseException:
+                    code = 1
+                finally:
+                    os._exit(code)
+            pids.append(pid)
+        for _ in range(per_process):
+            self.cache.incr('counter')
+        for pid in pids:
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(self.cache.get('counter'), (children + 1) * per_process)
+
+
+# ===== RATE LIMIT =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RateLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def call(self, view, ip='10.0.0.1'):
+        request = self.factory.get('/', REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return view(request)
+
+    def test_headers_and_denial(self):
+        view = rate_limit('test_view', limit=3, period=60)(lambda request: HttpResponse('ok'))
+
+        for remaining in (2, 1, 0):
+            response = self.call(view)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-RateLimit-Limit'], '3')
+            self.assertEqual(response['X-RateLimit-Remaining'], str(remaining))
+            self.assertTrue(1 <= int(response['X-RateLimit-Reset']) <= 60)
+            self.assertNotIn('Retry-After', response)
+
+        response = self.call(view)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Boshqa mijoz alohida hisoblanadi
+        self.assertEqual(self.call(view, ip='10.0.0.2').status_code, 200)
+
+    def test_strictest_limit_wins(self):
+        view = rate_limit('test_burst', limits=[(2, 10), (5, 60)])(lambda request: HttpResponse('ok'))
+        self.assertEqual(self.call(view)['X-RateLimit-Remaining'], '1')
+        response = self.call(view)
+        self.assertEqual((response['X-RateLimit-Limit'], response['X-RateLimit-Remaining']), ('2', '0'))
+        response = self.call(view)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['X-RateLimit-Limit'], '2')
+
+
+# ===== BAHOLAR STATISTIKASI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RatingStatsTests(TestCase):
+
+    def setUp(self):
+        author = Author.objects.create(name="Abdulla Qahhor")
+        self.book = Book.objects.create(author=author, title="Sarob")
+        self.other = Book.objects.create(author=author, title="Sinchalak")
+
+    def stats(self, book):
+        book.refresh_from_db()
+        return book.rating_sum, book.rating_count, book.average_rating
+
+    def test_create_update_delete(self):
+        first = BookRating.objects.create(book=self.book, rating=5)
+        BookRating.objects.create(book=self.book, rating=2)
+        self.assertEqual(self.stats(self.book), (7, 2, 3.5))
+
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.stats(self.book), (5, 2, 2.5))
+
+        # Baho boshqa kitobga ko'chirildi
+        first.book = self.other
+        first.save()
+        self.assertEqual(self.stats(self.book), (2, 1, 2))
+        self.assertEqual(self.stats(self.other), (3, 1, 3))
+
+        first.delete()
+        self.assertEqual(self.stats(self.other), (0, 0, 0))
+        self.assertEqual(self.book.rating_avg, 2.0)
+
+
+# ===== KATALOG QIDIRUVI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.navoiy = Author.objects.create(name="Alisher Navoiy")
+        self.qodiriy = Author.objects.create(name="Abdulla Qodiriy")
+        self.xamsa = Book.objects.create(author=self.navoiy, title="Xamsa")
+        self.kunlar = Book.objects.create(author=self.qodiriy, title="O‘tkan kunlar")
+
+    def titles(self, query):
+        return [book.title for book in catalog_search.search_books(Book.objects.all(), query)]
+
+    def test_normalize(self):
+        self.assertEqual(catalog_search.normalize("O‘zbek Навоий, Xamsa!"), 'ozbek navoiy xamsa')
+        self.assertEqual(self.kunlar.search_key, 'otkan kunlar abdulla qodiriy')
+
+    def test_typos_and_cyrillic(self):
+        self.assertEqual(self.titles('Navoi'), ["Xamsa"])
+        self.assertEqual(self.titles('Навоий хамса'), ["Xamsa"])
+        self.assertEqual(self.titles("otkan kunlar"), ["O‘tkan kunlar"])
+        self.assertEqual(self.titles('Shukur Xolmirzayev'), [])
+        ranked = catalog_search.search_books(Book.objects.all(), 'Xamsa')
+        self.assertEqual(ranked[0].search_rank, 1.0)
+
+    def test_key_follows_title_and_author(self):
+        book = Book.objects.get(pk=self.xamsa.pk)
+        book.title = "Lison ut-tayr"
+        book.save(update_fields=['title'])
+        book.author = self.qodiriy
+        book.save(update_fields=['author'])
+        book.refresh_from_db()
+        self.assertEqual(book.search_key, 'lison ut tayr abdulla qodiriy')
+
+        # Adib nomi o'zgarsa - uning kitoblari ham
+        self.qodiriy.name = "Julqunboy"
+        # Indeks versiyasi commit dan keyin oshiriladi
+        with self.captureOnCommitCallbacks(execute=True):
+            self.qodiriy.save()
+        self.assertEqual(
+            set(Book.objects.values_list('search_key', flat=True)), {'lison ut tayr julqunboy', 'otkan kunlar julqunboy'}
+        )
+        self.assertEqual(self.titles('julqunboy lison'), ["Lison ut-tayr", "O‘tkan kunlar"])
+
+    def test_unrelated_save_skips_author_query(self):
+        book = Book.objects.get(pk=self.xamsa.pk)
+        book.views_count = 10
+        # Faqat UPDATE - nom/adib o'zgarmagan, adib so'ralmaydi
+        with self.assertNumQueries(1):
+            book.save()
+        self.assertFalse(book._search_key_changed)
+
+
+# ===== SO'ROV TAHLILI =====
+
+class SpellTests(SimpleTestCase):
+
+    def setUp(self):
+        self.speller = query_analysis.SymSpell()
+        for word, count in [('muhabbat', 10), ('kitob', 50), ('kitobat', 1), ('vatan', 5)]:
+            self.speller.add_word(word, count)
+
+    def test_edit_distance(self):
+        self.assertEqual(query_analysis.damerau_levenshtein('kitob', 'kitob', 2), 0)
+        # Qo'shni harflar almashinuvi - bitta tahrir
+        self.assertEqual(query_analysis.damerau_levenshtein('kitob', 'kiotb', 2), 1)
+        self.assertEqual(query_analysis.damerau_levenshtein('vatan', 'vtan', 2), 1)
+        # Chegaradan oshsa - max_distance + 1
+        self.assertEqual(query_analysis.damerau_levenshtein('abcdef', 'uvwxyz', 2), 3)
+
+    def test_lookup(self):
+        self.assertEqual(self.speller.lookup('muhabat'), ('muhabbat', 1, 10))
+        self.assertEqual(self.speller.lookup('kitbo'), ('kitob', 1, 50))
+        self.assertEqual(self.speller.lookup('kitob'), ('kitob', 0, 50))
+        self.assertIsNone(self.speller.lookup('xyzzyq'))
+
+    def test_analyze_query(self):
+        analysis = query_analysis.analyze_query('Muhabatni haqida kitoblar qanday?', speller=self.speller)
+        # Imlo o'zak bo'yicha tuzatiladi, qo'shimcha saqlanadi
+        self.assertEqual(analysis['corrections'], {'muhabatni': 'muhabbatni'})
+        self.assertEqual(analysis['corrected'], 'muhabbatni haqida kitoblar qanday')
+        self.assertEqual(analysis['keywords'], ['muhabbatni', 'kitoblar'])
+        self.assertEqual(analysis['synonyms'], ['sevgi', 'ishq', 'asar'])
+        self.assertTrue(analysis['is_question'])
+        self.assertFalse(query_analysis.analyze_query('vatan', speller=self.speller)['is_question'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VocabularyTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        book = Book.objects.create(author=Author.objects.create(name="Erkin Vohidov"), title="Ruhlar isyoni")
+        with self.captureOnCommitCallbacks(execute=True):
+            search_index.index_book(book, [(1, "Kitob kitob kitob. Muhabbat muhabbat. Bir marta.")])
+
+    def test_publish_and_rebuild_interval(self):
+        entry = query_analysis.publish_vocabulary()
+        # Kamida MIN_TERM_FREQUENCY marta uchragan so'zlar, chastota bo'yicha
+        self.assertEqual(entry['words'], [('kitob', 3), ('muhabbat', 2)])
+        self.assertEqual(cache.get(query_analysis.VOCABULARY_KEY), entry)
+
+        # Indeks o'zgardi, lekin REBUILD_INTERVAL o'tmagan - eski lug'at
+        query_analysis.bump_vocabulary_version()
+        self.assertEqual(query_analysis.publish_vocabulary()['built_at'], entry['built_at'])
+        rebuilt = query_analysis.publish_vocabulary(force=True)
+        self.assertEqual(rebuilt['version'], cache.get(query_analysis.VOCABULARY_VERSION_KEY))
+
+    def test_other_process_building(self):
+        cache.add(query_analysis.VOCABULARY_LOCK_KEY, 1, 120)
+        self.assertIsNone(query_analysis.publish_vocabulary())
+
+
+# ===== O'ZBEK MATNI =====
+
+class UzbekTextTests(SimpleTestCase):
+
+    def test_fold_apostrophes_and_script(self):
+        for word in ["O‘zbek", "oʻzbek", "o`zbek", "o’zbek", "ўзбек", "ЎЗБЕК"]:
+            self.assertEqual(uzbek_text.fold(word), "o'zbek")
+        self.assertEqual(uzbek_text.fold("Ғалаба"), "g'alaba")
+        self.assertEqual(uzbek_text.fold("Қўшиқ"), "qo'shiq")
+        # 'е' so'z boshida - ye, undoshdan keyin - e
+        self.assertEqual(uzbek_text.fold("ер мева"), "yer meva")
+
+    def test_split_suffixes(self):
+        self.assertEqual(uzbek_text.split_suffixes('kitoblarimizdan'), ('kitob', 'larimizdan'))
+        self.assertEqual(uzbek_text.split_suffixes('kitobingizmi'), ('kitob', 'ingizmi'))
+        self.assertEqual(uzbek_text.split_suffixes('maktabgacha'), ('maktab', 'gacha'))
+        # O'zak MIN_STEM_LENGTH dan qisqarmaydi
+        self.assertEqual(uzbek_text.split_suffixes('ota'), ('ota', ''))
+        self.assertEqual(uzbek_text.split_suffixes('uyda'), ('uy', 'da'))
+
+    def test_words_and_terms(self):
+        self.assertEqual(
+            uzbek_text.words("Ўзбекистон — o‘zbek tili, 2024-yil"), ["o'zbekiston", "o'zbek", 'tili', '2024', 'yil']
+        )
+        # Lotin va kirill yozuvi, qo'shimchalar - bitta term
+        self.assertEqual(
+            {uzbek_text.normalize_term(word) for word in ['КИТОБЛАРИМИЗДАН', 'kitobni', 'Kitob']}, {'kitob'}
+        )
+
+
+# ===== QIDIRUV NATIJALARI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchResultsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(name="Said Ahmad")
+        self.ufq = Book.objects.create(author=author, title="Ufq")
+        self.jimjitlik = Book.objects.create(author=author, title="Jimjitlik")
+        with self.captureOnCommitCallbacks(execute=True):
+            for book, pages in [(self.ufq, 2), (self.jimjitlik, 1)]:
+                BookPage.objects.bulk_create(
+                    BookPage(book=book, page_number=n, text="Bahor keldi. " * 10) for n in range(1, pages + 1)
+                )
+                search_index.index_book(book)
+
+    def test_pages_and_cache(self):
+        first = search_results.get_page(['bahor'], limit=12)
+        self.assertEqual(len(first['results']), 12)
+        self.assertTrue(first['has_more'])
+        self.assertEqual((first['total'], first['unique_books'], first['complete']), (30, 2, True))
+        # Kitob nomi tartibida: Jimjitlik, keyin Ufq
+        self.assertEqual(first['results'][0]['book_id'], self.jimjitlik.pk)
+
+        # Keyingi sahifalar keshdan - bazaga murojaat yo'q
+        with self.assertNumQueries(0):
+            second = search_results.get_page(['bahor'], offset=12, limit=12)
+            last = search_results.get_page(['bahor'], offset=24, limit=12)
+        results = first['results'] + second['results'] + last['results']
+        seen = [(r['book_id'], r['page_number'], r['position']) for r in results]
+        self.assertEqual(len(set(seen)), 30)
+        self.assertFalse(last['has_more'])
+
+    def test_lazy_prefix_and_reindex(self):
+        with mock.patch.object(search_results, 'PREFETCH', 5):
+            page = search_results.get_page(['bahor'], limit=3)
+        # Generator faqat kerakli joygacha o'qilgan - total quyi chegara
+        self.assertFalse(page['complete'])
+        self.assertEqual(page['total'], 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            search_index.remove_book(self.jimjitlik.pk)
+        page = search_results.get_page(['bahor'], limit=3)
+        self.assertEqual({r['book_id'] for r in page['results']}, {self.ufq.pk})
+
+    def post(self, payload):
+        with mock.patch.object(views, 'groq_client', None), \
+                mock.patch.object(query_analysis, 'get_speller', return_value=query_analysis.SymSpell()):
+            return self.client.post(reverse('ai_search_books'), json.dumps(payload), content_type='application/json')
+
+    def test_view_cursor(self):
+        data = self.post({'query': 'Bahor'}).json()
+        self.assertEqual(len(data['results']), search_results.PAGE_SIZE)
+        self.assertTrue(data['has_more'])
+        self.assertIn('<mark>Bahor</mark>', data['results'][0]['snippet'])
+
+        more = self.post({'cursor': data['next_cursor']}).json()
+        self.assertEqual(len(more['results']), 30 - search_results.PAGE_SIZE)
+        self.assertFalse(more['has_more'])
+        self.assertIsNone(more['next_cursor'])
+
+        self.assertEqual(self.post({'cursor': data['next_cursor'] + 'x'}).status_code, 400)
+
+
+# ===== KITOB PARCHALARI =====
+
+class PassageTests(SimpleTestCase):
+
+    def setUp(self):
+        # 10 ta parcha, faqat 7-sida "paxta"
+        self.passages = [
+            (n, f"{n}-bob. Qishloqda kun odatdagidek o'tdi. " + ("Paxta dalasida ish qizidi. " if n == 7 else ''))
+            for n in range(1, 11)
+        ]
+        self.index = passages.PassageIndex(self.passages)
+
+    def test_split_passages(self):
+        text = "Birinchi gap. " * 30 + "x" * 50
+        chunks = passages.split_passages(text, size=100)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        self.assertTrue(all(chunk.endswith('.') for chunk in chunks[:-1]))
+        self.assertEqual(''.join(chunks).replace(' ', ''), text.replace(' ', ''))
+        # Tinish belgisiz uzun matn - qattiq bo'linadi
+        self.assertEqual(passages.split_passages('y' * 250, size=100), ['y' * 100, 'y' * 100, 'y' * 50])
+
+    def test_relevant_passages(self):
+        found = passages.relevant_passages(self.index, "Paxta dalasida nima bo'ldi?", budget_tokens=20)
+        self.assertEqual([page for page, _ in found], [7])
+        # Byudjet kattaroq - boshqa parchalar ham, lekin kitob tartibida
+        found = passages.relevant_passages(self.index, "paxta qishloq", budget_tokens=100)
+        self.assertIn(7, [page for page, _ in found])
+        self.assertEqual([page for page, _ in found], sorted(page for page, _ in found))
+
+    def test_representative_passages_cover_book(self):
+        # Mos parcha yo'q - butun kitobdan namunalar (faqat boshi emas)
+        found = passages.relevant_passages(self.index, "kosmos", budget_tokens=40)
+        pages = [page for page, _ in found]
+        self.assertGreater(len(pages), 1)
+        self.assertLessEqual(pages[0], 3)
+        self.assertGreaterEqual(pages[-1], 8)
+        self.assertLessEqual(sum(passages.approx_tokens(text) for _, text in found), 40)
+        self.assertEqual(passages.format_passages(found[:1]), f"[{pages[0]}-sahifa] {found[0][1]}")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PassageIndexCacheTests(TestCase):
+
+    def test_rebuilt_when_pages_replaced(self):
+        book = Book.objects.create(author=Author.objects.create(name="Asqad Muxtor"), title="Chinor")
+        with BookPageWriter(book, index=False) as writer:
+            writer.add(1, "Chinor tagida.")
+        index = passages.get_passage_index(book)
+        self.assertIs(passages.get_passage_index(book), index)
+
+        with BookPageWriter(book, index=False) as writer:
+            writer.add(1, "Chinor tagida.")
+            writer.add(2, "Yangi sahifa.")
+        rebuilt = passages.get_passage_index(book)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual([page for page, _ in rebuilt.passages], [1, 2])
+
+
+# ===== O'XSHASH KITOBLAR =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SimilarityTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.oybek = Author.objects.create(name="Oybek")
+        self.qahhor = Author.objects.create(name="Abdulla Qahhor")
+        self.roman = Category.objects.create(name="Roman", slug='roman')
+        self.paxta = self.book(self.oybek, "Qutlug' qon", "Paxta dalasi, terimchilar va paxta hosili.")
+        self.dala = self.book(self.qahhor, "Qo'shchinor chiroqlari", "Paxta dalasi kuzda. Terimchilar paxta terdi.")
+        self.navoiy = self.book(self.oybek, "Navoiy", "Hirot saroyi, shoir va vazir.")
+        self.boshqa = self.book(self.qahhor, "Sarob", "Shahar ko'chalari, talabalar hayoti.")
+        model_reset = mock.patch.object(similarity, '_model', None)
+        model_reset.start()
+        self.addCleanup(model_reset.stop)
+
+    def book(self, author, title, text):
+        book = Book.objects.create(author=author, title=title)
+        with self.captureOnCommitCallbacks(execute=True):
+            search_index.index_book(book, [(1, text)])
+        return book
+
+    def test_neighbours_combine_signals(self):
+        self.dala.categories.add(self.roman)
+        self.paxta.categories.add(self.roman)
+        neighbours = similarity.SimilarityModel().neighbours(self.paxta.pk)
+        ids = [book_id for book_id, _ in neighbours]
+        # Matn + kategoriya > faqat adib; umumiy signali yo'q kitob yo'q
+        self.assertEqual(ids, [self.dala.pk, self.navoiy.pk])
+        self.assertGreater(neighbours[0][1], neighbours[1][1])
+
+    def test_refresh_pending_is_incremental(self):
+        self.assertEqual(similarity.refresh_pending(), 4)
+        self.assertEqual(similarity.refresh_pending(), 0)
+        self.assertEqual(similarity.similar_books(self.paxta)[0], self.dala)
+
+        # Yangi kitob - o'zi hisoblanadi va qo'shnisining ro'yxatiga qo'shiladi
+        yangi = self.book(self.qahhor, "Paxta haqida", "Paxta dalasi, paxta terimchilar.")
+        self.assertEqual(similarity.refresh_pending(), 1)
+        self.assertEqual(similarity.similar_books(yangi)[0].pk, self.dala.pk)
+        self.assertTrue(SimilarBook.objects.filter(book=self.paxta, similar=yangi).exists())
+
+    def test_fallback_before_first_refresh(self):
+        # Hali hisoblanmagan - shu adib kitoblari
+        self.assertEqual([book.pk for book in similarity.similar_books(self.paxta)], [self.navoiy.pk])
+
+
+# ===== KO'RISHLAR HISOBLAGICHI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ViewCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # record_view ichidagi avtomatik flush o'chiriladi - flush test o'zi chaqiradi
+        cache.set(view_counter.FLUSH_DUE_KEY, 1, None)
+        author = Author.objects.create(name="Abdulla Qodiriy")
+        self.books = [Book.objects.create(author=author, title=f"Kitob {i}") for i in range(3)]
+
+    def views(self):
+        return [Book.objects.get(pk=book.pk).views_count for book in self.books]
+
+    def test_flush_writes_exact_counts(self):
+        for book, count in zip(self.books, [5, 1, 0]):
+            for _ in range(count):
+                view_counter.record_view(book.pk)
+        self.assertEqual(view_counter.current_views(self.books[0]), 5)
+
+        self.assertEqual(view_counter.flush(), 2)
+        self.assertEqual(self.views(), [5, 1, 0])
+        self.assertEqual(view_counter.pending_views([book.pk for book in self.books]), {})
+
+        # Flush dan keyingi ko'rishlar qayta jurnalga tushadi va ikki marta qo'shilmaydi
+        view_counter.record_view(self.books[0].pk)
+        view_counter.record_view(self.books[2].pk)
+        view_counter.flush()
+        view_counter.flush()
+        self.assertEqual(self.views(), [6, 1, 1])
+
+    def test_flush_waits_for_unwritten_journal_slot(self):
+        view_counter.record_view(self.books[0].pk)
+        # Boshqa jarayon indeks oldi, lekin katakni hali yozmadi
+        cache.incr(view_counter.JOURNAL_LENGTH_KEY)
+        view_counter.record_view(self.books[1].pk)
+
+        view_counter.flush()
+        self.assertEqual(self.views(), [1, 0, 0])
+        self.assertEqual(view_counter.current_views(Book.objects.get(pk=self.books[1].pk)), 1)
+
+        # Katak ikkinchi flush da ham bo'sh - tashlab ketiladi, keyingilar yoziladi
+        view_counter.flush()
+        self.assertEqual(self.views(), [1, 1, 0])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IngestionWorkerIdleTests(TestCase):
+
+    def test_idle_loop_runs_maintenance_only_when_due(self):
+        from .management.commands import run_ingestion_worker as worker
+
+        # O'xshashlik navbatida 5 kitob: 3 + 2, keyin bo'sh
+        refresh = mock.Mock(side_effect=[3, 2, 0])
+        with mock.patch.object(worker, 'refresh_pending', refresh), \
+                mock.patch.object(worker.view_counter, 'flush') as flush, \
+                mock.patch.object(worker, 'publish_vocabulary') as publish, \
+                mock.patch.object(worker.time, 'sleep') as sleep:
+            call_command('run_ingestion_worker', once=True, maintenance_interval=3600, stdout=io.StringIO())
+        # Navbat tugaguncha o'xshashlik kutmasdan davom etadi, flush/lug'at esa oraliqda bir marta
+        self.assertEqual(refresh.call_count, 3)
+        self.assertEqual((flush.call_count, publish.call_count), (1, 1))
+        sleep.assert_not_called()
+
+
+# ===== KEYSET SAHIFALASH =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(name="Cho'lpon")
+        # Teng views_count lar - tartib id bo'yicha davom etishi kerak
+        for i, views in enumerate([9, 7, 7, 7, 5, 3, 3, 1]):
+            Book.objects.create(author=author, title=f"Kitob {i}", views_count=views)
+        self.queryset = Book.objects.order_by('-views_count')
+        self.expected = list(self.queryset.order_by('-views_count', '-id').values_list('pk', flat=True))
+
+    def test_forward_and_back(self):
+        pages = []
+        page = get_page(self.queryset, per_page=3)
+        self.assertFalse(page.has_previous())
+        while True:
+            pages.append(page)
+            if not page.has_next():
+                break
+            page = get_page(self.queryset, page.next_cursor, per_page=3)
+
+        self.assertEqual([obj.pk for p in pages for obj in p], self.expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 2])
+        self.assertEqual(pages[0].count, len(self.expected))
+
+        # Orqaga - xuddi shu sahifalar
+        for index in range(len(pages) - 1, 0, -1):
+            previous = get_page(self.queryset, pages[index].previous_cursor, per_page=3)
+            self.assertEqual([obj.pk for obj in previous], [obj.pk for obj in pages[index - 1]])
+            self.assertEqual(previous.has_previous(), index - 1 > 0)
+            self.assertTrue(previous.has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = get_page(self.queryset, 'buzilgan-kursor', per_page=3)
+        self.assertEqual([obj.pk for obj in page], self.expected[:3])
+
+        # Boshqa tartib uchun berilgan kursor qabul qilinmaydi
+        other = get_page(Book.objects.order_by('title'), per_page=3)
+        page = get_page(self.queryset, other.next_cursor, per_page=3)
+        self.assertEqual([obj.pk for obj in page], self.expected[:3])
+
+    def test_cursor_for_page_matches_offset(self):
+        # ?page=N kursori keyingi sahifani OFFSET bilan bir xil joydan boshlaydi
+        for number in (2, 3):
+            page = get_page(self.queryset, cursor_for_page(self.queryset, number, 3), per_page=3)
+            self.assertEqual([obj.pk for obj in page], self.expected[(number - 1) * 3:number * 3])
+        for number in (1, 'abc', 4):
+            self.assertIsNone(cursor_for_page(self.queryset, number, 3))
+
+    def test_all_books_links_and_legacy_page(self):
+        author = Author.objects.first()
+        for i in range(30):
+            Book.objects.create(author=author, title=f"Yana {i}")
+
+        response = self.client.get(reverse('all_books'))
+        self.assertEqual(response.status_code, 200)
+        next_cursor = response.context['next_cursor']
+        self.assertTrue(next_cursor)
+        self.assertContains(response, urlencode({'cursor': next_cursor}))
+
+        # Eski havola - mos kursorli URL ga yo'naltiriladi, boshqa parametrlar saqlanadi
+        response = self.client.get(reverse('all_books'), {'page': 2, 'tab': 'new'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('tab=new', response.url)
+        second = self.client.get(reverse('all_books'), {'cursor': next_cursor})
+        redirected = self.client.get(response.url)
+        self.assertEqual(
+            [book.pk for book in redirected.context['page_obj']],
+            [book.pk for book in second.context['page_obj']],
+        )
+
+
+# ===== TEGLANGAN KESH =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TaggedCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def load(self):
+        self.calls += 1
+        return self.calls
+
+    def test_invalidate_after_commit(self):
+        tags = [tagged_cache.tag(Book)]
+        self.assertEqual(tagged_cache.get_or_set('entry', self.load, tags), 1)
+        self.assertEqual(tagged_cache.get_or_set('entry', self.load, tags), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tagged_cache.invalidate(*tags)
+            # Commit gacha eski yozuv amal qiladi
+            self.assertEqual(tagged_cache.get_or_set('entry', self.load, tags), 1)
+        self.assertEqual(tagged_cache.get_or_set('entry', self.load, tags), 2)
+
+    def test_only_dependent_entries_expire(self):
+        book_tags = [tagged_cache.tag(Book, 1)]
+        author_tags = [tagged_cache.tag(Author)]
+        tagged_cache.get_or_set('book', self.load, book_tags)
+        tagged_cache.get_or_set('author', self.load, author_tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tagged_cache.invalidate(tagged_cache.tag(Book, 2))
+            tagged_cache.invalidate(*author_tags)
+        self.assertEqual(tagged_cache.get_or_set('book', self.load, book_tags), 1)
+        self.assertEqual(tagged_cache.get_or_set('author', self.load, author_tags), 3)
+
+    def test_rating_signal_invalidates_book_tag(self):
+        author = Author.objects.create(name="Oybek")
+        book = Book.objects.create(author=author, title="Navoiy")
+        tags = [tagged_cache.tag(BookRating, book.pk)]
+        tagged_cache.get_or_set('ratings', self.load, tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookRating.objects.create(book=book, rating=4)
+        self.assertEqual(tagged_cache.get_or_set('ratings', self.load, tags), 2)
+
+
+# ===== ADIBLAR KATALOGI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AuthorCatalogTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(name="Abdulla Qodiriy")
+        self.empty = Author.objects.create(name="Erkin Vohidov")
+        self.books = [
+            Book.objects.create(author=self.author, title=f"Roman {i}")
+            for i in range(author_catalog.BOOKS_PER_AUTHOR + 2)
+        ]
+
+    def test_snapshot_contents(self):
+        qodiriy, vohidov = author_catalog.get_catalog()
+        self.assertEqual((qodiriy.id, qodiriy.book_count), (self.author.pk, len(self.books)))
+        # Faqat eng yangi BOOKS_PER_AUTHOR ta kitob
+        self.assertEqual(
+            [book.id for book in qodiriy.books],
+            [book.pk for book in reversed(self.books)][:author_catalog.BOOKS_PER_AUTHOR],
+        )
+        self.assertEqual((vohidov.book_count, vohidov.books, vohidov.image_url), (0, [], None))
+
+    def test_cached_catalog_without_queries(self):
+        author_catalog.get_catalog()
+        with self.assertNumQueries(0):
+            authors = author_catalog.get_catalog()
+        self.assertEqual(len(authors), 2)
+
+    def test_new_book_rebuilds_snapshot(self):
+        author_catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(author=self.empty, title="Tong nafasi")
+        vohidov = author_catalog.get_catalog()[1]
+        self.assertEqual((vohidov.book_count, vohidov.books[0].title), (1, book.title))
+
+
+# ===== PDF MATNINI O'QISH =====
+
+def make_pdf(path, pages, table_page=None):
+    """Test PDF (PyMuPDF bilan): har sahifa matni; table_page - chizilgan 4x3 jadvalli sahifa"""
+    with pdf_extraction.fitz.open() as doc:
+        for index, text in enumerate(pages):
+            page = doc.new_page()
+            if index == table_page:
+                for row in range(5):
+                    page.draw_line((72, 72 + row * 20), (372, 72 + row * 20))
+                for column in range(4):
+                    page.draw_line((72 + column * 100, 72), (72 + column * 100, 152))
+                for row in range(4):
+                    for column in range(3):
+                        page.insert_text((80 + column * 100, 86 + row * 20), f"k{row}{column}")
+            elif text:
+                page.insert_text((72, 72), text)
+        doc.save(path)
+
+
+class TableHeuristicsTests(SimpleTestCase):
+
+    def test_looks_tabular(self):
+        self.assertTrue(pdf_extraction.looks_tabular("oddiy matn", rulings=pdf_extraction.TABLE_MIN_RULINGS))
+        self.assertTrue(pdf_extraction.looks_tabular("Yil  Soni  Ulush\n2020  12  4.5%\n2021  15  5.1%\n2022  19  6.0%"))
+        # Ustunlar bitta bo'shliq bilan - raqamli kataklar bo'yicha
+        self.assertTrue(pdf_extraction.looks_tabular("Hosil\nOlma 12 Nok 15 Uzum 9\nOlma 14 Nok 11 Uzum 8\nOlma 10 Nok 13 Uzum 7"))
+        self.assertFalse(pdf_extraction.looks_tabular("Bu oddiy matn.\nUnda jadval yo'q.\nFaqat gaplar bor."))
+        self.assertFalse(pdf_extraction.looks_tabular(''))
+
+    def test_may_have_rulings(self):
+        self.assertTrue(pdf_extraction.may_have_rulings("k00\nk01\nk02\nk10 va k11"))
+        self.assertFalse(pdf_extraction.may_have_rulings(
+            "Bu sahifada uzun gaplar bor, katakka o'xshamaydi.\n"
+            "Ikkinchi gap ham yetarlicha uzun qilib yozildi.\n"
+            "Uchinchi gap esa sahifani to'ldiradi xolos."
+        ))
+        self.assertFalse(pdf_extraction.may_have_rulings("bitta\nikki"))
+
+
+@skipUnless(pdf_extraction.fitz is not None, "PyMuPDF o'rnatilmagan")
+class PdfExtractionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, 'kitob.pdf')
+
+    def test_pages_in_order_across_ranges(self):
+        make_pdf(self.path, [f"Sahifa raqami {i}" for i in range(1, 12)])
+        # Kichik oraliqlar va 2 jarayon - natija baribir sahifa tartibida
+        with mock.patch.object(pdf_extraction, 'MIN_PARALLEL_PAGES', 1):
+            pages = list(pdf_extraction.iter_pages(self.path, processes=2, range_size=3))
+        self.assertEqual([number for number, _ in pages], list(range(1, 12)))
+        self.assertEqual([text.strip() for _, text in pages], [f"Sahifa raqami {i}" for i in range(1, 12)])
+
+    def test_engines_agree(self):
+        make_pdf(self.path, ["Birinchi sahifa", "Ikkinchi sahifa"])
+        for engine in pdf_extraction.available_engines():
+            with self.subTest(engine=engine):
+                pages = list(pdf_extraction.iter_pages(self.path, processes=1, engine=engine))
+                self.assertEqual([(n, t.strip()) for n, t in pages], [(1, "Birinchi sahifa"), (2, "Ikkinchi sahifa")])
+
+    def test_ruled_table_appended(self):
+        make_pdf(self.path, ["Kirish matni", None], table_page=1)
+        with mock.patch('pdfplumber.page.Page.extract_tables', autospec=True, return_value=[]) as tables:
+            pages = list(pdf_extraction.iter_pages(self.path, processes=1, engine='pymupdf'))
+        # Chiziqlar faqat katakli sahifada sanaladi; jadval faqat shu sahifadan olinadi
+        self.assertEqual(tables.call_count, 1)
+        self.assertEqual(tables.call_args.args[0].page_number, 2)
+        self.assertIn('k00', pages[1][1])
+
+
+# ===== SKANERLANGAN SAHIFALAR OCR =====
+
+class PdfOcrTests(SimpleTestCase):
+
+    def fake_ocr(self, path, page_number):
+        if page_number == 4:
+            raise RuntimeError("tesseract yiqildi")
+        # Oldingi sahifalar kechroq tugaydi - tartib baribir saqlanishi kerak
+        threading.Event().wait(0.05 if page_number == 2 else 0)
+        return f"OCR {page_number}"
+
+    def test_fill_missing_pages_keeps_order(self):
+        pages = [(1, "Matnli sahifa bir"), (2, ''), (3, '  '), (4, ''), (5, "Matnli sahifa besh")]
+        with mock.patch.object(pdf_ocr, 'ocr_available', return_value=True), \
+                mock.patch.object(pdf_ocr, 'ocr_page', side_effect=self.fake_ocr) as ocr_page:
+            result = list(pdf_ocr.fill_missing_pages('kitob.pdf', iter(pages), workers=3))
+        self.assertEqual(result, [
+            (1, "Matnli sahifa bir"), (2, "OCR 2"), (3, "OCR 3"), (4, ''), (5, "Matnli sahifa besh"),
+        ])
+        self.assertEqual(sorted(call.args[1] for call in ocr_page.call_args_list), [2, 3, 4])
+
+    def test_without_ocr_pages_pass_through(self):
+        pages = [(1, ''), (2, "Matn")]
+        with mock.patch.object(pdf_ocr, 'ocr_available', return_value=False):
+            self.assertEqual(list(pdf_ocr.fill_missing_pages('kitob.pdf', iter(pages))), pages)
+
+
+@skipUnless(pdf_ocr.fitz is not None, "PyMuPDF o'rnatilmagan")
+class PdfOcrPageSourceTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, 'skan.pdf')
+        # 1-sahifa bo'sh, 2 va 3 - matnsiz, bir xil chizma (skanerlangan sahifa o'rnida)
+        with pdf_ocr.fitz.open() as doc:
+            doc.new_page()
+            for _ in range(2):
+                doc.new_page().draw_rect((72, 72, 300, 200))
+            doc.save(self.path)
+        self.cache = ConversionCache(directory=os.path.join(self.tempdir.name, 'ocr'), stats_prefix='ocr_test_')
+
+    def test_page_hash(self):
+        self.assertEqual(pdf_ocr.page_source(self.path, 1), (None, None))
+        digest, render = pdf_ocr.page_source(self.path, 2)
+        self.assertEqual(pdf_ocr.page_source(self.path, 3)[0], digest)
+        self.assertTrue(callable(render))
+
+    @skipUnless(pdf_ocr.ocr_available(), "pytesseract o'rnatilmagan")
+    def test_same_page_recognised_once(self):
+        import pytesseract
+
+        with mock.patch.object(pdf_ocr, '_cache', self.cache), \
+                mock.patch.object(pytesseract, 'image_to_string', return_value="Skan matni") as recognise:
+            self.assertEqual(pdf_ocr.ocr_page(self.path, 1), '')
+            self.assertEqual(pdf_ocr.ocr_page(self.path, 2), "Skan matni")
+            # Bir xil sahifa (masalan boshqa nashrda) - keshdan
+            self.assertEqual(pdf_ocr.ocr_page(self.path, 3), "Skan matni")
+        self.assertEqual(recognise.call_count, 1)
+
+
+# ===== MATN CHIQARISH XIZMATI =====
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TextExtractionTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmp = tmpdir.name
+        self.calls = []
+        self.result = "Kitob matni"
+        patches = [
+            mock.patch.object(text_extraction, '_cache', ConversionCache(directory=os.path.join(self.tmp, 'text'))),
+            mock.patch.dict(text_extraction.HANDLERS, {'.tst': self.read_test}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def read_test(self, path):
+        self.calls.append(path)
+        return self.result
+
+    def write(self, name, content, encoding='utf-8'):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding=encoding) as f:
+            f.write(content)
+        return path
+
+    def test_extracted_once_per_content(self):
+        path = self.write('kitob.tst', 'birinchi')
+        copy = self.write('nusxa.tst', 'birinchi')
+        self.assertEqual(text_extraction.extract_text(path), "Kitob matni")
+        # Boshqa nomdagi, lekin bir xil mazmunli fayl ham keshdan
+        self.assertEqual(text_extraction.extract_text(copy), "Kitob matni")
+        self.assertEqual(len(self.calls), 1)
+
+        self.write('kitob.tst', 'ikkinchi tahrir')
+        text_extraction.extract_text(path)
+        self.assertEqual(len(self.calls), 2)
+        self.assertIsNone(text_extraction.extract_text(self.write('rasm.xyz', '')))
+
+    def test_failed_text_expires(self):
+        path = self.write('skan.tst', 'skan')
+        self.result = text_extraction.FailedText('')
+        now = text_extraction.time.time()
+        text_extraction.extract_text(path)
+        self.assertEqual(text_extraction.extract_text(path), '')
+        self.assertEqual(len(self.calls), 1)
+        self.assertAlmostEqual(text_extraction.failed_until(path), now + text_extraction.FAILED_TTL, delta=5)
+
+        # FAILED_TTL o'tgach qayta urinish; endi muvaffaqiyatli natija muddatsiz keshlanadi
+        self.result = "Tuzatilgan matn"
+        with mock.patch.object(text_extraction.time, 'time', return_value=now + text_extraction.FAILED_TTL + 1):
+            self.assertIsNone(text_extraction.failed_until(path))
+            self.assertEqual(text_extraction.extract_text(path), "Tuzatilgan matn")
+        self.assertEqual(len(self.calls), 2)
+        self.assertIsNone(text_extraction.failed_until(path))
+
+    def test_iter_text_chunks(self):
+        # Matnli fayl - aniqlangan kodlashda to'g'ridan-to'g'ri
+        content = "Бобур Мирзо " * 50
+        path = self.write('kirill.txt', content, encoding='cp1251')
+        self.assertEqual(text_extraction.detect_encoding(path), 'cp1251')
+        self.assertEqual(''.join(text_extraction.iter_text(path, chunk_size=64)), content)
+
+        # Boshqa formatlar - keshga yozilgan chiqarilgan matndan
+        self.result = "Sahifa\r\n" * 40
+        path = self.write('kitob.tst', 'mazmun')
+        chunks = list(text_extraction.iter_text(path, chunk_size=64))
+        self.assertEqual(''.join(chunks), self.result)
+        self.assertTrue(all(len(chunk) <= 64 for chunk in chunks))
+        self.assertEqual(len(self.calls), 1)
+
+
+# ===== DVIGATEL TANLASH =====
+
+@skipUnless(pdf_extraction.fitz is not None, "PyMuPDF o'rnatilmagan")
+class EngineSelectionTests(SimpleTestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'kitob.pdf')
+        make_pdf(self.path, ["Birinchi sahifadagi uzun matn qatori", "Ikkinchi sahifadagi uzun matn qatori"])
+        self.stats = engine_selection.EngineStats(os.path.join(tmpdir.name, 'stats', 'extraction_stats.json'))
+        patch = mock.patch.object(engine_selection, '_stats', self.stats)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_features(self):
+        features = engine_selection.document_features(self.path)
+        self.assertEqual((features['pages'], features['units'], features['scanned']), (2, 2, False))
+        self.assertEqual(features['sample_chars'], 2 * len("Birinchi sahifadagi uzun matn qatori"))
+        self.assertEqual(engine_selection.bucket_keys(features)[-2:], ['.pdf:text', '.pdf'])
+        self.assertEqual(engine_selection.producer_family('Microsoft® Word 2016'), 'microsoft')
+        self.assertEqual(engine_selection.producer_family(''), 'unknown')
+
+    def test_order_follows_measured_cost(self):
+        engines = pdf_extraction.available_engines()
+        self.assertEqual(engine_selection.choose(self.path)[0], engines)
+
+        features = engine_selection.document_features(self.path)
+        for _ in range(engine_selection.MIN_RUNS):
+            self.stats.record(features, 'pypdf', 0.1, 70, True)
+            self.stats.record(features, 'pdfplumber', 0.2, 70, True)
+            # Tez, lekin ko'pincha muvaffaqiyatsiz
+            self.stats.record(features, 'pymupdf', 0.05, 0, False)
+        self.stats.save()
+
+        # Fayldan qayta o'qiladi (benchmark boshqa jarayonda yozgan)
+        fresh = engine_selection.EngineStats(self.stats.path)
+        self.assertEqual(engine_selection.choose(self.path, stats=fresh)[0][:2], ['pypdf', 'pdfplumber'])
+        self.assertEqual(engine_selection.choose(self.path, stats=fresh)[0][-1], 'pymupdf')
+
+    def test_run_best_falls_through(self):
+        full = "Birinchi sahifadagi uzun matn qatori\nIkkinchi sahifadagi uzun matn qatori"
+        results = {'pymupdf': "Birinchi", 'pdfplumber': RuntimeError("buzilgan PDF"), 'pypdf': full}
+        calls = []
+
+        def run(name, path):
+            calls.append(name)
+            if isinstance(results[name], Exception):
+                raise results[name]
+            return results[name]
+
+        # Namunaviy sahifalar matnidan ancha kam chiqargan dvigatel muvaffaqiyatsiz
+        self.assertEqual(engine_selection.run_best(self.path, run=run), (full, 'pypdf'))
+        self.assertEqual(calls, ['pymupdf', 'pdfplumber', 'pypdf'])
+
+        results['pypdf'] = ''
+        self.assertEqual(engine_selection.run_best(self.path, run=run), ("Birinchi", None))
+
+
+# ===== MATN STATISTIKASI =====
+
+def old_text_stats(text):
+    """get_file_stats dagi avvalgi sanash qoidalari"""
+    return {
+        'word_count': len(re.findall(r'\b\w+\b', text)),
+        'sentence_count': len([s for s in re.split(r'[.!?]+', text) if s.strip()]),
+        'paragraph_count': len([p for p in text.split('\n\n') if p.strip()]),
+        'char_count': len(text),
+        'char_count_no_spaces': len(text.replace(' ', '').replace('\n', '')),
+    }
+
+
+def chunked_stats(text, size):
+    stats = TextStats()
+    for i in range(0, len(text), size):
+        stats.feed(text[i:i + size])
+    return stats.result()
+
+
+class TextStatsTests(SimpleTestCase):
+
+    SAMPLES = [
+        '',
+        'Salom',
+        "O'tkan kunlar. Mehrobdan chayon!\n\nIkkinchi paragraf... Uchinchi gap?",
+        '\n\n\nBoshida bo\'sh qatorlar.\n\n\n\nOxirida ham\n\n',
+        'Nuqtalar... ... !!! ??? faqat belgilar',
+        ' \n \n bo\'sh joyli qatorlar \n\n\t\n matn',
+        'Кирилл ёзуви. Ўзбек тили!\n\nҒалаба',
+    ]
+
+    def test_matches_old_rules(self):
+        for text in self.SAMPLES:
+            with self.subTest(text=text):
+                self.assertEqual(text_stats(text), old_text_stats(text))
+
+    def test_chunk_boundaries(self):
+        for text in self.SAMPLES:
+            for size in (1, 2, 3, 7):
+                with self.subTest(text=text, size=size):
+                    self.assertEqual(chunked_stats(text, size), old_text_stats(text))
+
+    def test_random_texts(self):
+        rng = random.Random(25)
+        alphabet = ['a', 'b', "'", ' ', '\n', '\n', '.', '!', '?', '\t', 'ў', '1']
+        for _ in range(300):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            size = rng.randint(1, 10)
+            with self.subTest(text=text, size=size):
+                self.assertEqual(chunked_stats(text, size), old_text_stats(text))
+
+
+def old_find(text, needle, context=50):
+    """get_file_stats dagi avvalgi qidiruv (butun matn xotirada)"""
+    return [
+        (match.start(), match.group(), text[max(0, match.start() - context):match.end() + context])
+        for match in re.finditer(re.escape(needle), text, re.IGNORECASE)
+    ]
+
+
+class FindInChunksTests(SimpleTestCase):
+
+    def test_matches_finditer(self):
+        text = "Kitob kitobi KITOB. " * 12 + "oxiri kitob"
+        for needle in ('kitob', 'ob k', 'x'):
+            for size in (1, 4, 9, 64, len(text)):
+                with self.subTest(needle=needle, size=size):
+                    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+                    self.assertEqual(find_in_chunks(chunks, needle, context=10), old_find(text, needle, 10))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FileTextStatsTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'kitob.txt')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("Birinchi gap. Ikkinchi gap!\n\nYangi paragraf")
+
+    def test_cached_by_content(self):
+        expected = text_stats("Birinchi gap. Ikkinchi gap!\n\nYangi paragraf")
+        self.assertEqual(file_text_stats(self.path), expected)
+        with mock.patch.object(text_extraction, 'iter_text') as iter_text:
+            self.assertEqual(file_text_stats(self.path), expected)
+        iter_text.assert_not_called()
+        self.assertIsNone(file_text_stats(self.path + '.xyz'))
@@ -0,0 +1,301 @@
+"""
+Fayldan matn chiqarish - yagona xizmat
+Oldin bir xil fayl to'rt joyda (extract_pdf_text_advanced, extract_text_content, get_file_content,
+Book.extract_text_from_file) har chaqiruvda qayta o'qilardi. Endi:
+    - format -> handler reyestri (@register('.pdf'))
+    - natija diskda fayl mazmuni xeshi (SHA-256) bo'yicha keshlanadi - fayl bir marta o'qiladi;
+      hech bir dvigatel muvaffaqiyatli bo'lmagan natija faqat FAILED_TTL ga (sabab tuzatilsa qayta urinish)
+    - xesh ham (yo'l, hajm, mtime) bo'yicha keshlanadi - har chaqiruvda fayl qayta xeshlanmaydi
+    - har handler uchun vaqt metrikasi (chaqiruvlar soni, jami/o'rtacha soniya)
+
+Ishlatish:
+    text = extract_text(path)          # qo'llab-quvvatlanmaydigan format - None
+    for chunk in iter_text(path): ...  # katta fayllar - bo'laklab (text_stats)
+"""
+import os
+import time
+import codecs
+import hashlib
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .conversion_cache import ConversionCache, file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Handlerlar o'zgarsa oshiriladi - eski matnlar avtomatik eskiradi
+EXTRACTOR_VERSION = 2
+TEXT_CACHE_DIR = getattr(settings, 'TEXT_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'text'))
+TEXT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+DIGEST_TTL = 60 * 60 * 24
+# Muvaffaqiyatsiz natija (OCR yo'q, LibreOffice timeout ...) shuncha soniya keshda turadi
+FAILED_TTL = 10 * 60
+METRICS_KEY_PREFIX = 'text_extraction_'
+
+TEXT_ENCODINGS = ('utf-8', 'cp1251', 'latin-1')
+
+HANDLERS = {}
+
+
+class FailedText(str):
+    """Handler natijasi: dvigatellar muvaffaqiyatsiz - eng yaxshi taxmin (uzoq keshlanmaydi)"""
+
+
+def register(*extensions):
+    """Handler ni kengaytmalar uchun ro'yxatga olish: handler(path) -> str"""
+    def decorator(handler):
+        for ext in extensions:
+            HANDLERS[ext.lower()] = handler
+        return handler
+    return decorator
+
+
+def supported(path):
+    return os.path.splitext(str(path))[1].lower() in HANDLERS
+
+
+# ===== HANDLERLAR =====
+
+def read_text_file(path):
+    """Matnli fayl: BOM bo'yicha yoki utf-8 -> cp1251 -> latin-1 ketma-ketligida"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if raw.startswith(b'\xef\xbb\xbf'):
+        return raw[3:].decode('utf-8', errors='replace')
+    if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return raw.decode('utf-16', errors='replace')
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('utf-8', errors='replace')
+
+
+def detect_encoding(path, chunk_size=1024 * 1024):
+    """read_text_file bilan bir xil tanlov, lekin faylni bo'laklab tekshiradi (xotira cheklangan)"""
+    with open(path, 'rb') as f:
+        head = f.read(3)
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16'
+    for encoding in TEXT_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+register(
+    '.txt', '.md', '.csv', '.json', '.xml', '.html', '.htm', '.css', '.js', '.py',
+    '.java', '.cpp', '.c', '.h',
+)(read_text_file)
+
+
+@register('.pdf')
+def read_pdf(path):
+    """
+    PDF: dvigatellar o'lchangan statistika bo'yicha tartibda (engine_selection);
+    har biri parallel sahifa o'qish + matnsiz sahifalar OCR (pdf_extraction, pdf_ocr)
+    """
+    from .engine_selection import run_best
+    from .pdf_extraction import iter_pages
+    from .pdf_ocr import fill_missing_pages
+
+    def run(engine, file_path):
+        return '\n'.join(text for _, text in fill_missing_pages(file_path, iter_pages(file_path, engine=engine)))
+
+    text, engine = run_best(path, '.pdf', run)
+    logger.info(f"TEXT_EXTRACTION: {os.path.basename(path)} - dvigatel: {engine or 'muvaffaqiyatsiz'}")
+    return text if engine else FailedText(text)
+
+
+def read_docx(path):
+    from docx import Document
+    return '\n'.join(paragraph.text for paragraph in Document(path).paragraphs)
+
+
+@register('.docx', '.odt')
+def read_document(path):
+    """DOCX/ODT: python-docx/odfpy yoki LibreOffice - qaysi biri tezroq (engine_selection)"""
+    from .engine_selection import run_best
+    text, engine = run_best(path)
+    return text if engine else FailedText(text)
+
+
+@register('.xlsx', '.xls')
+def read_spreadsheet(path):
+    import pandas as pd
+    return pd.read_excel(path).to_string()
+
+
+@register('.doc', '.rtf', '.ppt', '.pptx')
+def read_with_libreoffice(path):
+    """Boshqa ofis formatlari - LibreOffice hovuzi orqali TXT ga"""
+    from libreoffice_converter import run_libreoffice_conversion
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        txt_path = run_libreoffice_conversion(path, 'txt:Text', temp_dir, timeout=120)
+        if not txt_path:
+            raise RuntimeError("LibreOffice matnga aylantira olmadi")
+        return read_text_file(txt_path)
+
+
+# ===== KESH VA METRIKALAR =====
+
+_cache = None
+
+
+def get_text_cache():
+    global _cache
+    if _cache is None:
+        _cache = ConversionCache(
+            directory=TEXT_CACHE_DIR, max_bytes=TEXT_CACHE_MAX_BYTES,
+            version=EXTRACTOR_VERSION, stats_prefix='text_cache_',
+        )
+    return _cache
+
+
+def content_digest(path):
+    """Fayl SHA-256 xeshi; (yo'l, hajm, mtime) o'zgarmagan bo'lsa keshdan"""
+    stat = os.stat(path)
+    key = 'file_digest_' + hashlib.sha1(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+    digest = cache.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        cache.set(key, digest, DIGEST_TTL)
+    return digest
+
+
+def _record_timing(handler_name, seconds):
+    from .utils import _incr_counter
+    try:
+        _incr_counter(f"{METRICS_KEY_PREFIX}{handler_name}_calls", None)
+        _incr_counter(f"{METRICS_KEY_PREFIX}{handler_name}_ms", None, int(seconds * 1000))
+    except Exception as e:
+        logger.warning(f"TEXT_EXTRACTION: metrikani yozib bo'lmadi: {e}")
+
+
+def metrics():
+    """Har handler uchun: chaqiruvlar, jami va o'rtacha vaqt; hamda kesh hit/miss"""
+    names = sorted({handler.__name__ for handler in HANDLERS.values()})
+    keys = [f"{METRICS_KEY_PREFIX}{name}_{suffix}" for name in names for suffix in ('calls', 'ms')]
+    values = cache.get_many(keys)
+    handlers = {}
+    for name in names:
+        calls = values.get(f"{METRICS_KEY_PREFIX}{name}_calls", 0)
+        total_ms = values.get(f"{METRICS_KEY_PREFIX}{name}_ms", 0)
+        handlers[name] = {
+            'calls': calls,
+            'total_seconds': round(total_ms / 1000, 3),
+            'avg_seconds': round(total_ms / 1000 / calls, 3) if calls else 0,
+        }
+    return {'handlers': handlers, 'cache': get_text_cache().stats()}
+
+
+def extract_text(path, ext=None):
+    """
+    Fayl matni (keshdan yoki handler bilan)
+    :param ext: kengaytma (fayl nomida bo'lmasa, masalan vaqtinchalik fayl)
+    :return: matn; format qo'llab-quvvatlanmasa - None. Handler xatosi chaqiruvchiga o'tadi.
+    """
+    path = str(path)
+    ext = (ext or os.path.splitext(path)[1]).lower()
+    handler = HANDLERS.get(ext)
+    if handler is None:
+        return None
+
+    text_cache = get_text_cache()
+    digest = content_digest(path)
+    cached = _cached(text_cache, digest, ext, encoding='utf-8')
+    if cached is not None:
+        with cached[0] as f:
+            return f.read()
+
+    started = time.monotonic()
+    text = handler(path)
+    if text is None:
+        # FailedText('') ham bo'sh - `or ''` bilan muvaffaqiyatsizlik belgisi yo'qolardi
+        text = ''
+    seconds = time.monotonic() - started
+    _record_timing(handler.__name__, seconds)
+    failed = isinstance(text, FailedText)
+    logger.info(
+        f"TEXT_EXTRACTION: {handler.__name__} {os.path.basename(path)} - {len(text)} belgi, {seconds:.2f}s"
+        + (" (muvaffaqiyatsiz)" if failed else "")
+    )
+
+    meta = {'handler': handler.__name__, 'seconds': round(seconds, 3)}
+    if failed:
+        meta['expires_at'] = time.time() + FAILED_TTL
+    text_cache.put(digest, f"text{ext}", meta, data=text.encode('utf-8'))
+    return str(text)
+
+
+def _expired(meta):
+    return meta.get('expires_at', float('inf')) <= time.time()
+
+
+def _cached(text_cache, digest, ext, **open_kwargs):
+    """
+    Keshdagi matn - darhol ochiladi (parallel evict o'chirib yubormasin): (ochiq fayl, meta)
+    Muddati o'tgan muvaffaqiyatsiz natija - yo'q hisoblanadi
+    """
+    cached = text_cache.open(digest, f"text{ext}", 'r', **open_kwargs)
+    if cached is not None and _expired(cached[1]):
+        cached[0].close()
+        return None
+    return cached
+
+
+def failed_until(path):
+    """Fayl matni muvaffaqiyatsiz chiqarilgan bo'lsa - keshdagi natija muddati (time.time()), aks holda None"""
+    path = str(path)
+    ext = os.path.splitext(path)[1].lower()
+    if HANDLERS.get(ext) in (None, read_text_file):
+        return None
+    cached = get_text_cache().get(content_digest(path), f"text{ext}")
+    return cached[1].get('expires_at') if cached and not _expired(cached[1]) else None
+
+
+def iter_text(path, chunk_size=1024 * 1024):
+    """
+    Fayl matni bo'laklab (butun matn xotiraga olinmaydi):
+    matnli fayllar - o'zi (aniqlangan kodlashda), boshqalar - keshdagi chiqarilgan matn
+    :return: str bo'laklar generatori; format qo'llab-quvvatlanmasa - None
+    """
+    path = str(path)
+    ext = os.path.splitext(path)[1].lower()
+    handler = HANDLERS.get(ext)
+    if handler is None:
+        return None
+
+    if handler is read_text_file:
+        source = open(path, 'r', encoding=detect_encoding(path), errors='replace', newline='')
+    else:
+        open_kwargs = {'encoding': 'utf-8', 'errors': 'replace', 'newline': ''}
+        cached = _cached(get_text_cache(), content_digest(path), ext, **open_kwargs)
+        if cached is None:
+            extract_text(path)
+            cached = _cached(get_text_cache(), content_digest(path), ext, **open_kwargs)
+        if cached is None:
+            # Kesh yozilmadi (disk xatosi) - matn xotiradan bo'laklanadi
+            text = extract_text(path)
+            return (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+        source = cached[0]
+
+    def chunks():
+        with source as f:
+            for chunk in iter(lambda: f.read(chunk_size), ''):
+                yield chunk
+    return chunks()
@@ -0,0 +1,177 @@
+"""
+Matn statistikasi - bir o'tishda, bo'laklab
+get_file_stats oldin butun matn ustida to'rt marta yurardi (findall - har so'z alohida satr,
+split - gaplar va paragraflar ro'yxati, replace - ikki nusxa). Katta fayllarda bu matnning
+o'zidan bir necha barobar ko'p xotira. Endi:
+    - matn bo'laklab o'qiladi (text_extraction.iter_text) - xotira bo'lak hajmi bilan cheklangan
+    - so'z, gap, paragraf va belgilar bitta o'tishda sanaladi; bo'lak chegarasidagi holat
+      (so'z o'rtasi, ochiq gap/paragraf, kutilayotgan yangi qatorlar) keyingi bo'lakka o'tadi
+    - natija fayl mazmuni xeshi bo'yicha keshlanadi - qidiruv so'rovlarida qayta sanalmaydi
+    - matn ichida qidiruv ham bo'laklab (find_in_chunks) - butun matn xotiraga olinmaydi
+
+Sanash qoidalari avvalgidek: so'z - \\b\\w+\\b, gap - [.!?]+ bilan ajratilgan bo'sh bo'lmagan
+bo'laklar, paragraf - '\\n\\n' bilan ajratilgan bo'sh bo'lmagan bo'laklar.
+"""
+import re
+import time
+import itertools
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Sanash qoidalari o'zgarsa oshiriladi - eski natijalar avtomatik eskiradi
+STATS_VERSION = 1
+STATS_TTL = 60 * 60 * 24 * 7
+CHUNK_SIZE = 1024 * 1024
+
+_WORD_RE = re.compile(r'\w+')
+_WORD_CHAR_RE = re.compile(r'\w')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_PARAGRAPH_SPLIT_RE = re.compile(r'\n{2,}')
+
+
+def _has_text(part):
+    return bool(part) and not part.isspace()
+
+
+class TextStats:
+    """Bo'laklab to'ldiriladigan hisoblagich: feed(bo'lak) ... result()"""
+
+    def __init__(self):
+        self.words = 0
+        self.sentences = 0
+        self.paragraphs = 0
+        self.chars = 0
+        self.spaces = 0
+        # Bo'laklar orasida o'tadigan holat
+        self._in_word = False
+        self._sentence_open = False
+        self._paragraph_open = False
+        self._newlines = 0
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        self.chars += len(chunk)
+        self.spaces += chunk.count(' ') + chunk.count('\n')
+        self._count_words(chunk)
+        self._count_sentences(chunk)
+        self._count_paragraphs(chunk)
+
+    def _count_words(self, chunk):
+        self.words += len(_WORD_RE.findall(chunk))
+        # Oldingi bo'lak so'z o'rtasida tugagan - bu so'z ikki marta sanalmasin
+        if self._in_word and _WORD_CHAR_RE.match(chunk[0]):
+            self.words -= 1
+        self._in_word = bool(_WORD_CHAR_RE.match(chunk[-1]))
+
+    def _count_sentences(self, chunk):
+        parts = _SENTENCE_SPLIT_RE.split(chunk)
+        is_open = self._sentence_open or _has_text(parts[0])
+        for part in parts[1:]:
+            if is_open:
+                self.sentences += 1
+            is_open = _has_text(part)
+        self._sentence_open = is_open
+
+    def _close_paragraph(self):
+        if self._paragraph_open:
+            self.paragraphs += 1
+        self._paragraph_open = False
+
+    def _count_paragraphs(self, chunk):
+        body = chunk.lstrip('\n')
+        if not body:
+            self._newlines += len(chunk)
+            return
+        # Bo'lak chegarasida bo'lingan '\n\n' ham ajratuvchi
+        if self._newlines + len(chunk) - len(body) >= 2:
+            self._close_paragraph()
+        core = body.rstrip('\n')
+        self._newlines = len(body) - len(core)
+
+        parts = _PARAGRAPH_SPLIT_RE.split(core)
+        self._paragraph_open = self._paragraph_open or _has_text(parts[0])
+        for part in parts[1:]:
+            self._close_paragraph()
+            self._paragraph_open = _has_text(part)
+
+    def result(self):
+        return {
+            'word_count': self.words,
+            'sentence_count': self.sentences + int(self._sentence_open),
+            'paragraph_count': self.paragraphs + int(self._paragraph_open),
+            'char_count': self.chars,
+            'char_count_no_spaces': self.chars - self.spaces,
+        }
+
+
+def text_stats(chunks):
+    """Matn bo'laklari (yoki bitta satr) statistikasi"""
+    if isinstance(chunks, str):
+        text = chunks
+        chunks = (text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE))
+    stats = TextStats()
+    for chunk in chunks:
+        stats.feed(chunk)
+    return stats.result()
+
+
+def find_in_chunks(chunks, needle, context=50):
+    """
+    Matn bo'laklarida katta-kichik harfga qaramay qidirish (re.finditer bilan bir xil natija)
+    Xotirada faqat joriy bo'lak va oldingisining oxiri (moslik + kontekst uchun) turadi.
+    :return: [(pozitsiya, topilgan matn, atrofdagi kontekst), ...]
+    """
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    pattern = re.compile(re.escape(needle), re.IGNORECASE)
+    results = []
+    buffer = ''
+    offset = 0  # buffer[0] ning matndagi pozitsiyasi
+    position = 0  # buffer ichida qidiruv shu joydan davom etadi
+    for chunk in itertools.chain(chunks, [None]):
+        final = chunk is None
+        if not final:
+            buffer += chunk
+        waiting = None
+        for match in pattern.finditer(buffer, position):
+            if not final and match.end() + context > len(buffer):
+                # Keyingi bo'lakdan kontekst kerak
+                waiting = match.start()
+                break
+            start = max(0, match.start() - context)
+            results.append((offset + match.start(), match.group(), buffer[start:match.end() + context]))
+            position = match.end()
+        if final:
+            break
+        # IGNORECASE moslik uzunligi needle bilan bir xil - oxirgi len(needle) belgidan oldin
+        # boshlanadigan moslik bo'lsa, u allaqachon topilgan
+        position = waiting if waiting is not None else max(position, len(buffer) - len(needle))
+        cut = max(0, position - context)
+        buffer = buffer[cut:]
+        offset += cut
+        position -= cut
+    return results
+
+
+def file_text_stats(path):
+    """
+    Fayl matni statistikasi; fayl mazmuni xeshi bo'yicha keshdan
+    :return: statistika lug'ati; format qo'llab-quvvatlanmasa - None
+    """
+    from .text_extraction import EXTRACTOR_VERSION, content_digest, failed_until, iter_text, supported
+
+    if not supported(path):
+        return None
+    key = f"text_stats_{STATS_VERSION}_{EXTRACTOR_VERSION}_{content_digest(str(path))}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = text_stats(iter_text(path, CHUNK_SIZE))
+        # Muvaffaqiyatsiz chiqarilgan matn statistikasi shu matn bilan birga eskiradi
+        expires_at = failed_until(path)
+        timeout = STATS_TTL if expires_at is None else max(1, int(expires_at - time.time()))
+        cache.set(key, stats, timeout)
+    return stats
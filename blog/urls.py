@@ -39,6 +39,7 @@ urlpatterns = [
     path('kitob-yuklash/', views.kitob_yuklash, name='kitob_yuklash'),
     path('api/get-authors/', views.get_authors, name='get_authors'),
     path('api/upload-zip/', views.upload_zip_books, name='upload_zip_books'),
+    path('api/ingest-jobs/<int:job_id>/', views.ingestion_job_status, name='ingestion_job_status'),
     path('kitob/<int:book_id>/', views.book_detail, name='book_detail'),
     path('kitob/<int:book_id>/download/', views.download_book, name='download_book'),
     path('kitob/<int:book_id>/read/', views.read_book, name='read_book'),
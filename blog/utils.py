@@ -2,6 +2,8 @@
 Utility functions va xavfsizlik
 """
 import os
+import math
+import time
 import logging
 from functools import wraps
 from django.core.cache import cache
@@ -20,13 +22,112 @@ logger = logging.getLogger(__name__)
 
 # ===== RATE LIMITING =====
 
-def rate_limit(key_prefix, limit=10, period=60):
+class RateLimitResult:
+    """Bitta tekshiruv natijasi (eng qattiq cheklov bo'yicha)"""
+
+    def __init__(self, allowed, limit, remaining, reset, retry_after=0):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+    def apply_headers(self, response):
+        """X-RateLimit-* headerlarini javobga qo'shish"""
+        response['X-RateLimit-Limit'] = str(self.limit)
+        response['X-RateLimit-Remaining'] = str(self.remaining)
+        response['X-RateLimit-Reset'] = str(self.reset)
+        if not self.allowed:
+            response['Retry-After'] = str(self.retry_after)
+        return response
+
+
+def _incr_counter(key, timeout, delta=1):
+    """Atomar oshirish: kalit yo'q bo'lsa timeout bilan yaratiladi"""
+    if hasattr(cache, 'incr_or_add'):
+        return cache.incr_or_add(key, delta, timeout)
+    # Redis/LocMem: add atomar, incr atomar (TTL har hit'da yangilanmaydi)
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, delta, timeout)
+        return delta
+
+
+def _decr_counter(key):
+    try:
+        cache.decr(key)
+    except ValueError:
+        pass
+
+
+def check_rate_limit(identifier, limits, now=None):
+    """
+    Sliding window (ikki oyna) algoritmi bilan tekshirish va hisoblash.
+    Har bir cheklov uchun joriy va oldingi oyna hisoblagichi saqlanadi:
+        taxminiy son = oldingi * (oynaning o'tmagan qismi) + joriy
+    Oldingi oynalar bitta get_many bilan, joriy oynalar atomar incr bilan olinadi.
+    Rad etilgan so'rov hisobga olinmaydi.
+    :param identifier: kalit (masalan 'send_message:user_5')
+    :param limits: [(so'rovlar soni, davr soniyalarda), ...] - masalan burst + sustained
+    :return: RateLimitResult
     """
-    Rate limiting dekoratori
+    now = time.time() if now is None else now
+    windows = []
+    for limit, period in limits:
+        window = int(now // period)
+        windows.append({
+            'limit': limit,
+            'period': period,
+            'elapsed': now - window * period,
+            'current_key': f"ratelimit:{identifier}:{period}:{window}",
+            'previous_key': f"ratelimit:{identifier}:{period}:{window - 1}",
+        })
+
+    previous_counts = cache.get_many([w['previous_key'] for w in windows])
+
+    results = []
+    for w in windows:
+        current = _incr_counter(w['current_key'], w['period'] * 2)
+        previous = previous_counts.get(w['previous_key'], 0)
+        weight = 1 - w['elapsed'] / w['period']
+        estimated = previous * weight + current
+        w['current'] = current
+        w['allowed'] = estimated <= w['limit']
+        w['remaining'] = max(0, int(w['limit'] - estimated))
+        w['reset'] = max(1, int(math.ceil(w['period'] - w['elapsed'])))
+        if not w['allowed']:
+            # Oldingi oyna ulushi kamayib, joy bo'shashigacha taxminiy vaqt
+            if previous:
+                excess = estimated - w['limit']
+                w['retry_after'] = max(1, int(math.ceil(excess / previous * w['period'])))
+            else:
+                w['retry_after'] = w['reset']
+        results.append(w)
+
+    denied = [w for w in results if not w['allowed']]
+    if denied:
+        for w in results:
+            _decr_counter(w['current_key'])
+        strictest = max(denied, key=lambda w: w['retry_after'])
+        return RateLimitResult(False, strictest['limit'], 0, strictest['reset'], strictest['retry_after'])
+
+    strictest = min(results, key=lambda w: w['remaining'])
+    return RateLimitResult(True, strictest['limit'], strictest['remaining'], strictest['reset'])
+
+
+def rate_limit(key_prefix, limit=10, period=60, limits=None):
+    """
+    Rate limiting dekoratori (sliding window, atomar hisoblagichlar)
     :param key_prefix: Cache kaliti prefiksi
     :param limit: Ruxsat berilgan so'rovlar soni
     :param period: Vaqt oynasi (sekundlarda)
+    :param limits: bir nechta cheklov [(limit, period), ...] - masalan [(5, 10), (30, 60)]:
+                   10 soniyada 5 tadan (burst) va daqiqada 30 tadan (sustained) ko'p emas
     """
+    limits = limits or [(limit, period)]
+
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
@@ -36,22 +137,18 @@ def rate_limit(key_prefix, limit=10, period=60):
             else:
                 identifier = f"ip_{get_client_ip(request)}"
             
-            cache_key = f"ratelimit:{key_prefix}:{identifier}"
+            result = check_rate_limit(f"{key_prefix}:{identifier}", limits)
             
-            # Joriy so'rovlar sonini olish
-            current = cache.get(cache_key, 0)
-            
-            if current >= limit:
+            if not result.allowed:
                 logger.warning(f"Rate limit exceeded for {identifier} on {key_prefix}")
-                return JsonResponse({
+                response = JsonResponse({
                     'error': "Juda ko'p so'rov. Biroz kuting.",
-                    'retry_after': period
+                    'retry_after': result.retry_after
                 }, status=429)
+                return result.apply_headers(response)
             
-            # Sonni oshirish
-            cache.set(cache_key, current + 1, period)
-            
-            return view_func(request, *args, **kwargs)
+            response = view_func(request, *args, **kwargs)
+            return result.apply_headers(response)
         return wrapper
     return decorator
 
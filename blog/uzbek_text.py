@@ -0,0 +1,68 @@
+"""
+O'zbek matnini normallashtirish (qidiruv indeksi va so'rovlar uchun bitta kanonik shakl)
+    - apostroflar: ʻ ʼ ‘ ’ ` -> '  (o‘zbek, oʻzbek, o`zbek -> o'zbek)
+    - yozuv: o'zbek kirill va rus harflari -> lotin (ўзбек -> o'zbek)
+    - yengil o'zak ajratish: qo'shimchalar olib tashlanadi (kitoblarimizdan -> kitob)
+Indekslashda ham, so'rovda ham bir xil qo'llanadi - bitta indeks barcha yozuvlarga xizmat qiladi.
+"""
+import re
+
+# So'z: harf/raqamlar, ichida apostrof bo'lishi mumkin (o'zbek, g'alaba)
+TOKEN_RE = re.compile(r"\w+(?:['`ʻʼ‘’]\w+)*", re.UNICODE)
+APOSTROPHES_RE = re.compile(r"['`ʻʼ‘’ʹ′]")
+
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 's',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': "'", 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya', 'ў': "o'", 'қ': 'q', 'ғ': "g'", 'ҳ': 'h',
+}
+_TRANSLIT_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+# So'z boshida, unlidan yoki ъ/ь dan keyin 'е' -> 'ye' (ер -> yer, мева -> meva)
+_CYRILLIC_YE_RE = re.compile(r'(?<![бвгджзйклмнпрстфхцчшщқғҳ])е')
+
+# Qo'shimchalar guruhlari - so'z oxiridan ichkariga qarab, har guruhdan ko'pi bilan bittasi
+SUFFIX_GROUPS = (
+    ('dir', 'mi', 'ku'),                                                    # yuklamalar
+    ('gacha', 'dagi', 'ning', 'dan', 'tan', 'dek', 'da', 'ta', 'ga', 'ka', 'qa', 'ni'),  # kelishiklar
+    ('ingiz', 'imiz', 'ngiz', 'miz', 'ing', 'im', 'si', 'i'),               # egalik
+    ('lar',),                                                                # ko'plik
+)
+MIN_STEM_LENGTH = 2
+
+
+def fold(text):
+    """Kichik harf, apostroflar birxillashtirilgan, kirill -> lotin"""
+    text = (text or '').lower()
+    if not text.isascii():
+        text = _CYRILLIC_YE_RE.sub('ye', text).translate(_TRANSLIT_TABLE)
+    return APOSTROPHES_RE.sub("'", text)
+
+
+def split_suffixes(word):
+    """
+    So'zni o'zak va qo'shimchalarga ajratish (word allaqachon fold qilingan)
+    :return: (o'zak, qo'shimchalar) - o'zak + qo'shimchalar == word
+    """
+    stem = word
+    for group in SUFFIX_GROUPS:
+        for suffix in group:
+            if stem.endswith(suffix) and len(stem) - len(suffix) >= MIN_STEM_LENGTH:
+                stem = stem[:-len(suffix)]
+                break
+    return stem, word[len(stem):]
+
+
+def stem(word):
+    return split_suffixes(word)[0]
+
+
+def words(text):
+    """Matndagi so'zlar (fold qilingan, o'zaksiz)"""
+    return [fold(match.group()) for match in TOKEN_RE.finditer(text or '')]
+
+
+def normalize_term(word):
+    """Indeks va so'rov uchun kanonik term: fold + o'zak"""
+    return stem(fold(word))
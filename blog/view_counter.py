@@ -0,0 +1,139 @@
+"""
+Kitob ko'rishlar hisoblagichi (write-behind)
+Har bir ko'rish bazaga emas, umumiy keshga atomar incr bilan yoziladi; to'plangan qiymatlar
+VIEW_COUNTER_FLUSH_INTERVAL da bir marta bitta UPDATE (CASE) bilan Book.views_count ga qo'shiladi.
+Ko'rsatishda: bazadagi qiymat + keshdagi hali yozilmagan qism.
+
+Qaysi kitoblar "iflos" ekanini bilish uchun jurnal: kitob hisoblagichi 0 -> 1 bo'lganda
+uning id si jurnalning navbatdagi katagiga yoziladi, flush jurnalni oxirgi o'qilgan joydan o'qiydi.
+Katak ikki qadamda yoziladi (avval indeks, keyin qiymat) - flush hali to'ldirilmagan katakda
+to'xtaydi va keyingi safar shu joydan davom etadi.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, When
+
+from .utils import _incr_counter
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30)
+FLUSH_BATCH_SIZE = 500
+
+PENDING_KEY = 'book_views_pending_{}'
+JOURNAL_KEY = 'book_views_journal_{}'
+JOURNAL_LENGTH_KEY = 'book_views_journal_length'
+JOURNAL_FLUSHED_KEY = 'book_views_journal_flushed'
+FLUSH_LOCK_KEY = 'book_views_flush_lock'
+FLUSH_DUE_KEY = 'book_views_flush_due'
+JOURNAL_GAP_KEY = 'book_views_journal_gap'
+
+
+def _journal(book_id):
+    index = _incr_counter(JOURNAL_LENGTH_KEY, None)
+    cache.set(JOURNAL_KEY.format(index), book_id, None)
+
+
+def record_view(book_id):
+    """Ko'rishni hisoblash (bazaga so'rovsiz); muddati kelgan bo'lsa flush ham qilinadi"""
+    try:
+        if _incr_counter(PENDING_KEY.format(book_id), None) == 1:
+            _journal(book_id)
+    except Exception as e:
+        logger.warning(f"VIEW_COUNTER: kesh xatosi, to'g'ridan-to'g'ri yoziladi: {e}")
+        from .models import Book
+        Book.objects.filter(pk=book_id).update(views_count=F('views_count') + 1)
+        return
+
+    # Har FLUSH_INTERVAL da bitta so'rov flush qiladi (add - atomar, faqat bittasi True oladi)
+    if cache.add(FLUSH_DUE_KEY, 1, FLUSH_INTERVAL):
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"VIEW_COUNTER: flush xatosi: {e}")
+
+
+def pending_views(book_ids):
+    """Hali bazaga yozilmagan ko'rishlar: {book_id: son}"""
+    keys = {PENDING_KEY.format(book_id): book_id for book_id in book_ids}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception:
+        return {}
+    return {keys[key]: value for key, value in found.items() if value}
+
+
+def current_views(book):
+    """Ko'rsatish uchun: bazadagi qiymat + keshdagi qism"""
+    return book.views_count + pending_views([book.pk]).get(book.pk, 0)
+
+
+def flush():
+    """
+    To'plangan ko'rishlarni bazaga yozish
+    :return: yangilangan kitoblar soni
+    """
+    from .models import Book
+
+    if not cache.add(FLUSH_LOCK_KEY, 1, 60):
+        return 0
+    try:
+        end = cache.get(JOURNAL_LENGTH_KEY, 0)
+        start = cache.get(JOURNAL_FLUSHED_KEY, 0)
+        if end <= start:
+            return 0
+        journal_keys = [JOURNAL_KEY.format(index) for index in range(start + 1, end + 1)]
+        found = cache.get_many(journal_keys)
+
+        # Bo'sh katak - indeks olingan, lekin qiymat hali yozilmagan: undan o'tib ketilsa (va
+        # o'chirilsa) kitob hisoblagichi >= 1 bo'lib qoladi va u boshqa jurnalga tushmaydi
+        ready = []
+        for key in journal_keys:
+            if key not in found:
+                if cache.get(JOURNAL_GAP_KEY) != key:
+                    cache.set(JOURNAL_GAP_KEY, key, None)
+                    break
+                # Oldingi flush da ham bo'sh edi - yozuvchi jarayon to'xtagan, katak tashlab ketiladi
+                logger.warning(f"VIEW_COUNTER: {key} bo'sh qoldi, o'tkazib yuborildi")
+            ready.append(key)
+        if not ready:
+            return 0
+        book_ids = {found[key] for key in ready if key in found}
+
+        # Hisoblagichdan olingan qismni ayirish - flush paytidagi yangi ko'rishlar saqlanib qoladi
+        deltas = {}
+        for book_id, value in pending_views(book_ids).items():
+            remaining = cache.decr(PENDING_KEY.format(book_id), value)
+            deltas[book_id] = value
+            if remaining > 0:
+                # decr dan oldin kelgan ko'rish jurnalga tushmagan bo'lishi mumkin
+                _journal(book_id)
+
+        items = list(deltas.items())
+        try:
+            for i in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[i:i + FLUSH_BATCH_SIZE]
+                Book.objects.filter(pk__in=[book_id for book_id, _ in batch]).update(
+                    views_count=F('views_count') + Case(
+                        *[When(pk=book_id, then=delta) for book_id, delta in batch],
+                        default=0, output_field=IntegerField(),
+                    )
+                )
+        except Exception:
+            # Yozilmagan ko'rishlarni keshga qaytarish
+            for book_id, delta in items:
+                if _incr_counter(PENDING_KEY.format(book_id), None) == 1:
+                    _journal(book_id)
+                if delta > 1:
+                    cache.incr(PENDING_KEY.format(book_id), delta - 1)
+            raise
+
+        cache.set(JOURNAL_FLUSHED_KEY, start + len(ready), None)
+        cache.delete_many(ready)
+        if items:
+            logger.info(f"VIEW_COUNTER: {len(items)} ta kitob, {sum(deltas.values())} ta ko'rish yozildi")
+        return len(items)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
@@ -12,6 +12,11 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 import os
 
+from .utils import rate_limit
+
+# AI endpointlari uchun cheklov: 10 soniyada 5 ta (burst), daqiqada 20 ta (sustained)
+AI_RATE_LIMITS = [(5, 10), (20, 60)]
+
 # Groq AI sozlash (xavfsiz import)
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY', '')
 groq_client = None
@@ -24,6 +29,7 @@ except Exception:
     groq_client = None
 
 @csrf_exempt
+@rate_limit('ai_search_books', limits=AI_RATE_LIMITS)
 def ai_search_books(request):
     """Kitoblar ichidan AI bilan aqlli qidiruv"""
     from .models import Book, Author, BookPage
@@ -36,6 +42,17 @@ def ai_search_books(request):
         data = json.loads(request.body)
         original_query = data.get('query', '').strip()
         author_id = data.get('author_id')
+        cursor = data.get('cursor')
+        
+        # Keyingi sahifa ("ko'proq yuklash") - so'rov tahlili va AI javobisiz, keshdan
+        if cursor:
+            from django.core import signing
+            from .search_results import read_cursor
+            try:
+                search_terms, author_id, offset, original_query = read_cursor(cursor)
+            except (signing.BadSignature, KeyError, TypeError, ValueError):
+                return JsonResponse({'error': 'Noto\'g\'ri cursor'}, status=400)
+            return _search_results_response(original_query, search_terms, author_id, offset)
         
         if not original_query:
             return JsonResponse({'error': 'Qidiruv so\'rovi bo\'sh'}, status=400)
@@ -52,11 +69,21 @@ def ai_search_books(request):
                 'message': 'Kitoblar topilmadi'
             })
         
-        # 1-BOSQICH: AI so'rovni tahlil qilsin
-        search_terms = [original_query.lower()]  # Asosiy so'rov
-        ai_analysis = None
-        
-        if groq_client:
+        # 1-BOSQICH: So'rovni oflayn tahlil qilish - imlo tuzatish, kalit so'zlar, sinonimlar
+        from .query_analysis import analyze_query
+        from .uzbek_text import words
+        
+        # Asosiy so'rov kanonik shaklda (lotin, apostroflar birxil) - indeks ham shu shaklda
+        search_terms = [' '.join(words(original_query)) or original_query.lower()]
+        ai_analysis = analyze_query(original_query)
+        if ai_analysis['corrected'] and ai_analysis['corrected'] not in search_terms:
+            search_terms.insert(0, ai_analysis['corrected'])
+        for kw in ai_analysis['keywords'] + ai_analysis['synonyms']:
+            if kw not in search_terms:
+                search_terms.append(kw)
+        
+        # Ixtiyoriy: LLM bilan boyitish (AI_SEARCH_LLM_ANALYSIS=True bo'lsa) - qidiruv unga bog'liq emas
+        if groq_client and getattr(settings, 'AI_SEARCH_LLM_ANALYSIS', False):
             try:
                 analysis_prompt = f"""Foydalanuvchi qidiruv so'rovi: "{original_query}"
 
@@ -76,74 +103,29 @@ MUHIM: Faqat JSON formatda javob ber, boshqa hech narsa yozma:
                     ],
                     model="llama-3.1-8b-instant",
                     temperature=0.1,
-                    max_tokens=200
+                    max_tokens=200,
+                    timeout=getattr(settings, 'AI_SEARCH_LLM_TIMEOUT', 2),
                 )
                 
                 ai_result = analysis_completion.choices[0].message.content.strip()
-                # JSON ni parse qilish
                 import re
                 json_match = re.search(r'\{[^{}]*\}', ai_result)
                 if json_match:
-                    ai_analysis = json.loads(json_match.group())
-                    # Tuzatilgan so'rovni qo'shish
-                    if ai_analysis.get('corrected'):
-                        corrected = ai_analysis['corrected'].lower()
-                        if corrected != original_query.lower() and corrected not in search_terms:
-                            search_terms.insert(0, corrected)
-                    # Kalit so'zlarni qo'shish
-                    if ai_analysis.get('keywords'):
-                        for kw in ai_analysis['keywords']:
-                            kw_lower = kw.lower().strip()
-                            if kw_lower and kw_lower not in search_terms and len(kw_lower) > 2:
-                                search_terms.append(kw_lower)
+                    llm_analysis = json.loads(json_match.group())
+                    # LLM kalit so'zlari oflayn natijalardan keyin qo'shiladi
+                    for kw in llm_analysis.get('keywords') or []:
+                        kw_lower = str(kw).lower().strip()
+                        if kw_lower and kw_lower not in search_terms and len(kw_lower) > 2:
+                            search_terms.append(kw_lower)
+                    if llm_analysis.get('is_question'):
+                        ai_analysis['is_question'] = True
             except Exception as e:
                 pass
         
-        # 2-BOSQICH: Barcha kalit so'zlar bo'yicha qidirish
-        all_found_snippets = []
-        found_positions = set()  # Takrorlanishni oldini olish
-        relevant_texts = []
-        
-        for search_term in search_terms[:5]:  # Maksimum 5 ta term
-            for book in books:
-                pages = book.pages.all()
-                for page in pages:
-                    text_lower = (page.text or '').lower()
-                    start_pos = 0
-                    while True:
-                        idx = text_lower.find(search_term, start_pos)
-                        if idx == -1:
-                            break
-                        
-                        # Takrorlanishni tekshirish
-                        position_key = f"{book.id}-{page.page_number}-{idx}"
-                        if position_key in found_positions:
-                            start_pos = idx + 1
-                            continue
-                        found_positions.add(position_key)
-                        
-                        snippet_start = max(0, idx - 150)
-                        snippet_end = min(len(page.text), idx + len(search_term) + 150)
-                        snippet = page.text[snippet_start:snippet_end]
-                        highlight_start = idx - snippet_start
-                        highlight_end = highlight_start + len(search_term)
-                        highlighted_snippet = (
-                            snippet[:highlight_start] +
-                            f'<mark>{snippet[highlight_start:highlight_end]}</mark>' +
-                            snippet[highlight_end:]
-                        )
-                        all_found_snippets.append({
-                            'book_id': book.id,
-                            'book_title': book.title,
-                            'author_name': book.author.name,
-                            'snippet': f"...{highlighted_snippet}...",
-                            'page_number': page.page_number,
-                            'position': idx,
-                            'search_term': search_term
-                        })
-                        if len(relevant_texts) < 5:
-                            relevant_texts.append(f"[{book.title}, {page.page_number}-sahifa]: {snippet}")
-                        start_pos = idx + 1
+        # 2-BOSQICH: Kalit so'zlar bo'yicha indeksdan qidirish - faqat birinchi sahifa (dangasa, keshlanadi)
+        search_terms = search_terms[:8]  # Maksimum 8 ta term
+        page = _search_results_page(search_terms, author_id, 0)
+        relevant_texts = page['relevant_texts']
         
         # 3-BOSQICH: Agar savol bo'lsa, AI javob bersin
         ai_response = None
@@ -172,32 +154,88 @@ Vazifa: Shu ma'lumotlar asosida savolga qisqa javob ber (2-3 gap). O'zbek tilida
             except:
                 pass
         
-        # Natijalarni tartiblash
-        all_found_snippets.sort(key=lambda x: (x['book_title'], x['page_number'], x['position']))
-        total_occurrences = len(all_found_snippets)
-        unique_books = len(set(s['book_id'] for s in all_found_snippets))
-        
         # Qidirilgan so'zlar haqida ma'lumot
         search_info = None
-        if ai_analysis and ai_analysis.get('corrected') and ai_analysis['corrected'].lower() != original_query.lower():
+        if ai_analysis['corrections']:
             search_info = f"Tuzatildi: \"{ai_analysis['corrected']}\""
         if len(search_terms) > 1:
             search_info = (search_info + " | " if search_info else "") + f"Qidirildi: {', '.join(search_terms[:3])}"
         
-        return JsonResponse({
-            'success': True,
-            'results': all_found_snippets[:20],
+        return _search_results_response(original_query, search_terms, author_id, 0, page=page, extra={
             'ai_response': ai_response,
             'search_info': search_info,
-            'message': f"'{original_query}' bo'yicha {total_occurrences} ta natija topildi ({unique_books} ta kitobda)" if total_occurrences > 0 else f"'{original_query}' kitoblardan topilmadi",
-            'total_occurrences': total_occurrences,
-            'unique_books': unique_books
         })
             
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Noto\'g\'ri JSON format'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+
+
+def _search_results_page(search_terms, author_id, offset):
+    """ai_search_books natijalari sahifasi: snippetlar bilan (faqat shu sahifa sahifalari o'qiladi)"""
+    from .models import Book
+    from .search_index import load_page_texts, build_snippet
+    from .search_results import get_page
+    
+    page = get_page(search_terms, author_id=author_id, offset=offset)
+    occurrences = page['results']
+    book_info = {
+        b['id']: b for b in Book.objects.filter(
+            id__in={occ['book_id'] for occ in occurrences}
+        ).values('id', 'title', 'author__name')
+    }
+    page_texts = load_page_texts((occ['book_id'], occ['page_number']) for occ in occurrences)
+    
+    snippets = []
+    relevant_texts = []
+    for occ in occurrences:
+        info = book_info.get(occ['book_id'])
+        if info is None:
+            continue
+        text = page_texts.get((occ['book_id'], occ['page_number']), '')
+        snippet, highlighted_snippet = build_snippet(text, occ['position'], occ['length'])
+        snippets.append({
+            'book_id': occ['book_id'],
+            'book_title': info['title'],
+            'author_name': info['author__name'],
+            'snippet': f"...{highlighted_snippet}...",
+            'page_number': occ['page_number'],
+            'position': occ['position'],
+            'search_term': occ['search_term']
+        })
+        if len(relevant_texts) < 5:
+            relevant_texts.append(f"[{info['title']}, {occ['page_number']}-sahifa]: {snippet}")
+    
+    page['snippets'] = snippets
+    page['relevant_texts'] = relevant_texts
+    return page
+
+
+def _search_results_response(original_query, search_terms, author_id, offset, page=None, extra=None):
+    """ai_search_books javobi; keyingi sahifa bo'lsa next_cursor bilan"""
+    from .search_results import make_cursor
+    
+    if page is None:
+        page = _search_results_page(search_terms, author_id, offset)
+    next_offset = offset + len(page['results'])
+    total = page['total']
+    plus = '' if page['complete'] else '+'
+    
+    response = {
+        'success': True,
+        'results': page['snippets'],
+        'ai_response': None,
+        'search_info': None,
+        'message': f"'{original_query}' bo'yicha {total}{plus} ta natija topildi ({page['unique_books']}{plus} ta kitobda)" if total > 0 else f"'{original_query}' kitoblardan topilmadi",
+        'total_occurrences': total,
+        'total_is_exact': page['complete'],
+        'unique_books': page['unique_books'],
+        'has_more': page['has_more'],
+        'next_cursor': make_cursor(search_terms, author_id, next_offset, original_query) if page['has_more'] else None,
+    }
+    response.update(extra or {})
+    return JsonResponse(response)
 import os
 import sys
 import tempfile
@@ -229,7 +267,8 @@ try:
     from libreoffice_converter import (
         convert_to_pdf_with_libreoffice,
         convert_libreoffice_format,
-        is_libreoffice_available
+        is_libreoffice_available,
+        run_libreoffice_conversion
     )
 except ImportError as e:
     print(f"LibreOffice converter import xatosi: {e}")
@@ -237,6 +276,7 @@ except ImportError as e:
     convert_to_pdf_with_libreoffice = None
     convert_libreoffice_format = None
     is_libreoffice_available = lambda: False
+    run_libreoffice_conversion = None
 
 # Universal PDF converter (zaxira usul)
 try:
@@ -253,62 +293,20 @@ except Exception as e:
 
 # PDF o'qish uchun advanced function
 def extract_pdf_text_advanced(filepath):
-    """PDF matnini turli usullar bilan o'qish (fitz, pdfplumber, PyPDF2, OCR)"""
-    text = ""
-    
-    # 1-usul: PyMuPDF (fitz) - eng tez
-    try:
-        import fitz
-        doc = fitz.open(filepath)
-        text = "\n".join([page.get_text() for page in doc])
-        doc.close()
-        if text and len(text.strip()) >= 50:
-            return text.strip()
-    except Exception as e:
-        print(f"PyMuPDF xatosi: {e}")
-    
-    # 2-usul: pdfplumber - ko'proq matn topadi
-    try:
-        import pdfplumber
-        with pdfplumber.open(filepath) as pdf:
-            text = "\n".join([page.extract_text() or "" for page in pdf.pages])
-        if text and len(text.strip()) >= 50:
-            return text.strip()
-    except Exception as e:
-        print(f"pdfplumber xatosi: {e}")
-    
-    # 3-usul: PyPDF2 - boshqa format
-    try:
-        from pypdf import PdfReader
-        reader = PdfReader(filepath)
-        text = "\n".join([page.extract_text() for page in reader.pages])
-        if text and len(text.strip()) >= 50:
-            return text.strip()
-    except Exception as e:
-        print(f"PyPDF2 xatosi: {e}")
+    """PDF matnini o'qish (text_extraction xizmati: fitz/pdfplumber + sahifa OCR, zaxira - pypdf)"""
+    from .pdf_ocr import ocr_available
+    from .text_extraction import extract_text
     
-    # 4-usul: OCR (rasm matnlarni o'qish)
     try:
-        import pytesseract
-        from pdf2image import convert_from_path
-        from PIL import Image
-        
-        # PDF'ni rasmlarga aylantirish
-        pages = convert_from_path(filepath, dpi=200, first_page=1, last_page=5)
-        ocr_text = ""
-        
-        for i, page in enumerate(pages):
-            page_text = pytesseract.image_to_string(page, lang='eng+uzb+rus')
-            ocr_text += f"\n--- Sahifa {i+1} ---\n{page_text}\n"
-        
-        if ocr_text and len(ocr_text.strip()) >= 20:
-            return ocr_text.strip()
-            
-    except ImportError:
-        return "OCR kutubxonalari o'rnatilmagan (pytesseract, pdf2image kerak)"
+        text = extract_text(filepath, '.pdf')
     except Exception as e:
-        return f"OCR xatosi: {str(e)}"
+        print(f"PDF o'qish xatosi: {e}")
+        text = ""
     
+    if text and len(text.strip()) >= 20:
+        return text.strip()
+    if not ocr_available():
+        return "OCR kutubxonalari o'rnatilmagan (pytesseract, PyMuPDF yoki pdf2image kerak)"
     return 'PDF faylidan matn oqib bolmadi. Fayl shikastlangan yoki matn yoq bolishi mumkin.'
 
 
@@ -631,6 +629,19 @@ def convert_to_format(request):
             if output_format == 'pdf':
                 output_path = OUTPUT_DIR / f"{input_path.stem}.pdf"
                 
+                # Konvertatsiya keshi - bir xil fayl qayta konvertatsiya qilinmaydi
+                import shutil
+                from .conversion_cache import get_conversion_cache, file_sha256
+                conversion_cache = get_conversion_cache()
+                digest = file_sha256(input_path)
+                # Konverter kalitda - convert_file (LibreOffice) natijasi bilan aralashmasin
+                cache_format = f"reportlab:{ext.lstrip('.')}>pdf"
+                cached = conversion_cache.open(digest, cache_format)
+                if cached:
+                    with cached[0] as src, open(output_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    return JsonResponse({'success': True, 'output_file': str(output_path), 'cached': True})
+                
                 # Python kutubxonalari orqali konvertatsiya (LibreOffice o'rniga)
                 if ext == '.docx':
                     try:
@@ -659,6 +670,7 @@ def convert_to_format(request):
                         
                         c.save()
                         result = str(output_path)
+                        conversion_cache.put(digest, cache_format, {'content_type': 'application/pdf'}, source_path=output_path)
                         print(f"✓ DOCX dan PDF yaratildi: {result}")
                     except Exception as e:
                         result = f"DOCX konvertatsiya xatosi: {str(e)}"
@@ -678,16 +690,10 @@ def convert_to_format(request):
 
 
 def adabiyotlar(request):
-    from .models import Author
-    from django.core.cache import cache
+    from .author_catalog import get_catalog
     
-    # Cache'dan olish - 15 daqiqa
-    cache_key = 'authors_list'
-    authors = cache.get(cache_key)
-    
-    if authors is None:
-        authors = Author.objects.prefetch_related('books').all()
-        cache.set(cache_key, authors, 60 * 15)  # 15 daqiqa cache
+    # Tayyor snapshot (adib, kitoblar soni, birinchi kitoblari) - sahifa ORM so'rovlarisiz chiziladi
+    authors = get_catalog()
     
     return render(request, 'blog/adabiyotlar.html', {'authors': authors})
 
@@ -695,20 +701,12 @@ def all_books(request):
     """Barcha kitoblarni ko'rsatish - tab tizimi bilan birlashtirilgan"""
     from .models import Book, Category, Author, Favorite, SearchQuery
     from .food_data import get_default_food, search_food
-    from django.db.models import Avg
-    from django.core.paginator import Paginator
-    from django.core.cache import cache
-    
-    # Categories va authors cache'dan olish
-    categories = cache.get('categories_list')
-    if categories is None:
-        categories = Category.objects.all()
-        cache.set('categories_list', categories, 60 * 30)  # 30 daqiqa
+    from .catalog_pagination import cursor_for_page, get_page
+    from .tagged_cache import get_or_set, tag
     
-    authors = cache.get('authors_list_simple')
-    if authors is None:
-        authors = Author.objects.only('id', 'name').all()
-        cache.set('authors_list_simple', authors, 60 * 30)
+    # Categories va authors cache'dan olish (signal orqali eskiradi)
+    categories = get_or_set('categories_list', lambda: list(Category.objects.all()), tags=[tag(Category)])
+    authors = get_or_set('authors_list_simple', lambda: list(Author.objects.only('id', 'name').all()), tags=[tag(Author)])
     
     # Tab tizimi
     current_tab = request.GET.get('tab', 'all')
@@ -722,22 +720,20 @@ def all_books(request):
     
     if current_tab == 'top':
         # Eng ko'p ko'rilgan va yuqori baholangan
-        books = Book.objects.annotate(
-            avg_rating=Avg('ratings__rating')
-        ).order_by('-views_count', '-avg_rating')
+        books = Book.objects.order_by('-views_count', '-rating_avg', '-id')
     elif current_tab == 'new':
         # Yangi qo'shilgan kitoblar
-        books = Book.objects.order_by('-created_at')
+        books = Book.objects.order_by('-created_at', '-id')
     elif current_tab == 'favorites':
         # Foydalanuvchi sevimlilari
         if request.user.is_authenticated:
             favorite_ids = Favorite.objects.filter(user=request.user).values_list('book_id', flat=True)
-            books = Book.objects.filter(id__in=favorite_ids)
+            books = Book.objects.filter(id__in=favorite_ids).order_by('-created_at', '-id')
         else:
             books = Book.objects.none()
     else:
         # Barcha kitoblar
-        books = Book.objects.all().order_by('-created_at')
+        books = Book.objects.all().order_by('-created_at', '-id')
     
     # OPTIMIZATION: select_related va prefetch_related
     books = books.select_related('author').prefetch_related('categories')
@@ -752,18 +748,26 @@ def all_books(request):
     if author_id:
         books = books.filter(author_id=author_id)
     
-    # Search
+    # Search - trigram o'xshashligi bo'yicha (xato va kirill/lotin farqiga chidamli)
     search = request.GET.get('q')
     if search:
-        books = books.filter(
-            models.Q(title__icontains=search) | 
-            models.Q(author__name__icontains=search)
-        )
+        from .catalog_search import search_books
+        books = search_books(books, search)
+    
+    # Baho bo'yicha saralash (Book.rating_avg - indekslangan ustun)
+    if request.GET.get('sort') == 'rating':
+        books = books.order_by('-rating_avg', '-rating_count', '-id')
     
-    # PAGINATION - Har sahifada 24 ta kitob
-    paginator = Paginator(books, 24)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Eski ?page=N havolasi - mos kursorga yo'naltirish (boshqa parametrlar saqlanadi)
+    if 'page' in request.GET and not request.GET.get('cursor'):
+        params = request.GET.copy()
+        cursor = cursor_for_page(books, params.pop('page')[-1], 24)
+        if cursor:
+            params['cursor'] = cursor
+        return redirect(f"{request.path}?{params.urlencode()}" if params else request.path)
+    
+    # PAGINATION - keyset (kursor), har sahifada 24 ta kitob; COUNT/OFFSET yo'q
+    page_obj = get_page(books, request.GET.get('cursor'), 24)
     
     # Top searches for top tab
     top_searches = []
@@ -773,6 +777,9 @@ def all_books(request):
     return render(request, 'blog/all_books.html', {
         'page_obj': page_obj,  # Pagination object
         'books': page_obj,  # Backward compatibility
+        'next_cursor': page_obj.next_cursor,
+        'previous_cursor': page_obj.previous_cursor,
+        'total_count': page_obj.count,  # taxminiy
         'categories': categories,
         'authors': authors,
         'current_category': category_slug,
@@ -801,34 +808,9 @@ def favorites_list(request):
     from django.shortcuts import redirect
     return redirect('/kitoblar/?tab=favorites')
 
-def extract_text_content(input_path):
-    """Fayldan matn chiqarib olish"""
-    input_path = Path(input_path)
-    ext = input_path.suffix.lower()
-    text_content = None
-    
-    try:
-        import textract
-        text_content = textract.process(str(input_path)).decode('utf-8')
-    except:
-        if ext in ['.txt', '.html', '.htm', '.css', '.js', '.py', '.json', '.xml', '.md']:
-            with open(input_path, 'r', encoding='utf-8', errors='ignore') as f:
-                text_content = f.read()
-        elif ext in ['.docx']:
-            try:
-                doc = docx.Document(str(input_path))
-                text_content = '\n'.join([para.text for para in doc.paragraphs])
-            except:
-                pass
-        elif ext in ['.xlsx', '.xls']:
-            try:
-                import pandas as pd
-                df = pd.read_excel(str(input_path))
-                text_content = df.to_string()
-            except:
-                pass
-    
-    return text_content
+
+# get_file_stats: ko'rish uchun yuboriladigan matn chegarasi (belgi)
+FILE_VIEW_MAX_CHARS = 1024 * 1024
 
 
 def convert_to_html_for_view(input_path):
@@ -839,8 +821,9 @@ def convert_to_html_for_view(input_path):
     # Agar oddiy matnli fayl bo'lsa
     if ext in ['.txt', '.css', '.js', '.py', '.json', '.xml', '.md']:
         try:
+            # Katta fayl to'liq o'qilmaydi - ko'rish uchun boshi yetarli (get_file_stats)
             with open(input_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+                content = f.read(FILE_VIEW_MAX_CHARS)
             # HTML ga o'tkazish (kodlarni ko'rsatish uchun)
             import html as html_module
             escaped = html_module.escape(content)
@@ -856,10 +839,8 @@ def convert_to_html_for_view(input_path):
         except:
             return None, None
     
-    # LibreOffice orqali HTML ga aylantirish
-    libreoffice_path = r"C:\Program Files\LibreOffice\program\soffice.exe"
-    
-    if not os.path.exists(libreoffice_path):
+    # LibreOffice hovuzi orqali HTML ga aylantirish
+    if not is_libreoffice_available():
         return None, None
     
     if ext not in ['.docx', '.doc', '.xlsx', '.xls', '.pptx', '.ppt', '.odt', '.ods', '.odp', '.rtf']:
@@ -867,7 +848,6 @@ def convert_to_html_for_view(input_path):
     
     try:
         import tempfile
-        import subprocess
         import shutil
         
         # Vaqtinchalik papka yaratish
@@ -877,22 +857,10 @@ def convert_to_html_for_view(input_path):
         temp_input = os.path.join(temp_dir, input_path.name)
         shutil.copy2(str(input_path), temp_input)
         
-        # LibreOffice orqali HTML ga aylantirish
-        cmd = [
-            libreoffice_path,
-            '--headless',
-            '--convert-to', 'html',
-            '--outdir', temp_dir,
-            temp_input
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        
         # HTML faylni topish
-        html_filename = input_path.stem + '.html'
-        html_path = os.path.join(temp_dir, html_filename)
+        html_path = run_libreoffice_conversion(temp_input, 'html', temp_dir, timeout=60)
         
-        if os.path.exists(html_path):
+        if html_path:
             with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
                 html_content = f.read()
             
@@ -927,65 +895,58 @@ def get_file_stats(request):
             if not filepath or not os.path.exists(filepath):
                 return JsonResponse({'success': False, 'error': 'Fayl topilmadi'})
             
-            # Fayl matnini olish (statistika uchun)
-            text_content = extract_text_content(Path(filepath))
-            
-            if not text_content:
-                text_content = ''
-            
-            # LibreOffice orqali HTML ko'rinishini olish
-            html_content, content_type = convert_to_html_for_view(Path(filepath))
+            # Statistika - bir o'tishda, bo'laklab; fayl xeshi bo'yicha keshlanadi (text_stats).
+            # Butun matn xotiraga olinmaydi: ko'rish uchun faqat boshi, qidiruv - bo'laklab
+            from .text_extraction import iter_text
+            from .text_stats import file_text_stats, find_in_chunks, text_stats
             
-            # Statistika hisoblash
-            import re
-            
-            # So'zlar soni
-            words = re.findall(r'\b\w+\b', text_content)
-            word_count = len(words)
-            
-            # Gaplar soni (. ! ? bilan tugaydigan)
-            sentences = re.split(r'[.!?]+', text_content)
-            sentence_count = len([s for s in sentences if s.strip()])
-            
-            # Paragraflar soni
-            paragraphs = [p for p in text_content.split('\n\n') if p.strip()]
-            paragraph_count = len(paragraphs)
+            stats = None
+            try:
+                stats = file_text_stats(filepath)
+            except Exception as e:
+                print(f"Statistika xatosi: {e}")
+            if stats is None:
+                stats = text_stats('')
             
-            # Belgilar soni
-            char_count = len(text_content)
-            char_count_no_spaces = len(text_content.replace(' ', '').replace('\n', ''))
+            def text_chunks():
+                try:
+                    return iter_text(filepath) or ()
+                except Exception as e:
+                    print(f"Matn chiqarish xatosi: {e}")
+                    return ()
             
             # Qidiruv
             search_results = []
+            text_content = ''
+            html_content = content_type = None
             if search_text:
-                pattern = re.compile(re.escape(search_text), re.IGNORECASE)
-                matches = list(pattern.finditer(text_content))
-                
-                for match in matches:
-                    start = max(0, match.start() - 50)
-                    end = min(len(text_content), match.end() + 50)
-                    context = text_content[start:end]
-                    
+                for position, found, context in find_in_chunks(text_chunks(), search_text):
                     # Topilgan so'zni ajratib ko'rsatish
-                    highlighted = context.replace(match.group(), f'<mark>{match.group()}</mark>')
-                    
                     search_results.append({
-                        'position': match.start(),
-                        'context': highlighted
+                        'position': position,
+                        'context': context.replace(found, f'<mark>{found}</mark>'),
                     })
+            else:
+                # Ko'rish uchun matn boshi (katta fayl brauzerga ham to'liq yuborilmaydi)
+                parts = []
+                size = 0
+                for chunk in text_chunks():
+                    parts.append(chunk[:FILE_VIEW_MAX_CHARS - size])
+                    size += len(parts[-1])
+                    if size >= FILE_VIEW_MAX_CHARS:
+                        break
+                text_content = ''.join(parts)
+                
+                # LibreOffice orqali HTML ko'rinishini olish
+                html_content, content_type = convert_to_html_for_view(Path(filepath))
             
             return JsonResponse({
                 'success': True,
                 'content': text_content,
+                'content_truncated': stats['char_count'] > len(text_content) and not search_text,
                 'html_content': html_content,
                 'content_type': content_type,
-                'stats': {
-                    'word_count': word_count,
-                    'sentence_count': sentence_count,
-                    'paragraph_count': paragraph_count,
-                    'char_count': char_count,
-                    'char_count_no_spaces': char_count_no_spaces
-                },
+                'stats': stats,
                 'search_results': search_results,
                 'search_count': len(search_results)
             })
@@ -1008,90 +969,157 @@ def download_file(request, filename):
     return HttpResponse("Fayl topilmadi", status=404)
 
 
+# Papkani PDF ga aylantirishda bir vaqtda ishlovchi konvertatsiyalar soni
+# (LibreOffice konvertatsiyalari baribir LIBREOFFICE_POOL_SIZE bilan cheklanadi)
+FOLDER_CONVERT_WORKERS = int(os.environ.get('FOLDER_CONVERT_WORKERS', 4))
+FOLDER_LIBRE_EXTENSIONS = ['.docx', '.doc', '.xlsx', '.xls', '.pptx', '.ppt', '.odt', '.ods', '.odp', '.rtf', '.txt', '.html', '.htm']
+
+
+def _convert_folder_file(input_path, work_dir, libre_available):
+    """
+    Papkadagi bitta faylni PDF ga aylantirish (parallel ishlaydi - har fayl o'z papkasida)
+    :return: PDF fayl yo'li; konvertatsiya bo'lmasa Exception
+    """
+    ext = input_path.suffix.lower()
+    work_dir.mkdir(parents=True, exist_ok=True)
+    pdf_output = work_dir / f"{input_path.stem}.pdf"
+    
+    # LibreOffice hovuzi orqali konvertatsiya
+    if libre_available and ext in FOLDER_LIBRE_EXTENSIONS:
+        result = run_libreoffice_conversion(input_path, 'pdf', work_dir, timeout=60)
+        if not result:
+            raise Exception("LibreOffice PDF yaratmadi")
+        return result
+    
+    if ext == '.pdf':
+        # Allaqachon PDF - nusxa olish
+        shutil.copy(str(input_path), str(pdf_output))
+        return pdf_output
+    
+    # Boshqa usullar bilan konvertatsiya
+    if convert_any_to_pdf is None:
+        raise Exception(f"Qo'llab-quvvatlanmaydigan format: {ext}")
+    result = convert_any_to_pdf(str(input_path), str(pdf_output))
+    if not result or not os.path.exists(result):
+        raise Exception("PDF yaratilmadi")
+    return Path(result)
+
+
+def _convert_folder_files(files_data, temp_pdf_dir, executor):
+    """
+    Fayllarni parallel konvertatsiya qilish
+    :return: generator - (fayl nomi, PDF yo'li yoki None, xato matni) tayyor bo'lish tartibida
+    """
+    from concurrent.futures import as_completed
+    
+    libre_available = is_libreoffice_available()
+    futures = {}
+    for index, file_info in enumerate(files_data):
+        filepath = file_info.get('path')
+        if not filepath or not os.path.exists(filepath):
+            yield (os.path.basename(filepath or ''), None, 'Fayl topilmadi')
+            continue
+        input_path = Path(filepath)
+        future = executor.submit(_convert_folder_file, input_path, temp_pdf_dir / str(index), libre_available)
+        futures[future] = input_path.name
+    
+    for future in as_completed(futures):
+        try:
+            yield (futures[future], future.result(), None)
+        except Exception as e:
+            print(f"Papka konvertatsiya xatolik ({futures[future]}): {e}")
+            yield (futures[future], None, str(e))
+
+
+def _stream_folder_pdf_zip(files_data, temp_pdf_dir):
+    """
+    Tayyor bo'lgan har bir PDF ni darhol ZIP oqimiga yozish,
+    oxirida manifest.json - har bir fayl natijasi (xatolar bilan)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .zipstream import ZipStream
+    
+    stream = ZipStream()
+    manifest = []
+    executor = ThreadPoolExecutor(max_workers=max(1, min(FOLDER_CONVERT_WORKERS, len(files_data))))
+    try:
+        for source_name, pdf_path, error in _convert_folder_files(files_data, temp_pdf_dir, executor):
+            if pdf_path is None:
+                manifest.append({'file': source_name, 'status': 'error', 'error': error})
+                continue
+            arcname = stream.unique_name(pdf_path.name)
+            yield from stream.add_file(arcname, pdf_path)
+            manifest.append({'file': source_name, 'status': 'success', 'pdf': arcname})
+            # Yozilgan PDF ni darhol o'chirish - disk ham tejaladi
+            os.remove(pdf_path)
+        
+        summary = {
+            'converted_count': sum(1 for item in manifest if item['status'] == 'success'),
+            'failed_count': sum(1 for item in manifest if item['status'] == 'error'),
+            'files': manifest,
+        }
+        yield from stream.add_bytes('manifest.json', json.dumps(summary, ensure_ascii=False, indent=2).encode('utf-8'))
+        yield from stream.close()
+    finally:
+        # Mijoz uzilsa navbatdagi konvertatsiyalar bekor qilinadi
+        executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(temp_pdf_dir, ignore_errors=True)
+
+
 @csrf_exempt
 def convert_folder_to_pdf_zip(request):
-    """Papka ichidagi barcha fayllarni PDF ga aylantirib, ZIP arxivga joylashtirish"""
+    """
+    Papka ichidagi barcha fayllarni PDF ga aylantirib, ZIP arxivga joylashtirish
+    Fayllar parallel konvertatsiya qilinadi. stream=true bo'lsa ZIP to'g'ridan-to'g'ri
+    oqim sifatida qaytariladi (har bir PDF tayyor bo'lishi bilan), oxirida manifest.json.
+    """
     if request.method == 'POST':
         try:
             data = json.loads(request.body) if request.content_type == 'application/json' else request.POST
             files_data = data.get('files', [])
             folder_name = data.get('folder_name', 'papka')
+            stream_response = str(data.get('stream', '')).lower() in ('1', 'true', 'yes')
             
             if not files_data:
                 return JsonResponse({'success': False, 'error': 'Fayllar topilmadi'})
             
             # PDF fayllarni saqlash uchun vaqtinchalik papka
-            import tempfile
-            import shutil
             temp_pdf_dir = Path(tempfile.mkdtemp())
+            zip_filename = f"{folder_name}_pdf.zip"
             
-            converted_pdfs = []
+            if stream_response:
+                from django.http import StreamingHttpResponse
+                response = StreamingHttpResponse(
+                    _stream_folder_pdf_zip(files_data, temp_pdf_dir),
+                    content_type='application/zip'
+                )
+                response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
+                return response
             
-            for file_info in files_data:
-                filepath = file_info.get('path')
-                if not filepath or not os.path.exists(filepath):
-                    continue
-                
-                input_path = Path(filepath)
-                ext = input_path.suffix.lower()
-                pdf_output = temp_pdf_dir / f"{input_path.stem}.pdf"
-                
-                # LibreOffice orqali konvertatsiya
-                libre_paths = [
-                    r"C:\Program Files\LibreOffice\program\soffice.exe",
-                    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
-                    r"C:\Program Files\LibreOffice\program\soffice.com",
-                    "/usr/bin/libreoffice",
-                    "/usr/bin/soffice"
-                ]
-                
-                libre_path = None
-                for path in libre_paths:
-                    if os.path.exists(path):
-                        libre_path = path
-                        break
-                
-                if libre_path and ext in ['.docx', '.doc', '.xlsx', '.xls', '.pptx', '.ppt', '.odt', '.ods', '.odp', '.rtf', '.txt', '.html', '.htm']:
-                    try:
-                        import subprocess
-                        result_process = subprocess.run([
-                            libre_path,
-                            '--headless',
-                            '--convert-to', 'pdf',
-                            '--outdir', str(temp_pdf_dir),
-                            str(input_path)
-                        ], capture_output=True, timeout=60)
-                        
-                        if pdf_output.exists():
-                            converted_pdfs.append(pdf_output)
-                    except Exception as e:
-                        print(f"LibreOffice xatolik: {e}")
-                
-                elif ext == '.pdf':
-                    # Allaqachon PDF - nusxa olish
-                    shutil.copy(str(input_path), str(pdf_output))
-                    converted_pdfs.append(pdf_output)
-                
-                else:
-                    # Boshqa usullar bilan konvertatsiya
-                    try:
-                        result = convert_any_to_pdf(str(input_path), str(pdf_output))
-                        if result and os.path.exists(result):
-                            converted_pdfs.append(Path(result))
-                    except:
-                        pass
+            from concurrent.futures import ThreadPoolExecutor
+            converted_pdfs = []
+            with ThreadPoolExecutor(max_workers=max(1, min(FOLDER_CONVERT_WORKERS, len(files_data)))) as executor:
+                for source_name, pdf_path, error in _convert_folder_files(files_data, temp_pdf_dir, executor):
+                    if pdf_path is not None:
+                        converted_pdfs.append(pdf_path)
             
             if not converted_pdfs:
                 shutil.rmtree(temp_pdf_dir, ignore_errors=True)
                 return JsonResponse({'success': False, 'error': 'Hech bir fayl konvertatsiya qilinmadi'})
             
             # ZIP arxiv yaratish
-            zip_filename = f"{folder_name}_pdf.zip"
             zip_path = OUTPUT_DIR / zip_filename
             
+            names = set()
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for pdf_file in converted_pdfs:
-                    zipf.write(pdf_file, pdf_file.name)
+                    arcname = pdf_file.name
+                    counter = 2
+                    while arcname in names:
+                        arcname = f"{pdf_file.stem} ({counter}).pdf"
+                        counter += 1
+                    names.add(arcname)
+                    zipf.write(pdf_file, arcname)
             
             # Vaqtinchalik papkani o'chirish
             shutil.rmtree(temp_pdf_dir, ignore_errors=True)
@@ -1162,14 +1190,19 @@ def yuklangan_fayllar(request):
             selected_files = request.POST.getlist('selected_files')
             user_files = File.objects.filter(user=request.user, file__in=selected_files)
             if user_files:
-                buffer = BytesIO()
-                with zipfile.ZipFile(buffer, 'w') as zip_file:
-                    for file_obj in user_files:
-                        file_path = file_obj.file.path
+                # ZIP oqim sifatida - fayllar xotiraga yig'ilmaydi
+                from django.http import StreamingHttpResponse
+                from .zipstream import ZipStream
+                
+                def generate_zip(paths):
+                    stream = ZipStream()
+                    for file_path, arcname in paths:
                         if os.path.exists(file_path):
-                            zip_file.write(file_path, file_obj.file.name)
-                buffer.seek(0)
-                response = HttpResponse(buffer.getvalue(), content_type='application/zip')
+                            yield from stream.add_file(stream.unique_name(arcname), file_path)
+                    yield from stream.close()
+                
+                paths = [(file_obj.file.path, file_obj.file.name) for file_obj in user_files]
+                response = StreamingHttpResponse(generate_zip(paths), content_type='application/zip')
                 response['Content-Disposition'] = 'attachment; filename="selected_files.zip"'
                 return response
     image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heic', '.svg', '.raw']
@@ -1177,6 +1210,38 @@ def yuklangan_fayllar(request):
     return render(request, "blog/malumot.html", {"files": files, "filename": "Yuklangan fayllar"})
 
 
+def _convert_image_file(image, to_format):
+    """
+    Bitta rasmni boshqa formatga aylantirish
+    :return: (yangi fayl nomi, BytesIO)
+    """
+    filename = image.image.name
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    img = PILImage.open(image.image.path)
+    buffer = BytesIO()
+    
+    if to_format == 'pdf':
+        # RGBA rasmlarni RGB ga o'tkazish (PDF uchun shart)
+        if img.mode in ('RGBA', 'P', 'LA'):
+            img = img.convert('RGB')
+        # Pillow bilan to'g'ridan-to'g'ri PDF ga saqlash
+        img.save(buffer, format='PDF', resolution=100.0)
+        new_ext = 'pdf'
+    elif to_format == 'jpeg':
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+        img.save(buffer, format='JPEG')
+        new_ext = 'jpg'
+    elif to_format in ['png', 'gif', 'bmp', 'tiff', 'webp']:
+        img.save(buffer, format=to_format.upper())
+        new_ext = to_format
+    else:
+        raise ValueError(f"Format qo'llab-quvvatlanmaydi: {to_format}")
+    
+    buffer.seek(0)
+    return f"{base_name}.{new_ext}", buffer
+
+
 @login_required
 def image_list(request):
     if request.method == 'POST':
@@ -1214,66 +1279,46 @@ def image_list(request):
             if not selected_ids:
                 messages.error(request, 'Iltimos, konvertatsiya qilish uchun rasm tanlang')
                 return redirect('image_list')
-            converted_files = []
-            for id in selected_ids:
-                try:
-                    image = Image.objects.get(id=id, user=request.user)
-                    filename = image.image.name
-                    ext = filename.split('.')[-1].lower()
-                    
-                    # Fayl yo'lini to'g'ri olish
-                    file_path = image.image.path
-                    
-                    if to_format == 'pdf':
-                        try:
-                            img = PILImage.open(file_path)
-                            # RGBA rasmlarni RGB ga o'tkazish (PDF uchun shart)
-                            if img.mode in ('RGBA', 'P', 'LA'):
-                                img = img.convert('RGB')
-                            
-                            # Pillow bilan to'g'ridan-to'g'ri PDF ga saqlash
-                            buffer = BytesIO()
-                            img.save(buffer, format='PDF', resolution=100.0)
-                            buffer.seek(0)
-                            converted_files.append((f"{os.path.splitext(os.path.basename(filename))[0]}.pdf", buffer.getvalue()))
-                        except Exception as e:
-                            messages.error(request, f'PDF yaratishda xatolik: {str(e)}')
-                            continue
-                    elif to_format in ['png', 'jpeg', 'gif', 'bmp', 'tiff', 'webp']:
+            images = list(Image.objects.filter(id__in=[i for i in selected_ids if i.isdigit()], user=request.user))
+            found_ids = {str(image.id) for image in images}
+            for missing_id in selected_ids:
+                if missing_id not in found_ids:
+                    messages.error(request, f'Rasm topilmadi: ID {missing_id}')
+            
+            if len(images) > 1:
+                # Ko'p rasm - ZIP oqim: rasmlar birma-bir konvertatsiya qilinib darhol yoziladi,
+                # xotirada bir vaqtda faqat bitta rasm turadi
+                from django.http import StreamingHttpResponse
+                from .zipstream import ZipStream
+                
+                def generate_zip():
+                    stream = ZipStream()
+                    errors = []
+                    for image in images:
                         try:
-                            img = PILImage.open(file_path)
-                            buffer = BytesIO()
-                            if to_format == 'jpeg':
-                                if img.mode in ("RGBA", "P"):
-                                    img = img.convert("RGB")
-                                img.save(buffer, format='JPEG')
-                                new_ext = 'jpg'
-                            elif to_format == 'png':
-                                img.save(buffer, format='PNG')
-                                new_ext = 'png'
-                            elif to_format == 'gif':
-                                img.save(buffer, format='GIF')
-                                new_ext = 'gif'
-                            elif to_format == 'bmp':
-                                img.save(buffer, format='BMP')
-                                new_ext = 'bmp'
-                            elif to_format == 'tiff':
-                                img.save(buffer, format='TIFF')
-                                new_ext = 'tiff'
-                            elif to_format == 'webp':
-                                img.save(buffer, format='WEBP')
-                                new_ext = 'webp'
-                            buffer.seek(0)
-                            converted_files.append((f"{os.path.splitext(os.path.basename(filename))[0]}.{new_ext}", buffer.getvalue()))
+                            name, buffer = _convert_image_file(image, to_format)
                         except Exception as e:
-                            messages.error(request, f'Konvertatsiya xatoligi: {str(e)}')
+                            errors.append(f"{os.path.basename(image.image.name)}: {e}")
                             continue
-                except Image.DoesNotExist:
-                    messages.error(request, f'Rasm topilmadi: ID {id}')
-                    continue
+                        yield from stream.add_fileobj(stream.unique_name(name), buffer)
+                    if errors:
+                        yield from stream.add_bytes('errors.txt', '\n'.join(errors).encode('utf-8'))
+                    yield from stream.close()
+                
+                response = StreamingHttpResponse(generate_zip(), content_type='application/zip')
+                response['Content-Disposition'] = 'attachment; filename="converted_images.zip"'
+                return response
+            
+            converted_files = []
+            for image in images:
+                try:
+                    name, buffer = _convert_image_file(image, to_format)
+                    converted_files.append((name, buffer.getvalue()))
                 except Exception as e:
-                    messages.error(request, f'Xatolik: {str(e)}')
-                    continue
+                    if to_format == 'pdf':
+                        messages.error(request, f'PDF yaratishda xatolik: {str(e)}')
+                    else:
+                        messages.error(request, f'Konvertatsiya xatoligi: {str(e)}')
             
             if len(converted_files) == 1:
                 name, data = converted_files[0]
@@ -1292,15 +1337,6 @@ def image_list(request):
                 response['Content-Disposition'] = f'attachment; filename="{ascii_name}"'
                 response['Content-Length'] = len(data)
                 return response
-            elif len(converted_files) > 1:
-                buffer = BytesIO()
-                with zipfile.ZipFile(buffer, 'w') as zf:
-                    for name, data in converted_files:
-                        zf.writestr(name, data)
-                buffer.seek(0)
-                response = HttpResponse(buffer.getvalue(), content_type='application/zip')
-                response['Content-Disposition'] = 'attachment; filename="converted_images.zip"'
-                return response
             else:
                 messages.error(request, 'Konvertatsiya qilish uchun rasm tanlanmadi yoki xatolik yuz berdi')
                 return redirect('image_list')
@@ -1310,31 +1346,98 @@ def image_list(request):
     return render(request, 'blog/image_list.html', {'images': images})
 
 
+def _download_name_template(disposition, filename):
+    """
+    Content-Disposition dagi yuklab olish nomini shablonga aylantirish -
+    keshdagi natija boshqa nomli (lekin bir xil) fayl uchun ham to'g'ri nom bilan berilishi uchun
+    """
+    import re
+    match = re.search(r'filename="([^"]*)"', disposition or '')
+    if not match:
+        return None
+    name = match.group(1)
+    stem = os.path.splitext(filename)[0]
+    for base_type, base in (('filename', filename), ('stem', stem)):
+        if base and name.startswith(base):
+            return {'base': base_type, 'suffix': name[len(base):]}
+    return {'base': None, 'name': name}
+
+
+def _download_name(template, filename):
+    if template['base'] == 'filename':
+        return filename + template['suffix']
+    if template['base'] == 'stem':
+        return os.path.splitext(filename)[0] + template['suffix']
+    return template['name']
+
+
 def convert_file(request, filename, to_format):
+    """
+    Faylni boshqa formatga aylantirish
+    Natija konvertatsiya keshida saqlanadi (conversion_cache.py) - bir xil fayl
+    bir xil formatga qayta so'ralsa, konvertatsiya qilinmay keshdan beriladi.
+    """
+    from .conversion_cache import get_conversion_cache, file_sha256
+
     fs = FileSystemStorage()
     file_path = fs.path(filename)
     if not os.path.exists(file_path):
         raise Http404("Fayl topilmadi")
 
+    # Natija kiruvchi kengaytmaga ham bog'liq (bir xil baytlar .txt va .doc bo'lishi mumkin);
+    # konverter ham kalitda - convert_to_format ning reportlab PDF i bu yerda berilmasin
+    ext = filename.split('.')[-1].lower()
+    cache_format = f"convert_file:{ext}>{to_format.lower()}"
+    conversion_cache = get_conversion_cache()
+    digest = file_sha256(file_path)
+
+    # Ochilgan holda olinadi - parallel evict faylni o'chirsa ham javob beriladi
+    cached = conversion_cache.open(digest, cache_format)
+    if cached:
+        data_file, meta = cached
+        response = FileResponse(data_file, content_type=meta['content_type'])
+        if meta.get('download_name'):
+            response['Content-Disposition'] = f'attachment; filename="{_download_name(meta["download_name"], filename)}"'
+        response['X-Conversion-Cache'] = 'HIT'
+        return response
+
+    response = _convert_file(request, filename, to_format)
+
+    # Faqat muvaffaqiyatli natijalar keshlanadi (xato matni yozilgan hujjat ham 200 bilan qaytadi)
+    if response.status_code == 200 and not response.streaming and not getattr(request, 'conversion_failed', False):
+        conversion_cache.put(digest, cache_format, {
+            'content_type': response['Content-Type'],
+            'download_name': _download_name_template(response.get('Content-Disposition'), filename),
+        }, data=response.content)
+        response['X-Conversion-Cache'] = 'MISS'
+    return response
+
+
+def _conversion_error(request, message):
+    """
+    Xato/qo'llab-quvvatlanmaydi matni hujjatga yoziladi va 200 bilan qaytadi -
+    vaqtinchalik xato keshda qolmasligi uchun so'rov belgilanadi (convert_file keshlamaydi)
+    """
+    request.conversion_failed = True
+    return message
+
+
+def _convert_file(request, filename, to_format):
+    """Haqiqiy konvertatsiya (keshsiz)"""
+    fs = FileSystemStorage()
+    file_path = fs.path(filename)
+
     ext = filename.split('.')[-1].lower()
 
     if to_format == 'txt':
         # Extract text and return as TXT
-        text = ""
+        from .text_extraction import extract_text
         try:
-            if ext == "txt":
-                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                    text = f.read()
-            elif ext in ["doc", "docx"]:
-                doc = docx.Document(file_path)
-                text = "\n".join([p.text for p in doc.paragraphs])
-            elif ext == "pdf":
-                reader = PdfReader(file_path)
-                text = "\n".join([page.extract_text() for page in reader.pages])
-            else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+            text = extract_text(file_path)
+            if text is None:
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
 
         response = HttpResponse(text, content_type='text/plain; charset=utf-8')
         response['Content-Disposition'] = f'attachment; filename="{filename}.txt"'
@@ -1385,9 +1488,9 @@ def convert_file(request, filename, to_format):
                     with open(file_path, "r", encoding="utf-8", errors="replace") as f:
                         text = f.read()
                 else:
-                    text = "Bu format qo'llab-quvvatlanmaydi."
+                    text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
             except Exception as e:
-                text = f"Xatolik: {str(e)}"
+                text = _conversion_error(request, f"Xatolik: {str(e)}")
 
             # Create PDF
             buffer = BytesIO()
@@ -1434,9 +1537,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         doc = docx.Document()
         for line in text.split('\n'):
             doc.add_paragraph(line)
@@ -1504,8 +1607,8 @@ def convert_file(request, filename, to_format):
                 raise Exception("CloudConvert konvertatsiya muvaffaqiyatsiz")
                 
             except Exception as e:
-                # Fallback - oddiy usul bilan
-                pass
+                # Fallback - oddiy usul bilan (sifati past - CloudConvert tiklanganda qayta urinish uchun keshlanmaydi)
+                _conversion_error(request, str(e))
         
         # Boshqa formatlar yoki fallback uchun eski usul
         text = ""
@@ -1520,9 +1623,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         doc = docx.Document()
         for line in text.split('\n'):
             doc.add_paragraph(line)
@@ -1546,9 +1649,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         rtf_content = "{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Times New Roman;}}\\f0\\fs24\n"
         for line in text.split('\n'):
             rtf_content += line.replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}') + "\\par\n"
@@ -1570,9 +1673,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         doc = OpenDocumentText()
         p = odf_text.P()
         teletype.addTextToElement(p, text)
@@ -1597,9 +1700,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         html_content = f"<html><head><title>{filename}</title></head><body><pre>{text}</pre></body></html>"
         response = HttpResponse(html_content, content_type='text/html')
         response['Content-Disposition'] = f'attachment; filename="{filename}.html"'
@@ -1618,9 +1721,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         xml_content = f"<root><text><![CDATA[{text}]]></text></root>"
         response = HttpResponse(xml_content, content_type='application/xml')
         response['Content-Disposition'] = f'attachment; filename="{filename}.xml"'
@@ -1639,9 +1742,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         book = epub.EpubBook()
         book.set_identifier(filename)
         book.set_title(filename)
@@ -1673,9 +1776,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         book = epub.EpubBook()
         book.set_identifier(filename)
         book.set_title(filename)
@@ -1707,9 +1810,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         wb = openpyxl.Workbook()
         ws = wb.active
         for i, line in enumerate(text.split('\n'), 1):
@@ -1734,9 +1837,9 @@ def convert_file(request, filename, to_format):
                 reader = PdfReader(file_path)
                 text = "\n".join([page.extract_text() for page in reader.pages])
             else:
-                text = "Bu format qo'llab-quvvatlanmaydi."
+                text = _conversion_error(request, "Bu format qo'llab-quvvatlanmaydi.")
         except Exception as e:
-            text = f"Xatolik: {str(e)}"
+            text = _conversion_error(request, f"Xatolik: {str(e)}")
         wb = xlwt.Workbook()
         ws = wb.add_sheet('Sheet1')
         for i, line in enumerate(text.split('\n')):
@@ -2155,66 +2258,14 @@ def get_file_content(request):
         filename = os.path.basename(file_obj.file.name)
         ext = filename.split('.')[-1].lower()
         
-        content = ""
-        
-        # Fayl turini aniqlash va kontentni o'qish
-        if ext == 'txt':
-            encodings = ['utf-8', 'cp1251', 'latin-1', 'utf-16']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except:
-                    continue
-        
-        elif ext in ['doc', 'docx']:
-            try:
-                doc = docx.Document(file_path)
-                content = '\n'.join([p.text for p in doc.paragraphs])
-            except Exception as e:
-                content = f"DOCX o'qishda xatolik: {str(e)}"
-        
-        elif ext == 'pdf':
-            try:
-                reader = PdfReader(file_path)
-                content = '\n'.join([page.extract_text() or '' for page in reader.pages])
-            except Exception as e:
-                content = f"PDF o'qishda xatolik: {str(e)}"
-        
-        elif ext in ['csv']:
-            import csv
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    rows = list(reader)
-                    content = '\n'.join([', '.join(row) for row in rows[:100]])  # Birinchi 100 qator
-            except:
-                content = "CSV o'qishda xatolik"
-        
-        elif ext in ['json']:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except:
-                content = "JSON o'qishda xatolik"
-        
-        elif ext in ['html', 'htm', 'xml']:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except:
-                content = "HTML/XML o'qishda xatolik"
-        
-        elif ext in ['py', 'js', 'css', 'java', 'cpp', 'c', 'h']:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except:
-                content = "Kod faylini o'qishda xatolik"
-        
-        else:
-            content = "Bu fayl turi qo'llab-quvvatlanmaydi"
+        # Fayl turiga mos handler (text_extraction) - natija fayl mazmuni bo'yicha keshlanadi
+        from .text_extraction import extract_text
+        try:
+            content = extract_text(file_path)
+            if content is None:
+                content = "Bu fayl turi qo'llab-quvvatlanmaydi"
+        except Exception as e:
+            content = f"{ext.upper()} o'qishda xatolik: {str(e)}"
         
         # Kontentni 10000 belgiga cheklash
         if len(content) > 10000:
@@ -2233,6 +2284,7 @@ def get_file_content(request):
 
 
 @csrf_exempt
+@rate_limit('ai_ask', limits=AI_RATE_LIMITS)
 def ai_ask(request):
     """AI ga savol berish"""
     if request.method != 'POST':
@@ -2419,10 +2471,11 @@ def kitob_yuklash(request):
             
             book.save()
             
-            # Sahifalarni ajratib saqlash
-            book.save_pages_from_file()
+            # Sahifalarni ajratish (matn chiqarish, OCR) - run_ingestion_worker da, so'rov ichida emas
+            from .ingestion import enqueue_book
+            enqueue_book(book, user=request.user if request.user.is_authenticated else None)
             
-            messages.success(request, f"'{title}' kitobi muvaffaqiyatli yuklandi!")
+            messages.success(request, f"'{title}' kitobi muvaffaqiyatli yuklandi! Sahifalari fonda tayyorlanmoqda.")
             return render(request, 'blog/kitob_yuklash.html', {
                 'authors': Author.objects.all(),
                 'success': True,
@@ -2497,11 +2550,17 @@ JSON formatda javob ber."""
 
 @csrf_exempt
 def upload_zip_books(request):
-    """ZIP papkadan kitoblarni avtomatik yuklash"""
-    from .models import Author, Book
+    """
+    ZIP papkadan kitoblarni avtomatik yuklash
+    Fayl navbatga qo'yiladi va darhol job_id qaytariladi - tahlil run_ingestion_worker da bajariladi.
+    Holat: /api/ingest-jobs/<job_id>/
+    """
+    from .ingestion import enqueue_zip
+    from django.urls import reverse
     import zipfile
-    import tempfile
-    import json
+    
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Tizimga kiring'}, status=401)
     
     if request.method != 'POST':
         return JsonResponse({'error': 'Faqat POST so\'rov qabul qilinadi'}, status=400)
@@ -2514,173 +2573,45 @@ def upload_zip_books(request):
     if not zip_file.name.lower().endswith('.zip'):
         return JsonResponse({'error': 'Faqat ZIP formatdagi fayllar qabul qilinadi'}, status=400)
     
-    results = []
-    allowed_extensions = ['.pdf', '.docx', '.doc', '.txt']
-    
     try:
-        # Vaqtinchalik papkaga saqlash
-        with tempfile.TemporaryDirectory() as temp_dir:
-            zip_path = os.path.join(temp_dir, 'uploaded.zip')
-            
-            with open(zip_path, 'wb') as f:
-                for chunk in zip_file.chunks():
-                    f.write(chunk)
-            
-            # ZIP ni ochish
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                file_list = zf.namelist()
-                
-                for file_name in file_list:
-                    # Papkalarni o'tkazib yuborish
-                    if file_name.endswith('/'):
-                        continue
-                    
-                    # Fayl kengaytmasini tekshirish
-                    ext = os.path.splitext(file_name)[1].lower()
-                    if ext not in allowed_extensions:
-                        results.append({
-                            'file': file_name,
-                            'status': 'skipped',
-                            'message': f'Qo\'llab-quvvatlanmaydigan format: {ext}'
-                        })
-                        continue
-                    
-                    try:
-                        # Faylni chiqarish
-                        zf.extract(file_name, temp_dir)
-                        extracted_path = os.path.join(temp_dir, file_name)
-                        
-                        # Fayl kontentini o'qish
-                        content = ""
-                        base_name = os.path.basename(file_name)
-                        title_from_file = os.path.splitext(base_name)[0]
-                        
-                        if ext == '.txt':
-                            try:
-                                with open(extracted_path, 'r', encoding='utf-8') as f:
-                                    content = f.read()
-                            except:
-                                with open(extracted_path, 'r', encoding='latin-1') as f:
-                                    content = f.read()
-                        
-                        elif ext == '.pdf':
-                            try:
-                                from pypdf import PdfReader
-                                reader = PdfReader(extracted_path)
-                                for page in reader.pages[:10]:  # Birinchi 10 sahifa
-                                    content += page.extract_text() or ""
-                            except:
-                                content = ""
-                        
-                        elif ext in ['.docx', '.doc']:
-                            try:
-                                from docx import Document
-                                doc = Document(extracted_path)
-                                for para in doc.paragraphs[:50]:  # Birinchi 50 paragraf
-                                    content += para.text + "\n"
-                            except:
-                                content = ""
-                        
-                        # AI bilan ma'lumotlarni aniqlash
-                        book_info = ai_extract_book_info(content, base_name)
-                        
-                        if book_info:
-                            author_name = book_info.get('author', '').strip()
-                            title = book_info.get('title', title_from_file)
-                            year = book_info.get('year')
-                            description = book_info.get('description', '')
-                        else:
-                            author_name = ''
-                            title = title_from_file
-                            year = None
-                            description = ''
-                        
-                        # Agar muallif nomi bo'sh yoki "noma'lum" bo'lsa
-                        if not author_name or author_name.lower() in ['noma\'lum', 'noma\'lum muallif', 'unknown', 'nomalum']:
-                            author_name = 'Noma\'lum muallif'
-                        
-                        # Agar tavsif bo'sh bo'lsa, birinchi 5 qatorni olish
-                        if not description and content:
-                            lines = content.strip().split('\n')[:5]
-                            description = '\n'.join(line.strip() for line in lines if line.strip())
-                            if len(description) > 500:
-                                description = description[:500] + '...'
-                        
-                        # Muallif topish yoki yaratish (iexact bilan - katta-kichik harf farq qilmaydi)
-                        author = Author.objects.filter(name__iexact=author_name).first()
-                        if not author:
-                            author = Author.objects.create(name=author_name)
-                        
-                        # Kitob mavjudligini tekshirish (nom va muallif bo'yicha)
-                        existing_book = Book.objects.filter(
-                            title__iexact=title,
-                            author=author
-                        ).first()
-                        
-                        if existing_book:
-                            results.append({
-                                'file': base_name,
-                                'status': 'exists',
-                                'message': f'Kitob bazada mavjud: "{title}" ({author_name})'
-                            })
-                            continue
-                        
-                        # Kitobni saqlash
-                        from django.core.files.base import ContentFile
-                        
-                        with open(extracted_path, 'rb') as f:
-                            file_content = f.read()
-                        
-                        book = Book(
-                            title=title,
-                            description=description if description else '',
-                            author=author,
-                            year_written=year if year else None
-                        )
-                        book.file.save(base_name, ContentFile(file_content))
-                        book.save()
-                        
-                        # Sahifalarni saqlash
-                        try:
-                            book.save_pages_from_file()
-                        except:
-                            pass
-                        
-                        results.append({
-                            'file': base_name,
-                            'status': 'success',
-                            'title': title,
-                            'author': author_name,
-                            'year': year,
-                            'description': description[:100] + '...' if len(description) > 100 else description
-                        })
-                        
-                    except Exception as e:
-                        results.append({
-                            'file': file_name,
-                            'status': 'error',
-                            'message': str(e)
-                        })
-            
-        return JsonResponse({
-            'success': True,
-            'total': len(results),
-            'results': results
-        })
-        
+        job = enqueue_zip(zip_file, user=request.user)
     except zipfile.BadZipFile:
         return JsonResponse({'error': 'Noto\'g\'ri ZIP fayl'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+    
+    return JsonResponse({
+        'success': True,
+        'job_id': job.pk,
+        'status': job.status,
+        'status_url': reverse('ingestion_job_status', args=[job.pk]),
+    }, status=202)
+
+
+def ingestion_job_status(request, job_id):
+    """Yuklash vazifasi holati va har bir fayl natijasi - faqat vazifa egasi (yoki admin) uchun"""
+    from .models import IngestionJob
+    from .ingestion import job_status
+    
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Tizimga kiring'}, status=401)
+    
+    jobs = IngestionJob.objects.all() if request.user.is_staff else IngestionJob.objects.filter(user=request.user)
+    try:
+        job = jobs.get(pk=job_id)
+    except IngestionJob.DoesNotExist:
+        return JsonResponse({'error': 'Vazifa topilmadi'}, status=404)
+    
+    return JsonResponse(job_status(job))
 
 
 # ============== YANGI FUNKSIYALAR ==============
 
 def book_detail(request, book_id):
     """Kitob haqida batafsil sahifa"""
-    from .models import Book, BookRating, Favorite, ReadingProgress, SearchQuery
+    from .models import Book, BookPage, BookRating, Favorite, ReadingProgress, SearchQuery
+    from .tagged_cache import get_or_set, tag
     from django.shortcuts import get_object_or_404
-    from django.core.cache import cache
     import os
     
     # OPTIMIZATION: select_related bilan author'ni olish
@@ -2689,16 +2620,17 @@ def book_detail(request, book_id):
         id=book_id
     )
     
-    # Views count'ni update qilish (bulk update uchun optimallashtirilgan)
-    Book.objects.filter(id=book_id).update(views_count=models.F('views_count') + 1)
-    book.refresh_from_db(fields=['views_count'])
+    # Ko'rishlar keshda to'planadi va davriy bitta UPDATE bilan yoziladi (view_counter.py)
+    from .view_counter import current_views, record_view
+    record_view(book.id)
+    book.views_count = current_views(book)
     
-    # OPTIMIZATION: ratings'ni cache qilish
-    cache_key = f'book_ratings_{book_id}'
-    ratings = cache.get(cache_key)
-    if ratings is None:
-        ratings = book.ratings.select_related('user')[:10]
-        cache.set(cache_key, ratings, 60 * 5)  # 5 daqiqa
+    # OPTIMIZATION: ratings'ni cache qilish (baho qo'shilsa/o'zgarsa signal orqali eskiradi)
+    ratings = get_or_set(
+        f'book_ratings_{book_id}',
+        lambda: list(book.ratings.select_related('user')[:10]),
+        tags=[tag(BookRating, book.id)],
+    )
     
     is_favorite = False
     reading_progress = None
@@ -2724,37 +2656,12 @@ def book_detail(request, book_id):
         is_favorite = Favorite.objects.filter(user=request.user, book=book).exists()
         reading_progress = ReadingProgress.objects.filter(user=request.user, book=book).first()
     
-    # OPTIMIZATION: O'xshash kitoblarni cache qilish va select_related
-    cache_key_similar = f'similar_books_{book_id}'
-    similar_books = cache.get(cache_key_similar)
-    
-    if similar_books is None:
-        # O'xshash kitoblar - faqat kerakli fieldlar
-        similar_books = Book.objects.filter(
-            author=book.author
-        ).exclude(id=book.id).select_related('author').only(
-            'id', 'title', 'cover_image', 'author__name'
-        )[:4]
-        
-        # Kategoriyalar bo'yicha o'xshash kitoblar
-        book_categories = book.categories.all()
-        if book_categories.exists():
-            category_books = Book.objects.filter(
-                categories__in=book_categories
-            ).exclude(id=book.id).select_related('author').only(
-                'id', 'title', 'cover_image', 'author__name'
-            ).distinct()[:4]
-            similar_books = list(similar_books) + list(category_books)
-            similar_books = similar_books[:6]
-        
-        cache.set(cache_key_similar, similar_books, 60 * 30)  # 30 daqiqa
-    
-    # Total pages count - cache
-    cache_key_pages = f'book_pages_count_{book_id}'
-    total_pages = cache.get(cache_key_pages)
-    if total_pages is None:
-        total_pages = book.pages.count()
-        cache.set(cache_key_pages, total_pages, 60 * 60)  # 1 soat
+    # O'xshash kitoblar - oldindan hisoblangan SimilarBook jadvalidan (bitta indekslangan so'rov)
+    from .similarity import similar_books as get_similar
+    similar_books = get_similar(book, limit=6)
+    
+    # Total pages count - cache (sahifalar qayta yozilsa eskiradi)
+    total_pages = get_or_set(f'book_pages_count_{book_id}', book.pages.count, tags=[tag(BookPage, book.id)])
     
     context = {
         'book': book,
@@ -2891,6 +2798,8 @@ def rate_book(request):
             rating=rating,
             comment=comment
         )
+        # Statistika signal orqali bazada yangilandi
+        book.refresh_from_db(fields=['rating_sum', 'rating_count', 'rating_avg'])
         
         return JsonResponse({
             'success': True,
@@ -2968,6 +2877,7 @@ def save_reading_progress(request):
 
 
 @csrf_exempt
+@rate_limit('get_book_summary', limits=AI_RATE_LIMITS)
 def get_book_summary(request):
     """AI bilan kitob xulosasini olish"""
     from .models import Book, BookSummary
@@ -2996,9 +2906,9 @@ def get_book_summary(request):
         if not groq_client:
             return JsonResponse({'error': 'AI xizmati mavjud emas'}, status=400)
         
-        content = book.content[:5000] if book.content else ""
-        if not content and book.pages.exists():
-            content = "\n".join([p.text for p in book.pages.all()[:5]])[:5000]
+        # Butun kitobdan namunaviy parchalar (faqat boshidan emas) - token byudjeti ichida
+        from .passages import format_passages, get_passage_index, representative_passages
+        content = format_passages(representative_passages(get_passage_index(book)))
         
         if not content:
             return JsonResponse({'error': 'Kitob matni mavjud emas'}, status=400)
@@ -3035,6 +2945,7 @@ def get_book_summary(request):
 
 
 @csrf_exempt
+@rate_limit('ask_about_book', limits=AI_RATE_LIMITS)
 def ask_about_book(request):
     """Kitob haqida savol berish"""
     from .models import Book
@@ -3056,9 +2967,9 @@ def ask_about_book(request):
         if not groq_client:
             return JsonResponse({'error': 'AI xizmati mavjud emas'}, status=400)
         
-        content = book.content[:6000] if book.content else ""
-        if not content and book.pages.exists():
-            content = "\n".join([p.text for p in book.pages.all()[:8]])[:6000]
+        # Savolga mos parchalar (BM25) - token byudjeti ichida
+        from .passages import format_passages, get_passage_index, relevant_passages
+        content = format_passages(relevant_passages(get_passage_index(book), question))
         
         response = groq_client.chat.completions.create(
             model="llama-3.1-8b-instant",
@@ -3069,7 +2980,7 @@ def ask_about_book(request):
                 },
                 {
                     "role": "user",
-                    "content": f"Kitob matni:\n{content}\n\nSavol: {question}"
+                    "content": f"Kitobdan savolga tegishli parchalar:\n{content}\n\nSavol: {question}"
                 }
             ],
             temperature=0.7,
@@ -3098,12 +3009,11 @@ def get_similar_books(request):
     try:
         data = json.loads(request.body)
         book_id = data.get('book_id')
-        book = Book.objects.get(id=book_id)
+        book = Book.objects.only('id', 'author_id', 'similar_refreshed_at').get(id=book_id)
         
-        # Muallif va kategoriya bo'yicha o'xshash (ManyToMany)
-        similar = Book.objects.filter(
-            models.Q(author=book.author) | models.Q(categories__in=book.categories.all())
-        ).exclude(id=book.id).distinct()[:8]
+        # Oldindan hisoblangan o'xshash kitoblar (SimilarBook) - bitta indekslangan so'rov
+        from .similarity import similar_books
+        similar = similar_books(book, limit=8)
         
         results = [{
             'id': b.id,
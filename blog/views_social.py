@@ -374,7 +374,7 @@ def chat_view(request, username):
 
 @login_required
 @require_POST
-@rate_limit('send_message', limit=30, period=60)  # 30 xabar/daqiqa
+@rate_limit('send_message', limits=[(10, 10), (30, 60)])  # 10 soniyada 10 ta, daqiqada 30 ta xabar
 def send_message(request, username):
     """Xabar yuborish (matn, rasm, fayl) - Xavfsiz va optimizatsiyalangan"""
     receiver = get_object_or_404(User.objects.select_related('social_profile'), username=username)
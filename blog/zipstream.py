@@ -0,0 +1,135 @@
+"""
+ZIP arxivni oqim (stream) sifatida yaratish
+Arxiv xotirada to'planmaydi - har bir fayl diskdan bo'laklab o'qilib,
+siqilgan baytlar darhol StreamingHttpResponse ga uzatiladi.
+"""
+import os
+import time
+import zipfile
+
+from django.conf import settings
+
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Allaqachon siqilgan formatlar - qayta siqish foyda bermaydi, faqat CPU sarflaydi (ZIP_STORED)
+STORED_EXTENSIONS = frozenset(getattr(settings, 'ZIP_STORED_EXTENSIONS', [
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.pdf', '.zip', '.gz', '.rar', '.7z',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods', '.odp', '.epub',
+    '.mp3', '.mp4', '.m4a', '.ogg', '.webm',
+]))
+
+
+class _ZipSink:
+    """
+    ZipFile uchun yozish-only oqim: yozilgan baytlarni navbatda ushlab turadi.
+    seek() yo'q - ZipFile buni ko'rib data descriptor rejimida yozadi.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Yig'ilgan baytlarni olish va navbatni bo'shatish"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """
+    Oqimli ZIP yozuvchi.
+
+    Ishlatish:
+        stream = ZipStream()
+        def generate():
+            yield from stream.add_file('a.pdf', '/tmp/a.pdf')
+            yield from stream.add_bytes('manifest.json', b'{}')
+            yield from stream.close()
+        StreamingHttpResponse(generate(), content_type='application/zip')
+    """
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED, compresslevel=None, stored_extensions=STORED_EXTENSIONS):
+        """
+        :param compression: standart siqish usuli (ZIP_DEFLATED, ZIP_STORED, ...)
+        :param compresslevel: siqish darajasi (deflate uchun 1-9)
+        :param stored_extensions: bu kengaytmali fayllar siqilmasdan (ZIP_STORED) yoziladi
+        """
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self.stored_extensions = frozenset(stored_extensions or ())
+        self._sink = _ZipSink()
+        self._zip = zipfile.ZipFile(self._sink, 'w', compression=compression, compresslevel=compresslevel)
+        self._names = set()
+
+    def unique_name(self, arcname):
+        """Arxivda bir xil nom bo'lsa (2), (3) ... qo'shish"""
+        name = arcname
+        stem, ext = os.path.splitext(arcname)
+        counter = 2
+        while name in self._names:
+            name = f"{stem} ({counter}){ext}"
+            counter += 1
+        self._names.add(name)
+        return name
+
+    def compression_for(self, arcname):
+        """Fayl kengaytmasiga qarab siqish usuli"""
+        if os.path.splitext(arcname)[1].lower() in self.stored_extensions:
+            return zipfile.ZIP_STORED
+        return self.compression
+
+    def _zipinfo(self, arcname, mtime, compression):
+        info = zipfile.ZipInfo(arcname, date_time=time.localtime(mtime)[:6])
+        info.compress_type = self.compression_for(arcname) if compression is None else compression
+        if self.compresslevel is not None:
+            info._compresslevel = self.compresslevel
+        info.external_attr = 0o644 << 16
+        return info
+
+    def _flush(self):
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def add_file(self, arcname, path, compression=None):
+        """Diskdagi faylni arxivga qo'shish (bo'laklab o'qiladi)"""
+        size = os.path.getsize(path)
+        info = self._zipinfo(arcname, os.path.getmtime(path), compression)
+        with open(path, 'rb') as src, self._zip.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as dest:
+            for chunk in iter(lambda: src.read(ZIP_CHUNK_SIZE), b''):
+                dest.write(chunk)
+                yield from self._flush()
+        yield from self._flush()
+
+    def add_fileobj(self, arcname, fileobj, compression=None, mtime=None):
+        """Ochiq fayl obyektidan (BytesIO, storage fayli) bo'laklab o'qib qo'shish"""
+        info = self._zipinfo(arcname, time.time() if mtime is None else mtime, compression)
+        with self._zip.open(info, 'w', force_zip64=True) as dest:
+            for chunk in iter(lambda: fileobj.read(ZIP_CHUNK_SIZE), b''):
+                dest.write(chunk)
+                yield from self._flush()
+        yield from self._flush()
+
+    def add_bytes(self, arcname, data, compression=None):
+        """Xotiradagi kichik ma'lumotni arxivga qo'shish (manifest va h.k.)"""
+        self._zip.writestr(self._zipinfo(arcname, time.time(), compression), data)
+        yield from self._flush()
+
+    def close(self):
+        """Markaziy katalogni yozish"""
+        self._zip.close()
+        yield from self._flush()
@@ -3,9 +3,43 @@ LibreOffice yordamida fayl konvertatsiya qilish moduli.
 Word, Excel, PowerPoint fayllarini PDF formatiga aylantirish uchun.
 """
 import os
+import time
+import atexit
+import socket
+import logging
+import threading
 import subprocess
 import tempfile
+import multiprocessing.util
 from pathlib import Path
+from contextlib import contextmanager
+
+# fcntl faqat POSIX da - Windows da nusxalar soni faqat jarayon ichida cheklanadi
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# LibreOffice nusxalari soni - barcha jarayonlar (gunicorn workerlari, ingestion worker va
+# uning bolalari) uchun umumiy: har bir nusxa LIBREOFFICE_POOL_DIR dagi slot faylini qulflaydi
+LIBREOFFICE_POOL_SIZE = int(os.environ.get('LIBREOFFICE_POOL_SIZE', 2))
+LIBREOFFICE_POOL_DIR = os.environ.get('LIBREOFFICE_POOL_DIR', os.path.join(tempfile.gettempdir(), 'lo_pool'))
+# UNO moduli bor python (python3-uno yoki LibreOffice bilan kelgan); bo'sh - avtomatik qidiriladi
+LIBREOFFICE_PYTHON = os.environ.get('LIBREOFFICE_PYTHON')
+# Bo'sh nusxani kutish vaqti (soniya)
+LIBREOFFICE_ACQUIRE_TIMEOUT = 120
+# Nusxa ishga tushishini kutish vaqti (soniya)
+LIBREOFFICE_START_TIMEOUT = 30
+# Shuncha vaqt ishlatilmagan nusxa to'xtatiladi va sloti boshqa jarayonlarga bo'shatiladi (soniya)
+LIBREOFFICE_IDLE_TIMEOUT = 60
+# Barcha slotlar band bo'lsa (boshqa jarayonlarda) qayta tekshirish oralig'i (soniya)
+SLOT_POLL_INTERVAL = 0.5
+
+UNO_SCRIPT = Path(__file__).with_name('libreoffice_uno.py')
+# libreoffice_uno.py chiqish kodi: nusxaga ulanib bo'lmadi
+UNO_EXIT_NO_INSTANCE = 2
 
 
 def get_libreoffice_path():
@@ -37,6 +71,387 @@ def get_libreoffice_path():
     return None
 
 
+def find_uno_python(libreoffice_path):
+    """
+    uno modulini import qila oladigan python: LIBREOFFICE_PYTHON, LibreOffice bilan kelgan
+    program/python yoki tizim python3 (python3-uno paketi)
+    :return: yo'l yoki None
+    """
+    program_dir = Path(os.path.realpath(libreoffice_path)).parent
+    candidates = [
+        LIBREOFFICE_PYTHON,
+        str(program_dir / 'python'),
+        str(program_dir / 'python.exe'),
+        '/usr/bin/python3',
+    ]
+    for candidate in candidates:
+        if not candidate or not os.path.exists(candidate):
+            continue
+        try:
+            result = subprocess.run([candidate, '-c', 'import uno'], capture_output=True, timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            continue
+        if result.returncode == 0:
+            return candidate
+    return None
+
+
+class LibreOfficeInstance:
+    """
+    Bitta LibreOffice sloti: o'z profil papkasi va qulf fayli bor (slot raqami jarayonlar uchun umumiy).
+    UNO python bo'lsa - doimiy headless nusxa (--accept socket), konvertatsiya libreoffice_uno.py
+    orqali shu socketga beriladi va LibreOffice har safar noldan yuklanmaydi.
+    UNO python bo'lmasa - har konvertatsiya slot profili bilan alohida soffice --convert-to
+    (profil diskda tayyor turadi, bir vaqtdagi soffice lar soni slotlar bilan cheklangan).
+    """
+
+    def __init__(self, index, libreoffice_path, base_dir, uno_python=None):
+        self.index = index
+        self.libreoffice_path = libreoffice_path
+        self.uno_python = uno_python
+        self.profile_dir = Path(base_dir) / f'profile_{index}'
+        self.profile_url = self.profile_dir.as_uri()
+        self.lock_path = Path(base_dir) / f'slot_{index}.lock'
+        self.lock_fd = None
+        self.port = None
+        self.process = None
+        self.conversions = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def persistent(self):
+        return self.uno_python is not None
+
+    def lock(self):
+        """Slotni egallash (bloklamaydi); :return: True - slot shu jarayonniki"""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        self.lock_fd = fd
+        return True
+
+    def unlock(self):
+        if self.lock_fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+        os.close(self.lock_fd)
+        self.lock_fd = None
+
+    def _pass_fds(self):
+        # soffice ham qulf fd sini ushlaydi - ota jarayon o'lsa ham, soffice ishlab turguncha
+        # slot band hisoblanadi (nusxalar soni hech qachon slotlardan oshmaydi)
+        return (self.lock_fd,) if self.lock_fd is not None and os.name == 'posix' else ()
+
+    def _free_port(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def _is_listening(self):
+        try:
+            with socket.create_connection(('127.0.0.1', self.port), timeout=0.5):
+                return True
+        except OSError:
+            return False
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Doimiy nusxani ishga tushirish va socket tayyor bo'lishini kutish"""
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        if not self.persistent:
+            return
+        self.port = self._free_port()
+        self.process = subprocess.Popen(
+            [
+                self.libreoffice_path,
+                f'-env:UserInstallation={self.profile_url}',
+                '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+                f'--accept=socket,host=127.0.0.1,port={self.port};urp;',
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            pass_fds=self._pass_fds(),
+        )
+
+        deadline = time.monotonic() + LIBREOFFICE_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                raise Exception(f"LibreOffice nusxasi #{self.index} ishga tushmadi")
+            if self._is_listening():
+                logger.info(f"LIBREOFFICE_POOL: nusxa #{self.index} tayyor (pid={self.process.pid})")
+                return
+            time.sleep(0.2)
+        self.stop()
+        raise Exception(f"LibreOffice nusxasi #{self.index} {LIBREOFFICE_START_TIMEOUT}s ichida tayyor bo'lmadi")
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def restart(self):
+        logger.warning(f"LIBREOFFICE_POOL: nusxa #{self.index} qayta ishga tushirilmoqda")
+        self.stop()
+        self.start()
+
+    def abandon(self):
+        """
+        Fork dan keyin bolada: ota jarayonning nusxasiga tegmasdan unutish.
+        Faqat bolaning fd nusxasi yopiladi - qulf ota (va soffice) da qoladi.
+        """
+        if self.lock_fd is not None:
+            os.close(self.lock_fd)
+            self.lock_fd = None
+        self.process = None
+
+    def _command(self, input_path, output_format, output_dir):
+        if self.persistent:
+            return [
+                self.uno_python, str(UNO_SCRIPT), '--port', str(self.port),
+                str(input_path), str(output_dir), output_format,
+            ]
+        return [
+            self.libreoffice_path,
+            f'-env:UserInstallation={self.profile_url}',
+            '--headless', '--norestore',
+            '--convert-to', output_format,
+            '--outdir', str(output_dir),
+            str(input_path),
+        ]
+
+    def convert(self, input_path, output_format, output_dir, timeout=120):
+        """
+        Faylni slot orqali konvertatsiya qilish
+        :return: subprocess.CompletedProcess (UNO klienti yoki soffice jarayoni)
+        """
+        if self.persistent and not self.is_alive():
+            self.restart()
+        result = subprocess.run(
+            self._command(input_path, output_format, output_dir),
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            pass_fds=self._pass_fds(),
+        )
+        if self.persistent and result.returncode == UNO_EXIT_NO_INSTANCE:
+            # Nusxa javob bermadi (yiqilgan) - qayta ishga tushirib, bir marta takrorlash
+            self.restart()
+            result = subprocess.run(
+                self._command(input_path, output_format, output_dir),
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                pass_fds=self._pass_fds(),
+            )
+        self.conversions += 1
+        return result
+
+
+class LibreOfficePool:
+    """
+    LibreOffice slotlari hovuzi.
+    So'rov shu jarayonning bo'sh nusxasiga beriladi; bo'lmasa bo'sh slot (boshqa jarayonlar
+    egallamagan) qulflanadi; hamma slot band bo'lsa - bo'shashini kutadi.
+    Doimiy nusxalar LIBREOFFICE_IDLE_TIMEOUT ishlatilmasa to'xtatiladi va sloti bo'shatiladi;
+    alohida soffice rejimida slot har konvertatsiyadan keyin darhol bo'shatiladi.
+    """
+
+    def __init__(self, libreoffice_path, size=LIBREOFFICE_POOL_SIZE, base_dir=LIBREOFFICE_POOL_DIR,
+                 uno_python=None):
+        self.libreoffice_path = libreoffice_path
+        self.size = max(1, size)
+        self.base_dir = base_dir
+        os.makedirs(self.base_dir, mode=0o700, exist_ok=True)
+        self.uno_python = uno_python
+        self.pid = os.getpid()
+        self._idle = []
+        self._instances = {}
+        self._cond = threading.Condition()
+        self._reaper = None
+
+    def _take(self):
+        """Bo'sh nusxa yoki yangi egallangan slot; yo'q bo'lsa None (_cond ichida)"""
+        if self._idle:
+            return self._idle.pop()
+        for index in range(self.size):
+            if index in self._instances:
+                continue
+            instance = LibreOfficeInstance(index, self.libreoffice_path, self.base_dir, self.uno_python)
+            if instance.lock():
+                self._instances[index] = instance
+                return instance
+        return None
+
+    def _release_slot(self, instance):
+        instance.stop()
+        instance.unlock()
+        self._instances.pop(instance.index, None)
+
+    def _reap_idle(self):
+        """Uzoq ishlatilmagan nusxalarni to'xtatish (_cond ichida)"""
+        now = time.monotonic()
+        for instance in [i for i in self._idle if now - i.last_used >= LIBREOFFICE_IDLE_TIMEOUT]:
+            self._idle.remove(instance)
+            self._release_slot(instance)
+            logger.info(f"LIBREOFFICE_POOL: nusxa #{instance.index} bo'sh turgani uchun to'xtatildi")
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(LIBREOFFICE_IDLE_TIMEOUT / 2)
+            with self._cond:
+                self._reap_idle()
+
+    @contextmanager
+    def acquire(self, timeout=LIBREOFFICE_ACQUIRE_TIMEOUT):
+        """Bo'sh nusxani olish (ish tugagach hovuzga qaytariladi)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            instance = self._take()
+            while instance is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Bo'sh LibreOffice nusxasi topilmadi (timeout)")
+                # Boshqa jarayonning sloti bo'shashi notify qilinmaydi - vaqti-vaqti bilan tekshiriladi
+                self._cond.wait(min(remaining, SLOT_POLL_INTERVAL))
+                instance = self._take()
+            if instance.persistent and self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name='libreoffice-reaper', daemon=True)
+                self._reaper.start()
+
+        try:
+            if instance.process is None:
+                instance.start()
+            elif not instance.is_alive():
+                instance.restart()
+            yield instance
+        finally:
+            instance.last_used = time.monotonic()
+            with self._cond:
+                if instance.persistent:
+                    self._idle.append(instance)
+                else:
+                    self._release_slot(instance)
+                self._cond.notify()
+
+    def convert(self, input_path, output_format, output_dir, timeout=120):
+        """Konvertatsiya; nusxa osilib qolsa yoki o'lsa qayta ishga tushiriladi"""
+        with self.acquire() as instance:
+            try:
+                result = instance.convert(input_path, output_format, output_dir, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                instance.stop()
+                raise
+            if instance.persistent and not instance.is_alive():
+                # Hujjat nusxani yiqitgan - keyingi so'rov uchun qayta ishga tushadi
+                logger.warning(f"LIBREOFFICE_POOL: nusxa #{instance.index} konvertatsiya paytida to'xtadi")
+            return result
+
+    def shutdown(self):
+        with self._cond:
+            for instance in list(self._instances.values()):
+                self._release_slot(instance)
+            self._idle = []
+
+    def abandon(self):
+        """Fork qilingan bolada: ota jarayon nusxalari va slotlarini unutish"""
+        for instance in self._instances.values():
+            instance.abandon()
+        self._instances = {}
+        self._idle = []
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'mode': 'uno' if self.uno_python else 'soffice',
+            'started': len(self._instances),
+            'alive': sum(1 for i in self._instances.values() if i.is_alive()),
+            'conversions': sum(i.conversions for i in self._instances.values()),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _shutdown_pool():
+    # Fork qilingan bola ota jarayon hovuzini to'xtatmasin
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.shutdown()
+
+
+def _reset_pool_after_fork():
+    """
+    Fork dan keyin bolada hovuz nolga tushiriladi: ota jarayonning Popen obyektlari bolada
+    ishlamaydi (poll() ECHILD) va nusxani "qayta ishga tushirish" o'sha profilga ikkinchi soffice ochardi
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        _pool.abandon()
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def get_libreoffice_pool():
+    """Jarayon uchun yagona LibreOffice hovuzi (birinchi so'rovda yaratiladi)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                libreoffice_path = get_libreoffice_path()
+                if not libreoffice_path:
+                    raise Exception("LibreOffice topilmadi. Iltimos, LibreOffice o'rnating.")
+                uno_python = find_uno_python(libreoffice_path)
+                if uno_python is None:
+                    logger.warning(
+                        "LIBREOFFICE_POOL: uno moduli bor python topilmadi - har konvertatsiya "
+                        "alohida soffice bilan (python3-uno o'rnating yoki LIBREOFFICE_PYTHON ni bering)"
+                    )
+                _pool = LibreOfficePool(libreoffice_path, uno_python=uno_python)
+                # multiprocessing bolalarida (ProcessPoolExecutor) atexit ishlamaydi - Finalize ishlaydi
+                atexit.register(_shutdown_pool)
+                multiprocessing.util.Finalize(None, _shutdown_pool, exitpriority=10)
+    return _pool
+
+
+def run_libreoffice_conversion(input_path, output_format, output_dir, timeout=120):
+    """
+    Faylni LibreOffice hovuzi orqali konvertatsiya qilish.
+    :param output_format: LibreOffice --convert-to qiymati (pdf, html, 'txt:Text', ...)
+    :return: Path - LibreOffice yaratgan fayl yoki None (yaratilmagan bo'lsa)
+    """
+    input_path = Path(input_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    result = get_libreoffice_pool().convert(input_path, output_format, output_dir, timeout=timeout)
+
+    extension = output_format.split(':')[0]
+    expected_output = output_dir / f'{input_path.stem}.{extension}'
+    if expected_output.exists():
+        return expected_output
+    if result.returncode != 0:
+        raise Exception(f"LibreOffice xatosi: {result.stderr}")
+    return None
+
+
 def convert_to_pdf_with_libreoffice(input_path, output_path=None):
     """
     LibreOffice yordamida faylni PDF formatiga aylantirish.
@@ -76,29 +491,11 @@ def convert_to_pdf_with_libreoffice(input_path, output_path=None):
     output_dir.mkdir(parents=True, exist_ok=True)
     
     try:
-        # LibreOffice buyrug'ini ishga tushirish
-        cmd = [
-            libreoffice_path,
-            '--headless',
-            '--convert-to', 'pdf',
-            '--outdir', str(output_dir),
-            str(input_path)
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=120  # 2 daqiqa timeout
-        )
-        
-        if result.returncode != 0:
-            raise Exception(f"LibreOffice xatosi: {result.stderr}")
+        # Doimiy LibreOffice hovuzi orqali (2 daqiqa timeout)
+        expected_output = run_libreoffice_conversion(input_path, 'pdf', output_dir, timeout=120)
         
         # LibreOffice standart nom bilan saqlaydi, agar boshqa nom kerak bo'lsa o'zgartirish
-        expected_output = output_dir / (input_path.stem + '.pdf')
-        
-        if expected_output.exists():
+        if expected_output:
             if str(expected_output) != str(output_path):
                 os.rename(str(expected_output), str(output_path))
             return str(output_path)
@@ -159,27 +556,9 @@ def convert_libreoffice_format(input_path, output_format, output_path=None):
     output_dir.mkdir(parents=True, exist_ok=True)
     
     try:
-        cmd = [
-            libreoffice_path,
-            '--headless',
-            '--convert-to', output_format,
-            '--outdir', str(output_dir),
-            str(input_path)
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
-        
-        if result.returncode != 0:
-            raise Exception(f"LibreOffice xatosi: {result.stderr}")
-        
-        expected_output = output_dir / (input_path.stem + f'.{output_format}')
+        expected_output = run_libreoffice_conversion(input_path, output_format, output_dir, timeout=120)
         
-        if expected_output.exists():
+        if expected_output:
             if str(expected_output) != str(output_path):
                 os.rename(str(expected_output), str(output_path))
             return str(output_path)
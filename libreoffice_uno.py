@@ -0,0 +1,123 @@
+"""
+Ishlab turgan LibreOffice nusxasida (--accept socket) UNO orqali konvertatsiya.
+Django python'ida uno moduli yo'q (Docker: python:3.12-slim) - skript LibreOffice python'i
+(python3-uno yoki LibreOffice bilan kelgan program/python) bilan alohida ishga tushiriladi:
+    python3 libreoffice_uno.py --port 2002 hujjat.docx /chiqish/papka pdf
+Natija soffice --convert-to kabi nomlanadi: <papka>/<fayl nomi>.<kengaytma>
+Chiqish kodlari: 0 - tayyor, 1 - hujjatni konvertatsiya qilib bo'lmadi, 2 - nusxaga ulanib bo'lmadi
+"""
+import os
+import sys
+import argparse
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+from com.sun.star.lang import DisposedException
+
+EXIT_FAILED = 1
+EXIT_NO_INSTANCE = 2
+
+# Hujjat turi: UNO servisi bo'yicha (tartib muhim - taqdimot ham DrawingDocument)
+DOCUMENT_TYPES = [
+    ('com.sun.star.text.TextDocument', 'writer'),
+    ('com.sun.star.sheet.SpreadsheetDocument', 'calc'),
+    ('com.sun.star.presentation.PresentationDocument', 'impress'),
+    ('com.sun.star.drawing.DrawingDocument', 'draw'),
+]
+
+# --convert-to kengaytmasi -> hujjat turi bo'yicha eksport filtri (filtr berilmagan bo'lsa)
+FILTERS = {
+    'pdf': {'writer': 'writer_pdf_Export', 'calc': 'calc_pdf_Export',
+            'impress': 'impress_pdf_Export', 'draw': 'draw_pdf_Export'},
+    'html': {'writer': 'HTML (StarWriter)', 'calc': 'HTML (StarCalc)',
+             'impress': 'impress_html_Export', 'draw': 'draw_html_Export'},
+    'txt': {'writer': 'Text', 'calc': 'Text - txt - csv (StarCalc)'},
+    'csv': {'calc': 'Text - txt - csv (StarCalc)'},
+    'odt': {'writer': 'writer8'},
+    'docx': {'writer': 'MS Word 2007 XML'},
+    'doc': {'writer': 'MS Word 97'},
+    'rtf': {'writer': 'Rich Text Format'},
+    'ods': {'calc': 'calc8'},
+    'xlsx': {'calc': 'Calc MS Excel 2007 XML'},
+    'xls': {'calc': 'MS Excel 97'},
+    'odp': {'impress': 'impress8'},
+    'pptx': {'impress': 'Impress MS PowerPoint 2007 XML'},
+    'ppt': {'impress': 'MS PowerPoint 97'},
+    'odg': {'draw': 'draw8'},
+}
+
+
+def _props(**values):
+    return tuple(PropertyValue(Name=name, Value=value) for name, value in values.items())
+
+
+def _document_type(document):
+    for service, name in DOCUMENT_TYPES:
+        if document.supportsService(service):
+            return name
+    return None
+
+
+def convert(desktop, input_path, output_dir, output_format):
+    """:return: yaratilgan fayl yo'li"""
+    # soffice --convert-to sintaksisi: kengaytma[:filtr[:filtr parametrlari]]
+    extension, _, filter_spec = output_format.partition(':')
+    filter_name, _, filter_options = filter_spec.partition(':')
+    output_path = os.path.join(
+        output_dir, f"{os.path.splitext(os.path.basename(input_path))[0]}.{extension}"
+    )
+
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(input_path)), '_blank', 0,
+        _props(Hidden=True, ReadOnly=True),
+    )
+    if document is None:
+        raise RuntimeError(f"Hujjat ochilmadi: {input_path}")
+    try:
+        if not filter_name:
+            filter_name = FILTERS.get(extension.lower(), {}).get(_document_type(document))
+            if not filter_name:
+                raise RuntimeError(f"{extension} uchun filtr topilmadi")
+        store = {'FilterName': filter_name, 'Overwrite': True}
+        if filter_options:
+            store['FilterOptions'] = filter_options
+        document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(output_path)), _props(**store))
+    finally:
+        document.close(True)
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LibreOffice nusxasi orqali konvertatsiya (UNO)")
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('input')
+    parser.add_argument('outdir')
+    parser.add_argument('format')
+    args = parser.parse_args(argv)
+
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local)
+    try:
+        context = resolver.resolve(
+            f'uno:socket,host=127.0.0.1,port={args.port};urp;StarOffice.ComponentContext'
+        )
+        desktop = context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', context)
+    except NoConnectException as e:
+        print(f"Nusxaga ulanib bo'lmadi: {e.Message}", file=sys.stderr)
+        return EXIT_NO_INSTANCE
+
+    try:
+        print(convert(desktop, args.input, args.outdir, args.format))
+    except DisposedException as e:
+        # Nusxa konvertatsiya paytida yopildi (yiqildi)
+        print(f"Nusxa to'xtadi: {e.Message}", file=sys.stderr)
+        return EXIT_NO_INSTANCE
+    except Exception as e:
+        print(f"Konvertatsiya xatosi: {getattr(e, 'Message', None) or e}", file=sys.stderr)
+        return EXIT_FAILED
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -143,6 +143,20 @@ else:
         }
     }
 
+# PostgreSQL: pg_trgm lookup'lari (katalog qidiruvi - blog/catalog_search.py)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Katalog qidiruvi: so'rov trigramlarining qancha ulushi mos kelishi kerak
+CATALOG_SEARCH_THRESHOLD = float(os.environ.get('CATALOG_SEARCH_THRESHOLD', '0.5'))
+
+# ai_search_books: so'rov tahlili oflayn (blog/query_analysis.py); LLM faqat ixtiyoriy boyitish
+AI_SEARCH_LLM_ANALYSIS = os.environ.get('AI_SEARCH_LLM_ANALYSIS', 'False').lower() == 'true'
+AI_SEARCH_LLM_TIMEOUT = float(os.environ.get('AI_SEARCH_LLM_TIMEOUT', '2'))
+
+# book_detail ko'rishlari keshda to'planib, shuncha soniyada bir marta bazaga yoziladi (blog/view_counter.py)
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', '30'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -219,16 +233,36 @@ LOGIN_URL = 'login'
 # Session'larni database'da saqlash (RAM tejash uchun)
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
-# Cache'ni file'ga saqlash (RAM tejash uchun)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'cache'),
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000,  # Maksimal cache entry'lar soni
+# Umumiy xotira keshi: barcha gunicorn workerlari bitta kesh serveriga lokal socket orqali ulanadi
+# (python manage.py run_cache_server). Server ishlamasa har bir jarayon o'z LRU keshidan foydalanadi.
+CACHE_SERVER_LOCATION = os.environ.get(
+    'CACHE_SERVER_LOCATION',
+    '127.0.0.1:11311' if os.name == 'nt' else os.path.join(tempfile.gettempdir(), 'cloudstore-cache.sock')
+)
+CACHE_SERVER_MAX_MB = int(os.environ.get('CACHE_SERVER_MAX_MB', 128))
+# Kesh serveri xabarlari shu kalit bilan imzolanadi (bo'lmasa SECRET_KEY dan)
+CACHE_SERVER_SECRET = os.environ.get('CACHE_SERVER_SECRET')
+
+if os.environ.get('REDIS_URL'):
+    # Redis mavjud bo'lsa (bir nechta server) - to'g'ridan-to'g'ri Redis
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'blog.cache_backend.SocketCache',
+            'LOCATION': CACHE_SERVER_LOCATION,
+            'OPTIONS': {
+                'SOCKET_TIMEOUT': 1.0,
+                'RETRY_INTERVAL': 5,
+                'FALLBACK_MAX_ENTRIES': 1000,  # Server ishlamaganda lokal LRU hajmi
+            }
         }
     }
-}
 
 # Cache papkasini yaratish
 os.makedirs(os.path.join(BASE_DIR, 'cache'), exist_ok=True)
@@ -350,3 +384,16 @@ CORS_ALLOW_HEADERS = [
 
 # X-Frame-Options - iframe uchun ruxsat (mobil ilova uchun)
 X_FRAME_OPTIONS = 'ALLOWALL'
+
+# ===== KITOB YUKLASH NAVBATI =====
+# run_ingestion_worker da fayllarni parallel tahlil qiluvchi jarayonlar soni
+INGESTION_WORKER_PROCESSES = int(os.environ.get('INGESTION_WORKER_PROCESSES', 2))
+# Bitta PDF sahifalarini parallel o'qiydigan jarayonlar soni (blog/pdf_extraction.py); 0 - CPU yadrolari soni
+PDF_EXTRACTION_PROCESSES = int(os.environ.get('PDF_EXTRACTION_PROCESSES', 0))
+# Matn qatlami yo'q PDF sahifalarini bir vaqtda OCR qiluvchi oqimlar soni (blog/pdf_ocr.py)
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 2))
+
+# ===== KONVERTATSIYA KESHI =====
+# convert_file / convert_to_format natijalari (SHA-256 + format + versiya bo'yicha), LRU bilan cheklangan
+CONVERSION_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'conversions')
+CONVERSION_CACHE_MAX_BYTES = int(os.environ.get('CONVERSION_CACHE_MAX_MB', 500)) * 1024 * 1024
@@ -3,5 +3,11 @@
 # Build command
 # pip install -r requirements.txt && python manage.py collectstatic --noinput
 
+# Umumiy xotira kesh serveri (gunicorn workerlari uchun)
+python manage.py run_cache_server &
+
+# Kitob yuklash navbati worker'i (fonda, media diski bilan bir konteynerda)
+python manage.py run_ingestion_worker &
+
 # Start command (gunicorn)
 gunicorn mysite.wsgi:application --bind 0.0.0.0:$PORT --workers 2 --timeout 120